@@ -0,0 +1,339 @@
+"""
+Portaria automática: leituras de câmeras de placa (ANPR) -> decisão -> histórico.
+
+Cada leitura é uma linha JSON, ex.: {"placa": "ABC1D23", "camera": "entrada-1", "sentido": "ENTRADA"}
+(ou só o texto da placa). 'camera', 'sentido' e 'instante' (segundos, time.time()) são opcionais:
+sem 'sentido', o veículo que está no pátio sai e o que está fora entra.
+
+Etapas:
+  1. Fonte: arquivo seguido como 'tail -f', socket UNIX (várias câmeras) ou a entrada padrão.
+  2. Normalização (ValidadorPlaca) e descarte das repetições: a câmera (ou outra câmera
+     da mesma faixa) lê a mesma placa várias vezes enquanto o carro passa; dentro da
+     'janela' (segundos) só a primeira leitura da placa vale, seja qual for a câmera.
+  3. Decisão (buscar_acesso) num pool de threads.
+  4. Gravação: uma única thread pega as decisões NA ORDEM das leituras e grava as
+     Entradas/Saídas em lote (registrar_movimentacao dentro de db.lote(): no modo grupo,
+     um fsync por lote).
+
+Como o servidor, o pipeline deve ser o único processo que grava no banco.
+"""
+import json
+import os
+import queue
+import selectors
+import socket
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from app.utils.estatisticas import resumo_latencias
+from app.utils.validadores import ValidadorPlaca
+
+_FIM = object()  # Marca o fim das leituras na fila da gravação
+
+
+class Deduplicador:
+    """
+    Descarta leituras repetidas: a mesma placa, em qualquer câmera, dentro
+    de 'janela' segundos da leitura anterior. Enquanto o carro continua na
+    frente da câmera a janela é renovada, então um carro parado gera uma leitura só.
+
+    A chave é só a placa: duas câmeras que leem o mesmo carro quase juntas
+    contariam como duas passagens, e sem 'sentido' a segunda viraria uma
+    SAIDA logo depois da ENTRADA.
+    """
+
+    def __init__(self, janela=5.0):
+        self.janela = janela
+        self._vistas = {}  # placa -> instante da última leitura (em qualquer câmera)
+        self._proxima_limpeza = None
+
+    def nova(self, placa, instante):
+        """True se a leitura conta (não é repetição)."""
+        anterior = self._vistas.get(placa)
+        self._vistas[placa] = instante
+        if self._proxima_limpeza is None or instante >= self._proxima_limpeza:
+            self._limpar(instante)
+        return anterior is None or instante - anterior > self.janela
+
+    def _limpar(self, instante):
+        """Esquece as placas que não aparecem há mais de uma janela (memória constante)."""
+        limite = instante - self.janela
+        self._vistas = {placa: visto for placa, visto in self._vistas.items() if visto >= limite}
+        self._proxima_limpeza = instante + self.janela
+
+
+class PipelineCameras:
+    def __init__(self, sistema, janela=5.0, trabalhadores=4, lote=200, ao_decidir=None):
+        """
+        :param sistema: ControleEstacionamento (de preferência com repositório exclusivo)
+        :param janela: Segundos em que leituras repetidas da mesma placa são descartadas
+        :param trabalhadores: Threads que consultam buscar_acesso
+        :param lote: Máximo de decisões gravadas num mesmo db.lote()
+        :param ao_decidir: Chamada com cada decisão, já gravada (ex.: abrir a cancela).
+                           Se algo falhou, a decisão traz 'erro'
+        """
+        self.sistema = sistema
+        self.deduplicador = Deduplicador(janela)
+        self.trabalhadores = trabalhadores
+        self.lote = lote
+        self.ao_decidir = ao_decidir
+        self.contadores = {
+            "leituras": 0, "malformadas": 0, "invalidas": 0, "repetidas": 0, "consultas": 0,
+            "entradas": 0, "saidas": 0, "negadas": 0, "desconhecidas": 0, "erros": 0,
+        }
+        self._latencias = []  # leitura -> decisão gravada (segundos)
+        self._no_patio = None
+
+    # --- ETAPA 2: NORMALIZAÇÃO E REPETIÇÕES ---
+
+    def _interpretar(self, linha):
+        """Linha da fonte -> leitura {'placa', 'camera', 'sentido', 'instante'} (ou None)."""
+        linha = linha.strip()
+        if not linha:
+            return None
+        if linha.startswith("{"):
+            try:
+                leitura = json.loads(linha)
+            except json.JSONDecodeError:
+                self.contadores["malformadas"] += 1
+                return None
+        else:
+            leitura = {"placa": linha}
+        if not isinstance(leitura, dict) or not isinstance(leitura.get("placa"), str):
+            self.contadores["malformadas"] += 1
+            return None
+        return leitura
+
+    # --- ETAPA 3: DECISÃO (POOL DE THREADS) ---
+
+    def _decidir(self, placa):
+        return self.sistema.buscar_acesso(placa, sugerir=False)
+
+    # --- ETAPA 4: GRAVAÇÃO EM LOTE ---
+
+    def _aplicar(self, leitura, placa, futuro):
+        """Decisão de uma leitura; ENTRADA liberada ou SAIDA de veículo cadastrado é registrada."""
+        try:
+            acesso = futuro.result()
+            sentido = (leitura.get("sentido") or "").upper()
+            if sentido not in ("ENTRADA", "SAIDA"):
+                sentido = "SAIDA" if placa in self._no_patio else "ENTRADA"
+
+            if not acesso.get("encontrado"):
+                self.contadores["desconhecidas"] += 1
+                abrir = False
+            elif sentido == "ENTRADA" and not acesso.get("liberado"):
+                self.contadores["negadas"] += 1
+                abrir = False
+            else:
+                # Veículo autorizado entrando, ou veículo cadastrado saindo
+                abrir = self.sistema.repo.registrar_movimentacao(placa, sentido)
+        except Exception as e:
+            self.contadores["erros"] += 1
+            return {"placa": placa, "camera": leitura.get("camera"), "erro": str(e)}
+        if abrir:
+            self.contadores["entradas" if sentido == "ENTRADA" else "saidas"] += 1
+            if sentido == "ENTRADA":
+                self._no_patio.add(placa)
+            else:
+                self._no_patio.discard(placa)
+        return {"placa": placa, "camera": leitura.get("camera"), "sentido": sentido,
+                "abrir": bool(abrir), "mensagem": acesso.get("mensagem")}
+
+    def _gravar(self, itens):
+        """
+        Aplica as decisões (em ordem) e grava as movimentações num único db.lote().
+        Cada leitura tem sua própria decisão: um erro numa delas não afeta as outras.
+        """
+        decisoes = []
+        try:
+            with self.sistema.repo.db.lote():
+                for leitura, placa, _, futuro in itens:
+                    decisoes.append(self._aplicar(leitura, placa, futuro))
+        except Exception as e:
+            # Falha ao confirmar o lote (ex.: fsync): os movimentos registrados podem
+            # não ter chegado ao disco. A decisão vale, mas segue com o erro
+            erro = f"Falha ao confirmar a gravação: {e}"
+            for decisao in decisoes:
+                if decisao.get("abrir"):
+                    decisao["erro"] = erro
+                    self.contadores["erros"] += 1
+            for leitura, placa, _, _ in itens[len(decisoes):]:
+                self.contadores["erros"] += 1
+                decisoes.append({"placa": placa, "camera": leitura.get("camera"), "erro": erro})
+        agora = time.perf_counter()
+        self._latencias.extend(agora - recebida for _, _, recebida, _ in itens)
+        if self.ao_decidir:
+            for decisao in decisoes:
+                try:
+                    self.ao_decidir(decisao)
+                except Exception:
+                    # Ex.: cancela sem resposta. Não pode parar a gravação das próximas leituras
+                    self.contadores["erros"] += 1
+
+    def _tarefa_gravadora(self, fila):
+        """Consome a fila na ordem das leituras, levando junto o que já estiver esperando."""
+        terminou = False
+        while not terminou:
+            itens = []
+            item = fila.get()
+            while item is not _FIM:
+                itens.append(item)
+                if len(itens) >= self.lote:
+                    break
+                try:
+                    item = fila.get_nowait()
+                except queue.Empty:
+                    break
+            terminou = item is _FIM
+            if itens:
+                self._gravar(itens)
+
+    # --- EXECUÇÃO ---
+
+    def processar(self, linhas):
+        """
+        Consome as linhas de uma fonte até ela acabar (ou Ctrl+C) e devolve as métricas.
+        As decisões pendentes são gravadas antes de retornar.
+        """
+        inicio = time.perf_counter()
+        self._no_patio = set(self.sistema.repo.listar_ocupacao())
+        # Fila limitada: se a gravação atrasar, a leitura da fonte espera (memória constante)
+        fila = queue.Queue(maxsize=self.lote * 20)
+        gravadora = threading.Thread(target=self._tarefa_gravadora, args=(fila,), name="gravadora-cameras")
+        gravadora.start()
+        try:
+            with ThreadPoolExecutor(max_workers=self.trabalhadores, thread_name_prefix="decisao") as pool:
+                for linha in linhas:
+                    self.contadores["leituras"] += 1
+                    leitura = self._interpretar(linha)
+                    if leitura is None:
+                        continue
+                    placa = ValidadorPlaca.normalizar(leitura["placa"])
+                    if placa is None:
+                        self.contadores["invalidas"] += 1
+                        continue
+                    instante = leitura.get("instante")
+                    if not isinstance(instante, (int, float)):
+                        instante = time.time()
+                    if not self.deduplicador.nova(placa, instante):
+                        self.contadores["repetidas"] += 1
+                        continue
+                    self.contadores["consultas"] += 1
+                    fila.put((leitura, placa, time.perf_counter(), pool.submit(self._decidir, placa)))
+        finally:
+            fila.put(_FIM)
+            gravadora.join()
+        return self.metricas(time.perf_counter() - inicio)
+
+    def metricas(self, duracao=None):
+        """Contadores, vazão (leituras/s) e latência da leitura até a decisão gravada."""
+        metricas = dict(self.contadores)
+        if duracao:
+            metricas["duracao_s"] = round(duracao, 3)
+            metricas["leituras_por_seg"] = round(self.contadores["leituras"] / duracao, 1)
+        metricas["latencia"] = resumo_latencias(self._latencias)
+        return metricas
+
+
+# --- FONTES DE LEITURAS ---
+
+def seguir_arquivo(caminho, parar=None, do_inicio=False, intervalo=0.2):
+    """
+    Linhas acrescentadas a um arquivo, como 'tail -f' (até 'parar' ser sinalizado).
+    Se o arquivo for truncado ou trocado (rotação de log), volta ao começo do novo.
+    """
+    parar = parar or threading.Event()
+    while not os.path.exists(caminho):
+        if parar.wait(intervalo):
+            return
+    f = open(caminho, 'r', encoding='utf-8')
+    try:
+        if not do_inicio:
+            f.seek(0, os.SEEK_END)
+        pendente = ""
+        while not parar.is_set():
+            trecho = f.readline()
+            if trecho:
+                pendente += trecho
+                if pendente.endswith("\n"):  # Só linhas completas (a câmera pode estar no meio da escrita)
+                    yield pendente
+                    pendente = ""
+                continue
+            try:
+                trocado = os.stat(caminho).st_ino != os.fstat(f.fileno()).st_ino
+                truncado = os.path.getsize(caminho) < f.tell()
+            except FileNotFoundError:
+                trocado, truncado = False, False
+            if trocado or truncado:
+                f.close()
+                f = open(caminho, 'r', encoding='utf-8')
+                pendente = ""
+                continue
+            parar.wait(intervalo)
+    finally:
+        f.close()
+
+
+def escutar_socket(caminho, parar=None, intervalo=0.2):
+    """
+    Linhas recebidas num socket UNIX em 'caminho'. Várias câmeras podem ficar
+    conectadas ao mesmo tempo (uma linha JSON por leitura).
+    """
+    parar = parar or threading.Event()
+    if os.path.exists(caminho):
+        os.remove(caminho)
+    servidor = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    servidor.bind(caminho)
+    servidor.listen()
+    servidor.setblocking(False)
+    seletor = selectors.DefaultSelector()
+    seletor.register(servidor, selectors.EVENT_READ)
+    pendentes = {}  # conexão -> bytes da linha incompleta
+    try:
+        while not parar.is_set():
+            for chave, _ in seletor.select(intervalo):
+                if chave.fileobj is servidor:
+                    conexao, _ = servidor.accept()
+                    conexao.setblocking(False)
+                    seletor.register(conexao, selectors.EVENT_READ)
+                    pendentes[conexao] = b""
+                    continue
+                conexao = chave.fileobj
+                try:
+                    recebido = conexao.recv(65536)
+                except (BlockingIOError, InterruptedError):
+                    continue
+                except ConnectionError:
+                    recebido = b""
+                if not recebido:
+                    seletor.unregister(conexao)
+                    conexao.close()
+                    del pendentes[conexao]
+                    continue
+                *linhas, pendentes[conexao] = (pendentes[conexao] + recebido).split(b"\n")
+                for linha in linhas:
+                    yield linha.decode('utf-8', errors='replace')
+    finally:
+        for conexao in pendentes:
+            conexao.close()
+        seletor.close()
+        servidor.close()
+        if os.path.exists(caminho):
+            os.remove(caminho)
+
+
+def abrir_fonte(descricao, entrada_padrao, parar=None):
+    """
+    '-' (entrada padrão, JSON lines), 'arquivo:CAMINHO' (segue o arquivo)
+    ou 'socket:CAMINHO' (socket UNIX).
+    """
+    tipo, _, caminho = descricao.partition(":")
+    if descricao == "-":
+        return entrada_padrao
+    if tipo == "arquivo" and caminho:
+        return seguir_arquivo(caminho, parar)
+    if tipo == "socket" and caminho:
+        return escutar_socket(caminho, parar)
+    raise ValueError(f"Fonte inválida: '{descricao}' (use '-', 'arquivo:CAMINHO' ou 'socket:CAMINHO').")
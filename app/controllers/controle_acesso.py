@@ -1,28 +1,77 @@
-from app.database.repositorios import RepositorioEstacionamento
+from app.database.autorizacoes import TabelaAutorizados
+from app.database.repositorios import criar_repositorio
 from app.models.pessoa import Pessoa
 from app.models.veiculo import Veiculo
+from app.utils.analise import AnaliseHistorico
 from app.utils.validadores import ValidadorCPF, ValidadorPlaca
 import csv
+import gzip
+import itertools
+
+# Linhas do CSV validadas por vez na importação (o arquivo não é carregado inteiro)
+LINHAS_POR_BLOCO = 5000
 
 class ControleEstacionamento:
-    def __init__(self):
-        self.repo = RepositorioEstacionamento()
+    def __init__(self, repo=None):
+        self.repo = repo or criar_repositorio()
+        # Resumos por dia do histórico (os dias encerrados são calculados uma vez só)
+        self._analise = AnaliseHistorico()
+
+    @staticmethod
+    def _normalizar_periodo(inicio, fim):
+        """
+        Aceita datas 'AAAA-MM-DD' (dia inteiro) ou 'AAAA-MM-DD HH:MM:SS'
+        e devolve os limites no formato gravado no histórico.
+        """
+        if inicio and len(inicio) == 10:
+            inicio += " 00:00:00"
+        if fim and len(fim) == 10:
+            fim += " 23:59:59"
+        return inicio, fim
+
+    def exportar_historico_csv(self, destino='data/relatorio_acessos.csv', inicio=None, fim=None,
+                               placa=None, tipo=None, compactar=None):
+        """
+        Gera um arquivo CSV com o histórico (todo ou filtrado).
+        Os registros são gravados à medida que são lidos, sem montar a lista inteira na memória.
+        :param destino: Caminho do arquivo ou objeto de arquivo (texto) já aberto
+        :param inicio/fim: Período 'AAAA-MM-DD' ou 'AAAA-MM-DD HH:MM:SS'
+        :param placa/tipo: Filtros opcionais
+        :param compactar: Gera .gz (se None, decide pela extensão do destino)
+        """
+        inicio, fim = self._normalizar_periodo(inicio, fim)
+        registros = self.repo.iterar_historico(inicio=inicio, fim=fim, placa=placa, tipo=tipo)
 
-    def exportar_historico_csv(self):
-        """Gera um arquivo CSV com todo o histórico."""
-        historico = self.repo.listar_historico_completo()
-        if not historico:
+        primeiro = next(registros, None)
+        if primeiro is None:
             return {"sucesso": False, "mensagem": "Histórico vazio."}
-        
+        registros = itertools.chain([primeiro], registros)
+
         try:
-            with open('data/relatorio_acessos.csv', 'w', newline='', encoding='utf-8-sig') as f:
-                escritor = csv.DictWriter(f, fieldnames=["data_hora", "tipo", "placa"])
-                escritor.writeheader()
-                escritor.writerows(historico)
-            return {"sucesso": True, "mensagem": "Arquivo 'data/relatorio_acessos.csv' gerado!"}
+            if isinstance(destino, str):
+                if compactar is None:
+                    compactar = destino.endswith(".gz")
+                abrir = gzip.open if compactar else open
+                with abrir(destino, 'wt', newline='', encoding='utf-8-sig') as f:
+                    total = self._escrever_csv(f, registros)
+                nome = destino
+            else:
+                total = self._escrever_csv(destino, registros)
+                nome = getattr(destino, "name", "destino informado")
+            return {"sucesso": True, "mensagem": f"Arquivo '{nome}' gerado! ({total} registros)"}
         except Exception as e:
             return {"sucesso": False, "mensagem": f"Erro ao exportar: {e}"}
 
+    @staticmethod
+    def _escrever_csv(arquivo, registros):
+        escritor = csv.DictWriter(arquivo, fieldnames=["data_hora", "tipo", "placa"], extrasaction='ignore')
+        escritor.writeheader()
+        total = 0
+        for registro in registros:
+            escritor.writerow(registro)
+            total += 1
+        return total
+
     def cadastrar_pessoa(self, nome, cpf, contato):
         """Cadastra um novo proprietário."""
         if self.repo.buscar_pessoa_por_cpf(cpf):
@@ -35,11 +84,13 @@ class ControleEstacionamento:
         except ValueError as e:
             return {"sucesso": False, "mensagem": f"Erro de validação: {str(e)}"}
 
-    def processar_veiculo_evento(self, placa, modelo, cor, cpf_dono, autorizado):
+    def processar_veiculo_evento(self, placa, modelo, cor, cpf_dono, autorizado, evento_id=None):
         """
         Cadastra ou Atualiza um veículo.
         Se já existe, atualiza apenas o status de autorização.
         Se não existe, cria um novo.
+        A autorização vale para o evento em andamento (ou 'evento_id'; sem
+        evento aberto, para o que está em preparação).
         """
         # Verifica dono
         dono = self.repo.buscar_pessoa_por_cpf(cpf_dono)
@@ -51,9 +102,12 @@ class ControleEstacionamento:
 
         if veiculo_existente:
             # ATUALIZAÇÃO
-            self.repo.atualizar_status_veiculo(placa, autorizado)
+            try:
+                self.repo.atualizar_status_veiculo(placa, autorizado, evento_id)
+            except ValueError as e:
+                return {"sucesso": False, "mensagem": f"Erro: {e}"}
             acao = "LIBERADO" if autorizado else "BLOQUEADO"
-            return {"sucesso": True, "mensagem": f"Veículo existente atualizado: Acesso {acao}."}
+            return {"sucesso": True, "mensagem": f"Veículo existente atualizado: Acesso {acao}.{self._aviso_evento(evento_id)}"}
         else:
             # NOVO CADASTRO
             try:
@@ -64,19 +118,155 @@ class ControleEstacionamento:
                     proprietario_cpf=cpf_dono,
                     autorizado=autorizado
                 )
-                self.repo.adicionar_veiculo(novo_carro)
+                self.repo.adicionar_veiculo(novo_carro, evento_id)
                 status_texto = "AUTORIZADO" if autorizado else "Sem permissão"
-                return {"sucesso": True, "mensagem": f"Novo veículo cadastrado e {status_texto}."}
+                aviso = self._aviso_evento(evento_id) if autorizado else ""
+                return {"sucesso": True, "mensagem": f"Novo veículo cadastrado e {status_texto}.{aviso}"}
             except ValueError as e:
                 return {"sucesso": False, "mensagem": f"Erro de validação: {str(e)}"}
 
-    def buscar_acesso(self, termo_busca):
-        from app.utils.validadores import ValidadorPlaca, ValidadorCPF
-        
-        # Se for PLACA
-        if ValidadorPlaca.validar(termo_busca):
-            veiculo = self.repo.buscar_veiculo_por_placa(termo_busca)
-            if not veiculo: return {"encontrado": False, "mensagem": "Placa não cadastrada."}
+    def _aviso_evento(self, evento_id):
+        """Avisa quando a autorização não vale agora (evento ainda não aberto)."""
+        if evento_id is None and self.repo.buscar_evento_ativo() is None:
+            return " (Nenhum evento em andamento: vale quando o próximo evento for aberto.)"
+        return ""
+
+    def aquecer(self, completo=False):
+        """Carrega o banco e os índices da portaria antes da primeira consulta (ver repo.aquecer)."""
+        self.repo.aquecer(completo)
+
+    # --- EVENTOS ---
+
+    def evento_atual(self):
+        """Resumo do evento em andamento (ou None)."""
+        return self.repo.buscar_evento_ativo()
+
+    def listar_eventos(self):
+        return self.repo.listar_eventos()
+
+    def criar_evento(self, nome, abrir=False):
+        """Cria um evento em preparação (a lista pode ser montada enquanto outro acontece)."""
+        nome = (nome or "").strip()
+        if not nome:
+            return {"sucesso": False, "mensagem": "Erro: Informe o nome do evento."}
+        try:
+            evento = self.repo.criar_evento(nome, abrir)
+        except ValueError as e:
+            return {"sucesso": False, "mensagem": f"Erro: {e}"}
+        return {"sucesso": True, "mensagem": f"Evento '{nome}' criado (nº {evento['id']}, {evento['situacao']}).", "evento": evento}
+
+    def abrir_evento(self, evento_id):
+        """Coloca o evento EM ANDAMENTO (só um por vez: o anterior precisa ter sido encerrado)."""
+        try:
+            evento_id = int(evento_id)
+        except (TypeError, ValueError):
+            return {"sucesso": False, "mensagem": "Erro: Número de evento inválido."}
+        try:
+            evento = self.repo.abrir_evento(evento_id)
+        except ValueError as e:
+            return {"sucesso": False, "mensagem": f"Erro: {e}"}
+        return {
+            "sucesso": True,
+            "mensagem": f"Evento '{evento['nome']}' EM ANDAMENTO. {evento['total_autorizados']} veículo(s) autorizado(s).",
+            "evento": evento,
+        }
+
+    def importar_csv(self, origem, delimitador=None):
+        """
+        Importa a lista da empresa (pessoas + veículos) de um CSV.
+        Colunas: nome, cpf, contato, placa, modelo, cor, autorizado
+        (linhas sem placa cadastram só a pessoa).
+
+        O arquivo é lido em blocos de LINHAS_POR_BLOCO linhas (validadas juntas)
+        e tudo é gravado de uma vez só no final. Linhas inválidas não interrompem a importação:
+        voltam na lista 'erros' com o número da linha.
+        :param origem: Caminho do arquivo ou objeto de arquivo já aberto
+        :param delimitador: ',' ou ';' (se None, detecta pela primeira linha)
+        """
+        if isinstance(origem, str):
+            try:
+                with open(origem, 'r', newline='', encoding='utf-8-sig') as f:
+                    return self.importar_csv(f, delimitador)
+            except OSError as e:
+                return {"sucesso": False, "mensagem": f"Erro ao abrir arquivo: {e}", "erros": []}
+
+        # Planilhas em português costumam sair com ';'
+        cabecalho = origem.readline()
+        if delimitador is None:
+            delimitador = ';' if cabecalho.count(';') > cabecalho.count(',') else ','
+        campos = [c.strip().lower() for c in next(csv.reader([cabecalho], delimiter=delimitador), [])]
+        leitor = csv.DictReader(origem, fieldnames=campos, delimiter=delimitador)
+
+        pessoas = {}   # cpf -> dict (a última linha do arquivo vence)
+        veiculos = {}  # placa -> dict
+        linha_da_placa = {}
+        erros = []
+        primeira = 2  # número da 1ª linha do bloco no arquivo (a 1ª é o cabeçalho)
+
+        while True:
+            linhas = list(itertools.islice(leitor, LINHAS_POR_BLOCO))
+            if not linhas:
+                break
+            # Valida os CPFs e placas do bloco de uma vez
+            cpfs = ValidadorCPF.validar_lote([linha.get("cpf") or "" for linha in linhas])
+            placas = ValidadorPlaca.validar_lote([(linha.get("placa") or "").strip() for linha in linhas])
+
+            for num, linha, cpf, placa in zip(itertools.count(primeira), linhas, cpfs, placas):
+                nome = (linha.get("nome") or "").strip()
+                if not nome:
+                    erros.append({"linha": num, "erro": "Nome do proprietário em branco."})
+                    continue
+                if cpf is None:
+                    erros.append({"linha": num, "erro": f"CPF inválido: {linha.get('cpf') or ''}"})
+                    continue
+                pessoas[cpf] = {"nome": nome, "cpf": cpf, "contato": (linha.get("contato") or "").strip()}
+
+                placa_original = (linha.get("placa") or "").strip()
+                if not placa_original:
+                    continue
+                if placa is None:
+                    erros.append({"linha": num, "erro": f"Placa inválida: {placa_original}"})
+                    continue
+                veiculos[placa] = {
+                    "placa": placa,
+                    "modelo": (linha.get("modelo") or "").strip(),
+                    "cor": (linha.get("cor") or "").strip(),
+                    "proprietario_cpf": cpf,
+                    "autorizado": (linha.get("autorizado") or "").strip().upper() in ("S", "SIM", "1", "TRUE", "X"),
+                }
+                linha_da_placa[placa] = num
+            primeira += len(linhas)
+
+        if not pessoas and not veiculos:
+            return {"sucesso": False, "mensagem": "Nenhuma linha válida para importar.", "erros": erros}
+
+        contagem, sem_dono = self.repo.importar_lote(pessoas.values(), veiculos.values())
+        for placa in sem_dono:
+            erros.append({"linha": linha_da_placa.get(placa), "erro": f"Proprietário da placa {placa} não encontrado."})
+
+        return {
+            "sucesso": True,
+            "mensagem": (f"Importação concluída: {contagem['pessoas']} pessoa(s) e "
+                         f"{contagem['veiculos']} veículo(s). {len(erros)} linha(s) com erro."),
+            "erros": erros,
+        }
+
+    def buscar_acesso(self, termo_busca, sugerir=True):
+        """
+        Consulta da portaria por placa ou CPF. Se não achar, devolve 'sugestoes'
+        (placas parecidas, trecho de placa, nome); sugerir=False pula essa busca
+        (ex.: câmeras, que não têm quem escolha uma sugestão).
+        """
+        # Se for PLACA (normalizar já devolve o termo limpo, sem validar duas vezes)
+        placa = ValidadorPlaca.normalizar(termo_busca)
+        if placa:
+            veiculo = self.repo.buscar_veiculo_por_placa(placa)
+            if not veiculo:
+                sugestoes = self.sugerir_placas_semelhantes(placa) if sugerir else []
+                if sugestoes:
+                    return {"encontrado": False, "mensagem": "Placa não cadastrada. Você quis dizer:",
+                            "sugestoes": sugestoes}
+                return {"encontrado": False, "mensagem": "Placa não cadastrada."}
             dono = self.repo.buscar_pessoa_por_cpf(veiculo.proprietario_cpf)
             return {
                 "encontrado": True, "liberado": veiculo.autorizado,
@@ -86,16 +276,13 @@ class ControleEstacionamento:
             }
 
         # Se for CPF
-        elif ValidadorCPF.validar(termo_busca):
-            pessoa = self.repo.buscar_pessoa_por_cpf(termo_busca)
+        cpf = ValidadorCPF.normalizar(termo_busca)
+        if cpf:
+            pessoa = self.repo.buscar_pessoa_por_cpf(cpf)
             if not pessoa: return {"encontrado": False, "mensagem": "CPF não cadastrado."}
             
-            # Busca todos os carros desse CPF
-            veiculos_do_dono = []
-            dados = self.repo.listar_todos_veiculos()
-            for v in dados:
-                if v['proprietario_cpf'] == pessoa.cpf:
-                    veiculos_do_dono.append(v)
+            # Busca todos os carros desse CPF (a tela espera dicionários)
+            veiculos_do_dono = [v.to_dict() for v in self.repo.buscar_veiculos_por_cpf(pessoa.cpf)]
             
             return {
                 "encontrado": True,
@@ -105,31 +292,95 @@ class ControleEstacionamento:
                 "lista_veiculos": veiculos_do_dono # Passa a lista para a tela
             }
         
+        # Nem placa nem CPF completos: sugere placas parecidas, pelo trecho de placa ou pelo nome
+        sugestoes = []
+        if sugerir:
+            sugestoes = self.sugerir_placas_semelhantes(termo_busca)
+            ja_sugeridos = {s["termo"] for s in sugestoes}
+            sugestoes += [s for s in self.sugerir_por_trecho(termo_busca) if s["termo"] not in ja_sugeridos]
+        if sugestoes:
+            return {"encontrado": False, "mensagem": "Nenhuma placa/CPF exato. Você quis dizer:", "sugestoes": sugestoes}
         return {"encontrado": False, "mensagem": "Formato inválido (Use Placa ou CPF)."}
 
-    def relatorio_veiculos_internos(self):
-        """Identifica quais veículos entraram e ainda não saíram."""
-        historico = self.repo.listar_historico_completo()
-        status_atual = {} # Placa: ultimo_movimento
+    def placa_liberada(self, placa):
+        """Só o sim/não da portaria, sem montar o Veiculo nem buscar o dono."""
+        return self.repo.placa_autorizada(placa)
+
+    def exportar_autorizados(self, destino):
+        """
+        Grava a tabela binária das placas autorizadas no evento em andamento
+        (ver app.database.autorizacoes), para uma portaria abrir com mmap.
+        """
+        evento = self.repo.buscar_evento_ativo()
+        placas = [v["placa"] for v in self.repo.listar_autorizados()] if evento else []
+        try:
+            TabelaAutorizados(placas, evento["id"] if evento else None).salvar(destino)
+        except (OSError, ValueError) as e:
+            return {"sucesso": False, "mensagem": f"Erro ao exportar: {e}"}
+        nome_evento = f"evento '{evento['nome']}'" if evento else "nenhum evento em andamento"
+        return {"sucesso": True, "mensagem": f"Arquivo '{destino}' gerado! ({len(placas)} placa(s), {nome_evento})"}
 
-        for reg in historico:
-            status_atual[reg['placa']] = reg['tipo']
+    def buscar_pessoas(self, nome, limite=10):
+        """Pessoas pelo nome (ou parte dele, sem acentos), as mais relevantes primeiro."""
+        return [
+            {"nome": p.nome, "cpf": p.cpf, "cpf_formatado": p.cpf_formatado, "contato": p.contato}
+            for p in self.repo.buscar_pessoas_por_nome(nome, limite)
+        ]
 
-        # Filtra apenas os que o último registro foi ENTRADA
-        placas_dentro = [p for p, tipo in status_atual.items() if tipo == 'ENTRADA']
-        
-        resultado = []
-        for placa in placas_dentro:
-            v = self.repo.buscar_veiculo_por_placa(placa)
-            if v:
-                dono = self.repo.buscar_pessoa_por_cpf(v.proprietario_cpf)
-                resultado.append({
-                    "placa": v.placa,
-                    "modelo": v.modelo,
-                    "dono": dono.nome if dono else "Desconhecido"
-                })
+    def buscar_placas(self, trecho, limite=10):
+        """Veículos pelo pedaço da placa que o porteiro conseguiu ler (ex: '1234')."""
+        return [v.to_dict() for v in self.repo.buscar_veiculos_por_trecho_placa(trecho, limite)]
+
+    def sugerir_placas_semelhantes(self, termo, limite=5):
+        """
+        Placas cadastradas parecidas com uma placa mal lida ou mal digitada
+        (O/0, I/1, B/8..., um caractere trocado, faltando, sobrando ou invertido).
+        """
+        limpo = ValidadorPlaca.limpar(termo or "")
+        if not 6 <= len(limpo) <= 8 or not any(c.isdigit() for c in limpo):
+            return []
+        return [
+            {"termo": v.placa, "descricao": f"Placa {v.placa} - {v.modelo}"}
+            for v in self.repo.buscar_veiculos_semelhantes(limpo, limite)
+        ]
+
+    def sugerir_por_trecho(self, termo, limite=5):
+        """
+        Sugestões para um termo incompleto: trecho de placa (3 a 6 letras/números)
+        e/ou parte do nome. Cada sugestão traz o 'termo' a consultar (placa ou CPF).
+        """
+        termo = (termo or "").strip()
+        if len(termo) < 3:
+            return []
+        sugestoes = []
+        if 3 <= len(ValidadorPlaca.limpar(termo)) <= 6 and not any(c.isspace() for c in termo):
+            for v in self.buscar_placas(termo, limite):
+                sugestoes.append({"termo": v["placa"], "descricao": f"Placa {v['placa']} - {v['modelo']}"})
+        if any(c.isalpha() for c in termo):
+            for p in self.buscar_pessoas(termo, limite):
+                sugestoes.append({"termo": p["cpf"], "descricao": f"{p['nome']} - CPF {p['cpf_formatado']}"})
+        return sugestoes
+
+    def relatorio_veiculos_internos(self):
+        """
+        Identifica quais veículos entraram e ainda não saíram.
+        Usa a ocupação mantida a cada ENTRADA/SAIDA (não repassa o histórico)
+        e junta veículo e dono numa única consulta ao repositório.
+        """
+        resultado = self.repo.listar_ocupacao_com_dono()
+        for linha in resultado:
+            linha["dono"] = linha["dono"] or "Desconhecido"
         return resultado
 
+    def ocupacao_atual(self):
+        """Quantidade de veículos no pátio agora."""
+        return self.repo.contar_ocupacao()
+
+    def recalcular_ocupacao(self):
+        """Reconstrói a ocupação a partir do histórico (manutenção)."""
+        qtd = self.repo.reconstruir_ocupacao()
+        return {"sucesso": True, "mensagem": f"Ocupação recalculada: {qtd} veículo(s) no pátio."}
+
     def registrar_fluxo(self, placa, tipo):
         """Registra a entrada/saída no histórico."""
         veiculo = self.repo.buscar_veiculo_por_placa(placa)
@@ -139,36 +390,86 @@ class ControleEstacionamento:
         self.repo.registrar_movimentacao(placa, tipo)
         return {"sucesso": True, "mensagem": f"Sucesso: {tipo} registrada para {veiculo.modelo} ({placa})."}
 
-    def relatorio_autorizados(self):
-        """Gera lista para o relatório de autorizados."""
-        veiculos = self.repo.listar_todos_veiculos()
+    def relatorio_autorizados(self, evento_id=None):
+        """Gera lista para o relatório de autorizados (do evento em andamento ou do informado)."""
+        # Veículos já com o nome do dono (uma consulta só, não uma por veículo)
+        veiculos = self.repo.listar_autorizados_com_dono(evento_id)
         resultado = []
 
         for v in veiculos:
-            if v.get("autorizado"):
-                dono = self.repo.buscar_pessoa_por_cpf(v["proprietario_cpf"])
-                nome_dono = dono.nome if dono else "Dono Desconhecido"
-                
-                linha = {
-                    "dono": nome_dono,
-                    "modelo": v["modelo"],
-                    "placa": v["placa"],
-                    "cor": v.get("cor", "-")
-                }
-                resultado.append(linha)
+            linha = {
+                "dono": v["dono"] or "Dono Desconhecido",
+                "modelo": v["modelo"],
+                "placa": v["placa"],
+                "cor": v.get("cor", "-")
+            }
+            resultado.append(linha)
         
         resultado.sort(key=lambda x: x["dono"])
         return resultado
 
-    def relatorio_historico(self):
-        """Gera lista para o histórico."""
+    def relatorio_historico(self, limite=None):
+        """
+        Gera lista para o histórico (mais recente primeiro).
+        :param limite: Só os N últimos (não percorre o histórico inteiro)
+        """
+        if limite is not None:
+            return self.repo.ultimos_movimentos(limite)
         registros = self.repo.listar_historico_completo()
         return registros[::-1] # Inverte para mostrar mais recente primeiro
 
+    def historico_periodo(self, inicio, fim):
+        """Movimentações entre duas datas ('AAAA-MM-DD' ou 'AAAA-MM-DD HH:MM:SS'), em ordem cronológica."""
+        inicio, fim = self._normalizar_periodo(inicio, fim)
+        return self.repo.historico_entre(inicio, fim)
+
+    def historico_veiculo(self, placa):
+        """Linha do tempo (entradas e saídas) de uma placa, em ordem cronológica."""
+        placa_limpa = ValidadorPlaca.normalizar(placa)
+        if not placa_limpa:
+            return []
+        return self.repo.historico_da_placa(placa_limpa)
+
+    # --- ESTATÍSTICAS ---
+
+    def _resumos_periodo(self, inicio, fim):
+        """Resumos diários entre duas datas 'AAAA-MM-DD' (None = desde o início / até hoje)."""
+        return self._analise.resumos(self.repo, inicio[:10] if inicio else None, fim[:10] if fim else None)
+
+    def relatorio_fluxo_horario(self, inicio=None, fim=None):
+        """Entradas e saídas por hora do dia (00:00 a 23:00), somadas no período."""
+        return AnaliseHistorico.fluxo_por_hora(self._resumos_periodo(inicio, fim))
+
+    def relatorio_pico_ocupacao(self, inicio=None, fim=None):
+        """Maior nº de veículos simultâneos no pátio no período e quando aconteceu."""
+        return AnaliseHistorico.pico_ocupacao(self._resumos_periodo(inicio, fim))
+
+    def relatorio_permanencia(self, inicio=None, fim=None):
+        """Tempo de permanência (média, p50, p95 e máximo, em minutos) das estadias encerradas no período."""
+        return AnaliseHistorico.permanencia(self._resumos_periodo(inicio, fim))
+
+    def relatorio_visitantes_recorrentes(self, inicio=None, fim=None, limite=10):
+        """Veículos que entraram mais de uma vez no período (os 'limite' mais frequentes)."""
+        return AnaliseHistorico.visitantes(self._resumos_periodo(inicio, fim), limite)
+
+    def relatorio_estatisticas(self, inicio=None, fim=None, limite=10):
+        """Os quatro relatórios acima de uma vez (uma única leitura do período)."""
+        resumos = self._resumos_periodo(inicio, fim)
+        return {
+            "dias": len(resumos),
+            "fluxo_por_hora": AnaliseHistorico.fluxo_por_hora(resumos),
+            "pico_ocupacao": AnaliseHistorico.pico_ocupacao(resumos),
+            "permanencia": AnaliseHistorico.permanencia(resumos),
+            "visitantes": AnaliseHistorico.visitantes(resumos, limite),
+        }
+
     def encerrar_evento(self):
-        """Zera as permissões."""
-        qtd = self.repo.resetar_todas_autorizacoes()
-        if qtd > 0:
-            return {"sucesso": True, "mensagem": f"EVENTO ENCERRADO! {qtd} veículos foram bloqueados."}
-        else:
-            return {"sucesso": True, "mensagem": "Evento encerrado. Todos já estavam bloqueados."}
\ No newline at end of file
+        """
+        Encerra o evento em andamento: ninguém da lista dele passa mais a ser
+        LIBERADO. Só fecha a janela do evento (não reescreve cada veículo).
+        """
+        evento = self.repo.encerrar_evento_ativo()
+        if evento is None:
+            return {"sucesso": True, "mensagem": "Nenhum evento em andamento. Todos já estavam bloqueados."}
+        qtd = evento["total_autorizados"]
+        return {"sucesso": True, "mensagem": f"EVENTO '{evento['nome']}' ENCERRADO! {qtd} veículos foram bloqueados."}
\ No newline at end of file
@@ -0,0 +1,278 @@
+"""
+Conjunto compacto das placas autorizadas no evento em andamento.
+
+A pergunta mais comum da portaria é só "esta placa pode entrar agora?".
+Em vez de ler o banco e montar um Veiculo, a resposta sai de uma tabela
+hash de inteiros:
+
+  - Cada placa (7 letras/números, padrão antigo ou Mercosul) vira um
+    inteiro de largura fixa (base 36, cabe em 37 bits); o 0 marca espaço vazio.
+  - Os inteiros ficam numa tabela de endereçamento aberto (sondagem
+    linear), com no máximo metade das posições ocupadas: a consulta
+    confere 1 ou 2 posições em média, O(1).
+  - A mesma sequência de bytes é o arquivo: um processo de portaria pode
+    abrir o arquivo com mmap (LeitorAutorizados) e consultar sem carregar o
+    banco; são 8 bytes por posição (~2 MiB para 100 mil placas autorizadas).
+
+Arquivo: cabeçalho (CABECALHO) + 'capacidade' posições de 8 bytes (little-endian).
+"""
+import mmap
+import os
+import struct
+import tempfile
+import time
+
+from app.utils.validadores import ValidadorPlaca
+
+MAGICO = b"AUTZ"
+VERSAO = 1
+# mágico, versão, reservado, id do evento (-1 = nenhum), placas, capacidade
+CABECALHO = struct.Struct("<4sHHqII")
+POSICAO = struct.Struct("<Q")
+CAPACIDADE_MINIMA = 16
+
+_ALFABETO = "0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ"
+_MASCARA_64 = (1 << 64) - 1
+_FIBONACCI = 0x9E3779B97F4A7C15  # Espalha códigos vizinhos (ABC1234, ABC1235...) pela tabela
+
+
+class ArquivoAutorizadosInvalido(Exception):
+    """O arquivo não é uma tabela de autorizados (ou é de outra versão)."""
+
+
+def codificar_placa(placa: str) -> int:
+    """'ABC-1D23' -> inteiro de largura fixa (nunca 0). ValueError se não tiver 7 letras/números."""
+    limpa = ValidadorPlaca.limpar(placa)  # Só sobram A-Z e 0-9: os algarismos da base 36
+    if len(limpa) != 7:
+        raise ValueError(f"Placa inválida para a tabela de autorizados: '{placa}'")
+    return int(limpa, 36) + 1
+
+
+def decodificar_placa(codigo: int) -> str:
+    codigo -= 1
+    caracteres = []
+    for _ in range(7):
+        codigo, valor = divmod(codigo, 36)
+        caracteres.append(_ALFABETO[valor])
+    return "".join(reversed(caracteres))
+
+
+def _capacidade_para(total):
+    """Menor potência de 2 que deixa a tabela no máximo meio cheia."""
+    capacidade = CAPACIDADE_MINIMA
+    while capacidade < total * 2:
+        capacidade *= 2
+    return capacidade
+
+
+class TabelaAutorizados:
+    """
+    Tabela hash de placas codificadas (ver codificar_placa). Em memória
+    (bytearray) aceita adicionar/remover; aberta de um arquivo (abrir) é
+    somente leitura.
+    """
+
+    __slots__ = ("evento_id", "_buffer", "_capacidade", "_deslocamento", "_total", "_somente_leitura")
+
+    def __init__(self, placas=(), evento_id=None):
+        self.evento_id = evento_id
+        codigos = {codificar_placa(p) for p in placas}
+        self._somente_leitura = False
+        self._montar(_capacidade_para(len(codigos)))
+        for codigo in codigos:
+            self._inserir(codigo)
+
+    def _montar(self, capacidade):
+        self._buffer = bytearray(CABECALHO.size + capacidade * POSICAO.size)
+        self._capacidade = capacidade
+        self._deslocamento = 64 - (capacidade.bit_length() - 1)
+        self._total = 0
+
+    @classmethod
+    def _sobre(cls, buffer, evento_id, total, capacidade):
+        tabela = cls.__new__(cls)
+        tabela.evento_id = evento_id
+        tabela._buffer = buffer
+        tabela._capacidade = capacidade
+        tabela._deslocamento = 64 - (capacidade.bit_length() - 1)
+        tabela._total = total
+        tabela._somente_leitura = True
+        return tabela
+
+    def __len__(self):
+        return self._total
+
+    # --- POSIÇÕES ---
+
+    def _inicio(self, codigo):
+        return ((codigo * _FIBONACCI) & _MASCARA_64) >> self._deslocamento
+
+    def _ler(self, i):
+        return POSICAO.unpack_from(self._buffer, CABECALHO.size + i * POSICAO.size)[0]
+
+    def _escrever(self, i, codigo):
+        POSICAO.pack_into(self._buffer, CABECALHO.size + i * POSICAO.size, codigo)
+
+    def _procurar(self, codigo):
+        """Posição do código na tabela, ou a posição vazia onde ele entraria (e False)."""
+        mascara = self._capacidade - 1
+        i = self._inicio(codigo)
+        while True:
+            atual = self._ler(i)
+            if atual == codigo:
+                return i, True
+            if atual == 0:
+                return i, False
+            i = (i + 1) & mascara
+
+    # --- CONSULTA ---
+
+    def __contains__(self, placa):
+        try:
+            codigo = codificar_placa(placa)
+        except ValueError:
+            return False
+        return self._procurar(codigo)[1]
+
+    def __iter__(self):
+        """Placas da tabela (sem ordem definida)."""
+        for i in range(self._capacidade):
+            codigo = self._ler(i)
+            if codigo:
+                yield decodificar_placa(codigo)
+
+    # --- ALTERAÇÃO (SÓ EM MEMÓRIA) ---
+
+    def _inserir(self, codigo):
+        i, existe = self._procurar(codigo)
+        if not existe:
+            self._escrever(i, codigo)
+            self._total += 1
+        return not existe
+
+    def adicionar(self, placa):
+        """Autoriza a placa. True se ela ainda não estava na tabela."""
+        if self._somente_leitura:
+            raise TypeError("Tabela aberta de arquivo é somente leitura.")
+        codigo = codificar_placa(placa)
+        if (self._total + 1) * 2 > self._capacidade:
+            codigos = [self._ler(i) for i in range(self._capacidade)]
+            self._montar(self._capacidade * 2)
+            for antigo in codigos:
+                if antigo:
+                    self._inserir(antigo)
+        return self._inserir(codigo)
+
+    def remover(self, placa):
+        """Retira a placa. True se ela estava na tabela."""
+        if self._somente_leitura:
+            raise TypeError("Tabela aberta de arquivo é somente leitura.")
+        try:
+            codigo = codificar_placa(placa)
+        except ValueError:
+            return False
+        vazio, existe = self._procurar(codigo)
+        if not existe:
+            return False
+        # Remoção sem lápide: puxa para trás quem ficaria inalcançável depois do buraco
+        mascara = self._capacidade - 1
+        j = vazio
+        while True:
+            j = (j + 1) & mascara
+            atual = self._ler(j)
+            if atual == 0:
+                break
+            inicio = self._inicio(atual)
+            # 'atual' só pode ir para o buraco se o início dele NÃO estiver entre o buraco e j
+            if (vazio < j and vazio < inicio <= j) or (vazio > j and (inicio > vazio or inicio <= j)):
+                continue
+            self._escrever(vazio, atual)
+            vazio = j
+        self._escrever(vazio, 0)
+        self._total -= 1
+        return True
+
+    # --- ARQUIVO ---
+
+    def _cabecalho(self) -> bytes:
+        evento_id = -1 if self.evento_id is None else self.evento_id
+        return CABECALHO.pack(MAGICO, VERSAO, 0, evento_id, self._total, self._capacidade)
+
+    def salvar(self, caminho):
+        """Grava a tabela em 'caminho', trocando o arquivo atomicamente (leitores nunca veem meio arquivo)."""
+        pasta = os.path.dirname(caminho) or "."
+        os.makedirs(pasta, exist_ok=True)
+        descritor, temporario = tempfile.mkstemp(prefix=".autorizados-", suffix=".tmp", dir=pasta)
+        try:
+            with os.fdopen(descritor, 'wb') as f:
+                os.fchmod(f.fileno(), 0o644)  # mkstemp cria 0600; a portaria pode rodar com outro usuário
+                f.write(self._cabecalho())
+                f.write(memoryview(self._buffer)[CABECALHO.size:])
+            os.replace(temporario, caminho)
+        except BaseException:
+            if os.path.exists(temporario):
+                os.remove(temporario)
+            raise
+
+    @classmethod
+    def abrir(cls, caminho):
+        """Tabela somente leitura sobre o arquivo mapeado em memória (mmap): não lê o arquivo inteiro."""
+        with open(caminho, 'rb') as f:
+            tamanho = os.fstat(f.fileno()).st_size
+            if tamanho < CABECALHO.size:
+                raise ArquivoAutorizadosInvalido(f"'{caminho}' é pequeno demais.")
+            mapa = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magico, versao, _, evento_id, total, capacidade = CABECALHO.unpack_from(mapa, 0)
+        if (magico != MAGICO or versao != VERSAO or capacidade < CAPACIDADE_MINIMA
+                or capacidade & (capacidade - 1)
+                or tamanho != CABECALHO.size + capacidade * POSICAO.size):
+            mapa.close()
+            raise ArquivoAutorizadosInvalido(f"'{caminho}' não é uma tabela de autorizados (versão {VERSAO}).")
+        return cls._sobre(mapa, None if evento_id < 0 else evento_id, total, capacidade)
+
+    def fechar(self):
+        if isinstance(self._buffer, mmap.mmap):
+            self._buffer.close()
+
+
+class LeitorAutorizados:
+    """
+    Consulta de um processo de portaria ao arquivo de autorizados (mmap).
+    Quem grava troca o arquivo inteiro (os.replace); de 'intervalo' em
+    'intervalo' segundos o leitor confere se o arquivo mudou e remapeia.
+    """
+
+    def __init__(self, caminho, intervalo=1.0):
+        self.caminho = caminho
+        self.intervalo = intervalo
+        self._tabela = TabelaAutorizados.abrir(caminho)
+        self._identidade = self._identificar()
+        self._proxima_conferencia = time.monotonic() + intervalo
+
+    def _identificar(self):
+        estado = os.stat(self.caminho)
+        return estado.st_ino, estado.st_mtime_ns, estado.st_size
+
+    def _conferir(self):
+        self._proxima_conferencia = time.monotonic() + self.intervalo
+        try:
+            identidade = self._identificar()
+            if identidade == self._identidade:
+                return
+            nova = TabelaAutorizados.abrir(self.caminho)
+        except (FileNotFoundError, ArquivoAutorizadosInvalido):
+            return  # Continua com a última tabela válida
+        # A tabela antiga não é fechada aqui: outra thread pode estar no meio de uma consulta
+        self._tabela, self._identidade = nova, identidade
+
+    @property
+    def tabela(self):
+        if time.monotonic() >= self._proxima_conferencia:
+            self._conferir()
+        return self._tabela
+
+    def autorizada(self, placa) -> bool:
+        return placa in self.tabela
+
+    def fechar(self):
+        self._tabela.fechar()
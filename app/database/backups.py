@@ -0,0 +1,361 @@
+import gzip
+import hashlib
+import json
+import os
+import shutil
+import struct
+import tempfile
+import zlib
+from collections import Counter
+from datetime import datetime
+
+from app.database.conexao import (BancoCorrompido, BancoDeDadosDiario, BancoDeDadosJson, FormatoIndisponivel,
+                                  atualizar_ocupacao, completar_dados, decodificar, travar)
+from app.database.particoes import HistoricoParticionado, ParticoesHistorico
+
+# Descrição de cada cópia. É gravada por último: pasta sem ela é uma cópia interrompida
+MANIFESTO = "manifesto.json"
+BLOCO = 1024 * 1024
+
+
+class BackupInvalido(Exception):
+    """A cópia não existe, está incompleta ou não confere com as somas de verificação."""
+
+
+def _copiar(origem, destino, tamanho, compactar):
+    """Copia os 'tamanho' primeiros bytes (com gzip, se pedido) e devolve o sha256 deles."""
+    soma = hashlib.sha256()
+    saida = gzip.open(destino, 'wb', compresslevel=6) if compactar else open(destino, 'wb')
+    with open(origem, 'rb') as entrada, saida:
+        restante = tamanho
+        while restante:
+            bloco = entrada.read(min(BLOCO, restante))
+            if not bloco:
+                break
+            soma.update(bloco)
+            saida.write(bloco)
+            restante -= len(bloco)
+    return soma.hexdigest()
+
+
+def _ler_prefixo(caminho, tamanho, compactado):
+    """Os 'tamanho' primeiros bytes do conteúdo (descompactado, se for uma cópia gzip)."""
+    with (gzip.open if compactado else open)(caminho, 'rb') as f:
+        return f.read(tamanho)
+
+
+def _ordem_da_copia(manifesto):
+    """Chave de ordenação das cópias: a sequência (cópias antigas, sem ela, vêm antes) e, no empate, a hora."""
+    return manifesto.get("sequencia", 0), manifesto["criado_em"], manifesto["nome"]
+
+
+def _fim_do_periodo(data_hora):
+    """'AAAA-MM-DD' vale até o fim do dia."""
+    return data_hora + " 23:59:59" if data_hora and len(data_hora) == 10 else data_hora
+
+
+class BackupsBanco:
+    """
+    Cópias de segurança de um banco JSON (modos json, diario e grupo), na
+    pasta '<nome>.backups/', uma subpasta por cópia com os mesmos nomes de
+    arquivo do banco (JSON principal, arquivos diários do histórico e diário
+    de movimentações) e um manifesto com o tamanho e o sha256 de cada um.
+
+    - Custo por gravação zero: o banco só é copiado de tempos em tempos
+      (backup_horas) ou quando alguém pede.
+    - Os arquivos do histórico por dia e do diário só crescem (nunca são
+      reescritos no lugar), então são copiados por link (hard link):
+      instantâneo e sem ocupar espaço, e o manifesto guarda até que byte
+      cada um faz parte da cópia. O JSON principal, e qualquer arquivo onde
+      não há link (outro disco, sistema de arquivos sem suporte), vira uma
+      cópia compactada com gzip.
+    - Guarda as 'geracoes' cópias mais recentes.
+    - restaurar(ate=...) volta o banco a um instante: parte da última cópia
+      até ele e refaz as movimentações registradas depois dela.
+    """
+
+    def __init__(self, arquivo="data/estacionamento.json", geracoes=7):
+        self.arquivo = arquivo
+        self.geracoes = geracoes
+        base = os.path.splitext(arquivo)[0]
+        self.pasta = base + ".backups"
+        self.pasta_banco = os.path.dirname(arquivo) or "."
+        self.pasta_particoes = base + ".historico"
+        # Mesma ordem em que BancoDeDadosDiario mescla os diários
+        self.diarios = [base + ".diario.compactando.jsonl", base + ".diario.jsonl"]
+
+    # --- CRIAÇÃO ---
+
+    def _arquivos(self):
+        """{caminho: bytes que fazem parte do banco} neste instante (sob trava)."""
+        arquivos = {self.arquivo: os.path.getsize(self.arquivo)}
+        if os.path.isdir(self.pasta_particoes):
+            # Do dia aberto, só o que o manifesto já confirmou (o resto pode ser descartado)
+            try:
+                with open(self.arquivo, 'rb') as f:
+                    manifesto = decodificar(f.read()).get("particoes", {})
+            except (ValueError, UnicodeDecodeError, FormatoIndisponivel, struct.error, KeyError, IndexError):
+                manifesto = {}  # JSON corrompido: a cópia guarda só ele, para análise
+            for dia, info in manifesto.items():
+                aberto = os.path.join(self.pasta_particoes, f"{dia}.jsonl")
+                if os.path.exists(aberto):
+                    arquivos[aberto] = info["bytes"]
+                elif os.path.exists(aberto + ".gz"):
+                    arquivos[aberto + ".gz"] = os.path.getsize(aberto + ".gz")
+        for diario in self.diarios:
+            if os.path.exists(diario):
+                arquivos[diario] = os.path.getsize(diario)
+        return arquivos
+
+    def _novo_nome(self, sequencia):
+        """A hora; se já há cópia desse segundo, a hora e a sequência (sem repetir um nome já descartado)."""
+        nome = datetime.now().strftime("%Y%m%d-%H%M%S")
+        if any(n == nome or n.startswith(nome + "-") for n in os.listdir(self.pasta)):
+            nome = f"{nome}-{sequencia}"
+        sufixo = 1
+        while os.path.exists(os.path.join(self.pasta, nome if sufixo == 1 else f"{nome}-{sufixo}")):
+            sufixo += 1  # Nome já usado por uma cópia antiga (numerada antes da sequência)
+        return nome if sufixo == 1 else f"{nome}-{sufixo}"
+
+    def criar(self, motivo="manual"):
+        """Tira uma cópia do banco como está agora e descarta as mais antigas. Retorna o manifesto."""
+        os.makedirs(self.pasta, exist_ok=True)
+        temporaria = tempfile.mkdtemp(prefix=".copia-", dir=self.pasta)
+        try:
+            entradas = {}
+            compactar_depois = {}  # relativo (.gz) -> arquivo ligado/copiado sem compactar
+            # Trava compartilhada: ninguém grava enquanto os arquivos são ligados/copiados.
+            # Sob ela só link ou cópia simples; gzip e sha256 ficam para depois dela
+            with travar(self.arquivo + ".lock") as trava:
+                criado_em = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+                versao = BancoDeDadosJson._ler_versao(trava)
+                for caminho, tamanho in self._arquivos().items():
+                    relativo = os.path.relpath(caminho, self.pasta_banco)
+                    destino = os.path.join(temporaria, relativo)
+                    os.makedirs(os.path.dirname(destino), exist_ok=True)
+                    # O JSON principal é guardado compactado (ele é sempre trocado por inteiro
+                    # com os.replace, então o conteúdo ligado não muda depois da trava)
+                    compactar = caminho == self.arquivo
+                    bruto = destino + ".bruto" if compactar else destino
+                    try:
+                        os.link(caminho, bruto)
+                    except OSError:
+                        # Outro disco, sem suporte a link: cópia simples (compactada depois)
+                        compactar = not caminho.endswith(".gz")
+                        bruto = destino + ".bruto" if compactar else destino
+                        _copiar(caminho, bruto, tamanho, False)
+                    if compactar:
+                        relativo += ".gz"
+                        compactar_depois[relativo] = bruto
+                    entradas[relativo] = {"bytes": tamanho, "compactado": compactar}
+
+            # Fora da trava: o conteúdo ligado/copiado não muda mais até 'bytes'
+            for relativo, entrada in entradas.items():
+                caminho = os.path.join(temporaria, relativo)
+                if relativo in compactar_depois:
+                    bruto = compactar_depois[relativo]
+                    entrada["sha256"] = _copiar(bruto, caminho, entrada["bytes"], True)
+                    os.remove(bruto)
+                else:
+                    conteudo = _ler_prefixo(caminho, entrada["bytes"], False)
+                    entrada["sha256"] = hashlib.sha256(conteudo).hexdigest()
+
+            # Quem dá a ordem das cópias é a sequência, sempre maior que a da mais recente
+            # (várias cópias no mesmo segundo têm a mesma hora)
+            sequencia = max((m.get("sequencia", 0) for m in self.listar()), default=0) + 1
+            nome = self._novo_nome(sequencia)
+            manifesto = {"nome": nome, "sequencia": sequencia, "criado_em": criado_em, "versao": versao,
+                         "motivo": motivo, "arquivos": entradas}
+            with open(os.path.join(temporaria, MANIFESTO), 'w', encoding='utf-8') as f:
+                json.dump(manifesto, f, indent=4, ensure_ascii=False)
+            os.rename(temporaria, os.path.join(self.pasta, nome))
+        except BaseException:
+            shutil.rmtree(temporaria, ignore_errors=True)
+            raise
+
+        self._descartar_antigas()
+        return manifesto
+
+    def _descartar_antigas(self):
+        for manifesto in self.listar()[:-self.geracoes or None]:
+            shutil.rmtree(os.path.join(self.pasta, manifesto["nome"]), ignore_errors=True)
+        # Sobras de cópias interrompidas (uma hora sem terminar)
+        for nome in os.listdir(self.pasta):
+            caminho = os.path.join(self.pasta, nome)
+            if nome.startswith(".copia-") and datetime.now().timestamp() - os.path.getmtime(caminho) > 3600:
+                shutil.rmtree(caminho, ignore_errors=True)
+
+    # --- CONSULTA ---
+
+    def listar(self):
+        """Manifestos das cópias completas, da mais antiga para a mais recente."""
+        if not os.path.isdir(self.pasta):
+            return []
+        copias = []
+        for nome in os.listdir(self.pasta):
+            if nome.startswith("."):
+                continue  # cópia em andamento
+            try:
+                with open(os.path.join(self.pasta, nome, MANIFESTO), 'r', encoding='utf-8') as f:
+                    copias.append(json.load(f))
+            except (FileNotFoundError, NotADirectoryError, json.JSONDecodeError):
+                continue
+        return sorted(copias, key=_ordem_da_copia)
+
+    def _manifesto(self, nome):
+        for manifesto in self.listar():
+            if manifesto["nome"] == nome:
+                return manifesto
+        raise BackupInvalido(f"Cópia '{nome}' não encontrada em '{self.pasta}'.")
+
+    def verificar(self, nome=None):
+        """
+        Confere as somas de verificação de uma cópia (ou de todas).
+        Retorna [{'nome', 'criado_em', 'erros': [...]}].
+        """
+        manifestos = [self._manifesto(nome)] if nome else self.listar()
+        return [{"nome": m["nome"], "criado_em": m["criado_em"], "erros": self._conferir(m)} for m in manifestos]
+
+    def _conferir(self, manifesto):
+        erros = []
+        for relativo, entrada in manifesto["arquivos"].items():
+            caminho = os.path.join(self.pasta, manifesto["nome"], relativo)
+            try:
+                conteudo = _ler_prefixo(caminho, entrada["bytes"], entrada["compactado"])
+            except (OSError, EOFError, zlib.error) as erro:  # zlib.error: gzip com bytes trocados
+                erros.append(f"{relativo}: {erro}")
+                continue
+            if len(conteudo) != entrada["bytes"] or hashlib.sha256(conteudo).hexdigest() != entrada["sha256"]:
+                erros.append(f"{relativo}: conteúdo não confere com o sha256")
+        return erros
+
+    def ler(self, nome):
+        """Conteúdo do banco na cópia 'nome' (como ler() de um banco aberto), depois de conferi-la."""
+        manifesto = self._manifesto(nome)
+        erros = self._conferir(manifesto)
+        if erros:
+            raise BackupInvalido(f"Cópia '{nome}' inválida: " + "; ".join(erros))
+        pasta = os.path.join(self.pasta, nome)
+        arquivos = manifesto["arquivos"]
+
+        def conteudo(caminho):
+            relativo = os.path.relpath(caminho, self.pasta_banco)
+            for candidato in (relativo, relativo + ".gz"):
+                if candidato in arquivos:
+                    entrada = arquivos[candidato]
+                    return _ler_prefixo(os.path.join(pasta, candidato), entrada["bytes"], entrada["compactado"])
+            return None
+
+        try:
+            dados = decodificar(conteudo(self.arquivo))
+        except (ValueError, UnicodeDecodeError, struct.error, KeyError, IndexError) as erro:
+            # Ex.: cópia tirada antes de restaurar um banco que já estava corrompido
+            raise BackupInvalido(f"Cópia '{nome}' não tem um banco legível: {erro}") from erro
+        if "particoes" in dados:
+            particoes = ParticoesHistorico(os.path.join(pasta, os.path.relpath(self.pasta_particoes, self.pasta_banco)))
+            dados["historico"] = HistoricoParticionado(particoes, dados.pop("particoes")).to_list()
+            dados["_particionado"] = True
+        completar_dados(dados)
+
+        # Linhas do diário ainda não incorporadas ao JSON (mesma regra de BancoDeDadosDiario._mesclar)
+        ultima = dados.get("_seq", 0)
+        for diario in self.diarios:
+            for linha in (conteudo(diario) or b"").decode('utf-8').splitlines(keepends=True):
+                if not linha.endswith("\n"):
+                    break
+                try:
+                    registro = json.loads(linha)
+                except json.JSONDecodeError:
+                    continue
+                seq = registro.pop("seq", 0)
+                if seq > ultima:
+                    dados["historico"].append(registro)
+                    atualizar_ocupacao(dados["ocupacao"], registro)
+                    ultima = seq
+        dados["_seq"] = ultima
+        return dados
+
+    # --- RESTAURAÇÃO ---
+
+    def _historico_posterior(self, copia):
+        """
+        O registro de movimentações mais novo que se consegue ler: o do banco
+        atual ou, se ele estiver corrompido, o da cópia válida mais recente.
+        """
+        if os.path.exists(self.arquivo):
+            try:
+                return BancoDeDadosDiario(self.arquivo).ler()["historico"]
+            except (BancoCorrompido, OSError, ValueError, KeyError):
+                pass
+        for manifesto in reversed(self.listar()):
+            if _ordem_da_copia(manifesto) <= _ordem_da_copia(copia):
+                break
+            try:
+                return self.ler(manifesto["nome"])["historico"]
+            except (BackupInvalido, OSError, ValueError):
+                continue
+        return []
+
+    @staticmethod
+    def _movimentos_depois(base, registro):
+        """Movimentações de 'registro' que vieram depois das de 'base' (o histórico só cresce)."""
+        n = len(base)
+        if len(registro) >= n and (n == 0 or registro[n - 1] == base[n - 1]):
+            return list(registro[n:])
+        # Prefixo diferente (ex.: histórico particionado, reordenado por dia): vale o que
+        # falta na cópia, contando repetições; a 'data_hora' não dá a ordem de gravação
+        faltando = Counter((r["placa"], r["tipo"], r["data_hora"]) for r in registro)
+        faltando.subtract((r["placa"], r["tipo"], r["data_hora"]) for r in base)
+        novos = []
+        for r in registro:
+            chave = (r["placa"], r["tipo"], r["data_hora"])
+            if faltando[chave] > 0:
+                faltando[chave] -= 1
+                novos.append(r)
+        return novos
+
+    def restaurar(self, ate=None, destino=None):
+        """
+        Volta o banco ao instante 'ate' ('AAAA-MM-DD [HH:MM:SS]'; padrão: agora):
+        parte da cópia válida mais recente feita até 'ate' e refaz por cima as
+        movimentações registradas depois dela (até 'ate'). Pessoas, veículos e
+        eventos ficam como estavam na cópia.
+        Sobrescrever o banco atual (destino padrão) tira antes uma cópia dele.
+        O sistema deve estar parado durante a restauração.
+        """
+        ate = _fim_do_periodo(ate)
+        candidatas = [m for m in self.listar() if not ate or m["criado_em"] <= ate]
+        ignoradas = []
+        for copia in reversed(candidatas):
+            try:
+                dados = self.ler(copia["nome"])
+                break
+            except BackupInvalido:
+                ignoradas.append(copia["nome"])
+        else:
+            raise BackupInvalido("Nenhuma cópia de segurança válida" + (f" até {ate}." if ate else "."))
+
+        novos = self._movimentos_depois(dados["historico"], self._historico_posterior(copia))
+        if ate:
+            novos = [r for r in novos if r["data_hora"] <= ate]
+        for registro in novos:
+            dados["historico"].append(registro)
+            atualizar_ocupacao(dados["ocupacao"], registro)
+
+        destino = destino or self.arquivo
+        if os.path.abspath(destino) == os.path.abspath(self.arquivo) and os.path.exists(destino):
+            self.criar(motivo="antes_de_restaurar")
+        particionar = dados.pop("_particionado", False)
+        try:
+            banco = BancoDeDadosDiario(destino, particionar=particionar)
+        except BancoCorrompido:
+            # Arquivo ilegível no destino: fica guardado ao lado, para análise
+            os.replace(destino, destino + ".corrompido")
+            banco = BancoDeDadosDiario(destino, particionar=particionar)
+        try:
+            banco.salvar(dados)
+        finally:
+            banco.fechar()
+
+        return {"copia": copia["nome"], "criado_em": copia["criado_em"], "movimentos_refeitos": len(novos),
+                "destino": destino, "ignoradas": ignoradas}
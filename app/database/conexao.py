@@ -1,16 +1,404 @@
+import atexit
 import json
-import shutil
+from collections import deque
+from datetime import date, datetime
+from itertools import repeat
 import os
+import tempfile
+import struct
+import threading
+import time
+from contextlib import contextmanager
 
-class BancoDeDadosJson:
-    def __init__(self, arquivo="data/estacionamento.json"):
+from app.database.particoes import HistoricoParticionado, ParticoesHistorico
+from app.utils.estatisticas import resumo_latencias
+
+try:
+    import fcntl
+except ImportError:
+    # Windows: sem trava entre processos (a gravação continua atômica)
+    fcntl = None
+
+# Formatos opcionais do arquivo principal (pip install orjson / msgpack)
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+
+class ConflitoDeVersao(Exception):
+    """Outro processo alterou o banco entre a leitura e a gravação."""
+
+
+class FormatoIndisponivel(Exception):
+    """O formato pedido (ou o do arquivo) depende de uma biblioteca que não está instalada."""
+
+
+class BancoCorrompido(Exception):
+    """O arquivo existe, mas não pôde ser lido (ver BackupsBanco.restaurar)."""
+
+
+def _assinatura_arquivo(caminho):
+    try:
+        st = os.stat(caminho)
+        return (st.st_ino, st.st_mtime_ns, st.st_size)
+    except FileNotFoundError:
+        return None
+
+
+def _serializar(objeto):
+    """json.dump(default=...): coleções próprias (ex.: HistoricoColunar) viram listas."""
+    if hasattr(objeto, "to_list"):
+        return objeto.to_list()
+    raise TypeError(f"Objeto do tipo {type(objeto).__name__} não é serializável em JSON")
+
+
+# --- FORMATOS DO ARQUIVO PRINCIPAL (CODECS) ---
+# Na leitura o formato é detectado pelos primeiros bytes; na gravação vale o
+# formato configurado ou, sem configuração, o do arquivo lido (um arquivo
+# JSON, indentado ou não, passa a ser gravado compacto). Os arquivos do
+# histórico por dia e do diário continuam em JSON, uma linha por registro.
+
+class CodecJson:
+    """JSON compacto, sem espaços (padrão). Com indentar=True, o formato legível de antes."""
+
+    def __init__(self, indentar=False):
+        self.nome = "json_indentado" if indentar else "json"
+        self.indentar = indentar
+
+    def codificar(self, dados) -> bytes:
+        if self.indentar:
+            texto = json.dumps(dados, indent=4, ensure_ascii=False, default=_serializar)
+        else:
+            texto = json.dumps(dados, separators=(",", ":"), ensure_ascii=False, default=_serializar)
+        return texto.encode('utf-8')
+
+    def decodificar(self, conteudo: bytes):
+        # Qualquer JSON é lido pelo parser mais rápido disponível
+        return orjson.loads(conteudo) if orjson else json.loads(conteudo)
+
+
+class CodecOrjson(CodecJson):
+    """JSON compacto gerado pelo orjson (mesmo formato, bem mais rápido). Opcional."""
+
+    def __init__(self):
+        self.nome = "orjson"
+        self.indentar = False
+
+    def codificar(self, dados) -> bytes:
+        return orjson.dumps(dados, default=_serializar)
+
+
+class CodecMsgpack:
+    """MessagePack (binário). Opcional."""
+
+    nome = "msgpack"
+
+    def codificar(self, dados) -> bytes:
+        return msgpack.packb(dados, default=_serializar, use_bin_type=True)
+
+    def decodificar(self, conteudo: bytes):
+        return msgpack.unpackb(conteudo, raw=False, strict_map_key=False)
+
+
+class CodecColunar:
+    """
+    Binário só com a biblioteca padrão. As listas de registros com os
+    mesmos campos, todos texto (pessoas, veículos, histórico), são gravadas
+    em colunas: cada coluna é um único texto com os valores separados por
+    \x1f, e lê-la é um decode + split. O resto (eventos, ocupação, ...) vai
+    num cabeçalho JSON compacto.
+
+    Layout: MAGICA | tamanho do cabeçalho (uint32) | cabeçalho | colunas
+    """
+
+    nome = "binario"
+    MAGICA = b"ESTC\x01"
+    SEPARADOR = "\x1f"
+
+    def _colunas(self, registros):
+        """[(campos, [bytes de cada coluna])] se 'registros' cabe em colunas; senão None."""
+        if not isinstance(registros, list) or not registros or not isinstance(registros[0], dict):
+            return None
+        campos = list(registros[0])
+        try:
+            if any(len(r) != len(campos) for r in registros):
+                return None
+            colunas = []
+            for campo in campos:
+                texto = self.SEPARADOR.join([r[campo] for r in registros])
+                # Um separador dentro de algum valor embaralharia as linhas
+                if texto.count(self.SEPARADOR) != len(registros) - 1:
+                    return None
+                colunas.append(texto.encode('utf-8'))
+        except (KeyError, TypeError, AttributeError):
+            return None  # campos diferentes ou valores que não são texto
+        return campos, colunas
+
+    def codificar(self, dados) -> bytes:
+        livres, tabelas, blocos = {}, {}, []
+        for chave, valor in dados.items():
+            if hasattr(valor, "to_list"):
+                valor = valor.to_list()
+            tabela = self._colunas(valor)
+            if tabela is None:
+                livres[chave] = valor
+                continue
+            campos, colunas = tabela
+            tabelas[chave] = {"campos": campos, "linhas": len(valor), "bytes": [len(c) for c in colunas]}
+            blocos.extend(colunas)
+        cabecalho = json.dumps({"dados": livres, "tabelas": tabelas}, separators=(",", ":"),
+                               ensure_ascii=False).encode('utf-8')
+        return b"".join([self.MAGICA, struct.pack("<I", len(cabecalho)), cabecalho, *blocos])
+
+    def decodificar(self, conteudo: bytes):
+        inicio = len(self.MAGICA)
+        (tamanho,) = struct.unpack_from("<I", conteudo, inicio)
+        inicio += 4
+        cabecalho = CodecJson().decodificar(conteudo[inicio:inicio + tamanho])
+        posicao = inicio + tamanho
+        dados = cabecalho["dados"]
+        for chave, tabela in cabecalho["tabelas"].items():
+            colunas = []
+            for tamanho in tabela["bytes"]:
+                colunas.append(conteudo[posicao:posicao + tamanho].decode('utf-8').split(self.SEPARADOR))
+                posicao += tamanho
+            # map/zip em C: bem mais rápido que montar cada dicionário num laço Python
+            dados[chave] = list(map(dict, map(zip, repeat(tabela["campos"]), zip(*colunas))))
+        return dados
+
+
+FORMATOS = ("json", "json_indentado", "orjson", "msgpack", "binario")
+
+
+def codec(nome="json"):
+    """Codec pelo nome (um dos FORMATOS)."""
+    if nome == "json":
+        return CodecJson()
+    if nome == "json_indentado":
+        return CodecJson(indentar=True)
+    if nome == "binario":
+        return CodecColunar()
+    if nome == "orjson":
+        if orjson is None:
+            raise FormatoIndisponivel("Formato 'orjson' indisponível: instale com 'pip install orjson'.")
+        return CodecOrjson()
+    if nome == "msgpack":
+        if msgpack is None:
+            raise FormatoIndisponivel("Formato 'msgpack' indisponível: instale com 'pip install msgpack'.")
+        return CodecMsgpack()
+    raise ValueError(f"Formato desconhecido: '{nome}'.")
+
+
+def detectar_codec(conteudo: bytes):
+    """Codec que lê 'conteudo', pelos primeiros bytes do arquivo."""
+    if conteudo.startswith(CodecColunar.MAGICA):
+        return CodecColunar()
+    primeiro = conteudo.lstrip()[:1]
+    if primeiro in (b"{", b""):
+        return CodecJson()  # Indentado ou não: regravado compacto, a menos que se configure outro
+    # Dicionário MessagePack: fixmap (0x80-0x8f), map16 (0xde) ou map32 (0xdf)
+    if 0x80 <= primeiro[0] <= 0x8f or primeiro[0] in (0xde, 0xdf):
+        if msgpack is None:
+            raise FormatoIndisponivel("O arquivo está em MessagePack: instale com 'pip install msgpack'.")
+        return CodecMsgpack()
+    raise ValueError("formato de arquivo não reconhecido")
+
+
+def decodificar(conteudo: bytes):
+    """Lê o conteúdo do arquivo principal em qualquer um dos formatos."""
+    return detectar_codec(conteudo).decodificar(conteudo)
+
+
+@contextmanager
+def travar(arquivo_trava, exclusiva=False):
+    """
+    Trava consultiva entre processos no arquivo '.lock' do banco (compartilhada
+    para ler, exclusiva para gravar). Cada uso abre um descritor novo, então
+    ela também serializa threads do mesmo processo. Não pode ser aninhada.
+    """
+    with open(arquivo_trava, 'a+', encoding='utf-8') as f:
+        if fcntl:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX if exclusiva else fcntl.LOCK_SH)
+        try:
+            yield f
+        finally:
+            if fcntl:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+
+def atualizar_ocupacao(ocupacao: dict, registro: dict):
+    """
+    Aplica uma movimentação ao conjunto de veículos no pátio
+    (placa -> data/hora da ENTRADA). Custo O(1).
+    """
+    if registro["tipo"] == "ENTRADA":
+        ocupacao[registro["placa"]] = registro["data_hora"]
+    else:
+        ocupacao.pop(registro["placa"], None)
+
+
+def calcular_ocupacao(historico) -> dict:
+    """Reconstrói a ocupação do zero, repassando todo o histórico."""
+    ocupacao = {}
+    for registro in historico:
+        atualizar_ocupacao(ocupacao, registro)
+    return ocupacao
+
+
+def completar_dados(dados):
+    """
+    Completa no lugar o que bancos de versões anteriores não tinham
+    (ocupação materializada e eventos) e devolve 'dados'.
+    """
+    if "ocupacao" not in dados:
+        dados["ocupacao"] = calcular_ocupacao(dados.get("historico", []))
+    # Autorizações eram um campo 'autorizado' em cada veículo
+    if "eventos" not in dados:
+        dados["eventos"] = eventos_iniciais(dados)
+    for v_dict in dados.get("veiculos", []):
+        v_dict.pop("autorizado", None)
+    return dados
+
+
+def eventos_iniciais(dados) -> list:
+    """
+    Bancos anteriores aos eventos guardavam 'autorizado' em cada veículo.
+    Converte essas autorizações num único evento, já aberto.
+    (Não altera 'dados'; quem chama remove o campo antigo dos veículos.)
+    """
+    historico = dados.get("historico") or []
+    inicio = historico[0]["data_hora"] if historico else datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    return [{
+        "id": 1,
+        "nome": "Evento atual",
+        "inicio": inicio,
+        "fim": None,
+        "autorizados": [v["placa"] for v in dados.get("veiculos", []) if v.get("autorizado")],
+    }]
+
+
+def evento_ativo(eventos):
+    """
+    Evento em andamento: já aberto ('inicio') e ainda não encerrado ('fim').
+    Só um fica aberto por vez; normalmente é o último da lista.
+    """
+    for evento in reversed(eventos):
+        if evento.get("inicio") and not evento.get("fim"):
+            return evento
+    return None
+
+
+class BancoDeDados:
+    """
+    Interface comum de armazenamento. O repositório só conversa com estes métodos,
+    então trocar JSON por SQLite não muda nada acima da camada de banco.
+    """
+
+    def ler(self) -> dict:
+        """
+        Retorna tudo como {'pessoas': [...], 'veiculos': [...], 'historico': [...],
+        'ocupacao': {placa: data_hora_entrada}}.
+        """
+        raise NotImplementedError
+
+    def salvar(self, dados: dict):
+        """Substitui o conteúdo inteiro do banco por 'dados'."""
+        raise NotImplementedError
+
+    def anexar_movimentacao(self, registro: dict, dados=None):
+        """
+        Acrescenta um registro ao histórico e atualiza a ocupação
+        (também na cópia 'dados', se informada).
+        """
+        raise NotImplementedError
+
+    def assinatura(self):
+        """Valor que muda sempre que o banco é alterado (usado para invalidar caches)."""
+        raise NotImplementedError
+
+    def atualizar(self, funcao):
+        """
+        Ciclo ler -> alterar -> salvar. 'funcao' recebe os dados e os altera
+        no lugar; o valor que ela retornar é devolvido.
+        """
+        dados = self.ler()
+        resultado = funcao(dados)
+        self.salvar(dados)
+        return resultado
+
+    @contextmanager
+    def lote(self):
+        """
+        Agrupa várias alterações seguidas (ex.: a fila do servidor). Nos
+        bancos com confirmação em grupo, a ida ao disco é feita uma vez só,
+        ao final do bloco; nos demais não muda nada.
+        """
+        yield
+
+    def fechar(self):
+        """Libera recursos (threads, conexões)."""
+        pass
+
+
+class BancoDeDadosJson(BancoDeDados):
+    """
+    Banco em um único arquivo JSON, seguro para várias portarias (processos)
+    compartilhando a mesma pasta:
+
+    - Gravação atômica: escreve num arquivo temporário e troca com os.replace.
+      Um crash no meio nunca deixa o arquivo truncado.
+    - Trava entre processos: fcntl.flock no arquivo '.lock' (compartilhada
+      para ler, exclusiva para gravar).
+    - Versão otimista: o '.lock' guarda um contador que sobe a cada gravação.
+      ler() devolve a versão em dados['_versao']; se ao salvar a versão em
+      disco for outra, salvar() recusa com ConflitoDeVersao e atualizar()
+      repete o ciclo ler/alterar/salvar em vez de sobrescrever o outro processo.
+    - Histórico particionado (opcional): com particionar=True o histórico sai
+      do JSON principal e vai para um arquivo por dia na pasta
+      '<nome>.historico/' (ver ParticoesHistorico). O JSON guarda só o
+      manifesto ('particoes') e os dias são lidos sob demanda; os dias
+      encerrados são compactados em segundo plano.
+    """
+
+    TENTATIVAS = 10
+
+    def __init__(self, arquivo="data/estacionamento.json", particionar=False, backup_horas=None,
+                 geracoes_backup=7, formato=None):
         """
         Gerencia a leitura e escrita no arquivo JSON.
         :param arquivo: Caminho do arquivo (padrão: data/estacionamento.json)
+        :param particionar: Guarda o histórico em arquivos diários (converte um banco antigo na abertura)
+        :param formato: Formato de gravação ('json', 'json_indentado', 'orjson', 'msgpack' ou
+                        'binario'). None: mantém o do arquivo (JSON compacto num banco novo)
+        :param backup_horas: Faz uma cópia de segurança, em segundo plano, quando a última
+                             tiver mais que isso (None: só cópias pedidas)
+        :param geracoes_backup: Quantas cópias de segurança são mantidas
         """
         self.arquivo = arquivo
+        self.arquivo_trava = arquivo + ".lock"
+        self.particoes = ParticoesHistorico(os.path.splitext(arquivo)[0] + ".historico")
+        # Um banco já particionado continua particionado, mesmo aberto sem a opção
+        self.particionar = particionar
+        self.backup_horas = backup_horas
+        self.geracoes_backup = geracoes_backup
+        self.formato = formato
+        self._codec = codec(formato) if formato else CodecJson()
+        self._ultimo_backup = None  # instante (time.time()) da cópia mais recente
+        self._arquivador = None
+        self._copiador = None
+        # Contadores de E/S (arquivo principal e diário); lidos pela instrumentação
+        self.io = {"leituras": 0, "bytes_lidos": 0, "gravacoes": 0, "bytes_gravados": 0}
         self._verificar_diretorio()
         self._verificar_arquivo()
+        if particionar and not isinstance(self.ler().get("historico"), HistoricoParticionado):
+            # Histórico ainda dentro do JSON: move para os arquivos por dia (uma única vez)
+            self.atualizar(lambda dados: None)
 
     def _verificar_diretorio(self):
         """Garante que a pasta 'data' exista."""
@@ -27,26 +415,659 @@ class BancoDeDadosJson:
             dados_iniciais = {
                 "pessoas": [],
                 "veiculos": [],
-                "historico": [] # Futuramente podemos guardar logs de entrada/saída aqui
+                "historico": [], # Futuramente podemos guardar logs de entrada/saída aqui
+                "ocupacao": {}   # Placa -> data/hora da entrada dos veículos no pátio
             }
+            # Eventos com a lista de placas autorizadas em cada um (já começa com um aberto)
+            dados_iniciais["eventos"] = eventos_iniciais(dados_iniciais)
             self.salvar(dados_iniciais)
 
+    # --- TRAVA E VERSÃO ---
+
+    def _trava(self, exclusiva=False):
+        return travar(self.arquivo_trava, exclusiva)
+
+    @staticmethod
+    def _ler_versao(trava):
+        trava.seek(0)
+        conteudo = trava.read().strip()
+        return int(conteudo) if conteudo.isdigit() else 0
+
+    @staticmethod
+    def _gravar_versao(trava, versao):
+        trava.seek(0)
+        trava.truncate()
+        trava.write(str(versao))
+        trava.flush()
+
+    def assinatura(self):
+        """Versão atual do banco. Muda a cada gravação, de qualquer processo."""
+        with self._trava() as trava:
+            return self._ler_versao(trava)
+
+    # --- LEITURA ---
+
+    def _ler_arquivo(self, caminho=None):
+        """
+        Lê um arquivo JSON. Nunca devolve um banco vazio no lugar de um
+        arquivo ilegível, pois a próxima gravação apagaria tudo: levanta
+        BancoCorrompido (a recuperação é pelas cópias de segurança).
+        """
+        caminho = caminho or self.arquivo
+        try:
+            with open(caminho, 'rb') as f:
+                conteudo = f.read()
+            self.io["leituras"] += 1
+            self.io["bytes_lidos"] += len(conteudo)
+            leitor = detectar_codec(conteudo)
+            dados = leitor.decodificar(conteudo)
+            if caminho == self.arquivo and self.formato is None:
+                self._codec = leitor  # Sem formato configurado, mantém o do arquivo
+        except FileNotFoundError:
+            dados = {"pessoas": [], "veiculos": [], "historico": [], "ocupacao": {}}
+        except (ValueError, UnicodeDecodeError, struct.error, KeyError, IndexError) as erro:
+            raise BancoCorrompido(
+                f"'{caminho}' está corrompido: {erro}. "
+                "Para voltar à última cópia de segurança: python main.py backup restaurar"
+            ) from erro
+
+        if "particoes" in dados:
+            self.particionar = True
+            dados["historico"] = HistoricoParticionado(self.particoes, dados.pop("particoes"))
+        return completar_dados(dados)
+
     def ler(self):
         """
         Lê o arquivo JSON e retorna como um dicionário Python.
         """
+        with self._trava() as trava:
+            dados = self._ler_arquivo()
+            dados["_versao"] = self._ler_versao(trava)
+        return dados
+
+    # --- ESCRITA ---
+
+    def _ler_manifesto(self):
+        """Manifesto das partições gravado no JSON principal (sob trava)."""
+        historico = self._ler_arquivo().get("historico")
+        return historico.manifesto if isinstance(historico, HistoricoParticionado) else {}
+
+    def _gravar_particoes(self, conteudo):
+        """
+        Grava o histórico nos arquivos diários e põe o manifesto no lugar dele.
+        Retorna o histórico particionado a confirmar (ou None).
+        """
+        historico = conteudo.pop("historico", None) or []
+        if isinstance(historico, HistoricoParticionado) and historico.particoes.pasta == self.particoes.pasta:
+            # Só os movimentos novos: custo proporcional a eles, não ao histórico
+            conteudo["particoes"] = historico.gravar_pendentes(self._ler_manifesto)
+            return historico
+        conteudo["particoes"] = self.particoes.reescrever(historico)
+        return None
+
+    def _gravar_atomico(self, dados):
+        """
+        Salva sem nunca deixar o arquivo pela metade. O arquivo anterior não
+        é copiado: as cópias de segurança são periódicas (ver _backup_automatico).
+        """
+        conteudo = {k: v for k, v in dados.items() if k != "_versao"}
+        particionado = self._gravar_particoes(conteudo) if self.particionar else None
+        pasta = os.path.dirname(self.arquivo) or "."
+        descritor, temporario = tempfile.mkstemp(prefix=".estacionamento-", suffix=".tmp", dir=pasta)
         try:
-            with open(self.arquivo, 'r', encoding='utf-8') as f:
-                return json.load(f)
-        except (json.JSONDecodeError, FileNotFoundError):
-            # Se o arquivo estiver corrompido ou vazio, reseta para evitar crash
-            return {"pessoas": [], "veiculos": [], "historico": []}
+            with os.fdopen(descritor, 'wb') as f:
+                codificado = self._codec.codificar(conteudo)
+                f.write(codificado)
+                f.flush()
+                os.fsync(f.fileno())
+            os.chmod(temporario, 0o644)
+            os.replace(temporario, self.arquivo)
+            self.io["gravacoes"] += 1
+            self.io["bytes_gravados"] += len(codificado)
+        except BaseException:
+            if os.path.exists(temporario):
+                os.remove(temporario)
+            raise
+
+        if particionado is not None:
+            dias_antes = particionado.manifesto.keys()
+            particionado.confirmar(conteudo["particoes"])
+            if dias_antes and not conteudo["particoes"].keys() <= dias_antes:
+                # Começou um dia novo: os anteriores já podem ser compactados
+                self.arquivar_em_segundo_plano()
+        self._backup_automatico()
+
+    def _verificar_versao(self, trava, dados):
+        """Sob trava exclusiva: confere a versão e devolve a próxima."""
+        atual = self._ler_versao(trava)
+        esperada = dados.get("_versao")
+        if esperada is not None and esperada != atual:
+            raise ConflitoDeVersao(f"Banco alterado por outro processo (versão {esperada} -> {atual}).")
+        return atual + 1
 
     def salvar(self, dados):
-            """Salva com backup de segurança."""
-            # Se o arquivo existe, cria uma cópia .bak antes de sobrescrever
-            if os.path.exists(self.arquivo):
-                shutil.copyfile(self.arquivo, self.arquivo + ".bak")
-                
-            with open(self.arquivo, 'w', encoding='utf-8') as f:
-                json.dump(dados, f, indent=4, ensure_ascii=False)
\ No newline at end of file
+        """
+        Grava 'dados' por inteiro. Se 'dados' veio de ler() e outro processo
+        gravou depois disso, levanta ConflitoDeVersao (nada é gravado).
+        """
+        with self._trava(exclusiva=True) as trava:
+            nova_versao = self._verificar_versao(trava, dados)
+            self._gravar_atomico(dados)
+            self._gravar_versao(trava, nova_versao)
+        dados["_versao"] = nova_versao
+
+    def atualizar(self, funcao):
+        """ler -> funcao(dados) -> salvar, repetindo em caso de conflito de versão."""
+        for _ in range(self.TENTATIVAS):
+            dados = self.ler()
+            resultado = funcao(dados)
+            try:
+                self.salvar(dados)
+                return resultado
+            except ConflitoDeVersao:
+                continue
+        raise ConflitoDeVersao(f"Não foi possível gravar após {self.TENTATIVAS} tentativas.")
+
+    def anexar_movimentacao(self, registro: dict, dados=None):
+        """
+        Acrescenta um registro (já validado) ao histórico.
+        No modo JSON simples isso reescreve o arquivo inteiro.
+        :param dados: Cópia em memória já carregada (evita reler o arquivo).
+                      Ela também recebe o registro. Se estiver desatualizada,
+                      levanta ConflitoDeVersao.
+        """
+        def anexar(d):
+            d.setdefault("historico", []).append(registro)
+            atualizar_ocupacao(d.setdefault("ocupacao", {}), registro)
+
+        if dados is None:
+            self.atualizar(anexar)
+        else:
+            anexar(dados)
+            self.salvar(dados)
+
+    # --- ARQUIVAMENTO (HISTÓRICO PARTICIONADO) ---
+
+    def arquivar_historico(self, antes_de=None):
+        """
+        Compacta (gzip) os arquivos dos dias anteriores a 'antes_de'
+        ('AAAA-MM-DD', padrão: hoje). Não muda o conteúdo lógico do banco,
+        por isso não muda a versão. Retorna quantos dias foram compactados.
+        """
+        if not self.particionar:
+            return 0
+        with self._trava(exclusiva=True):
+            return self.particoes.arquivar(self._ler_manifesto(), antes_de or date.today().isoformat())
+
+    def arquivar_em_segundo_plano(self):
+        """Dispara o arquivamento numa thread, se já não houver um rodando."""
+        if self._arquivador and self._arquivador.is_alive():
+            return
+        self._arquivador = threading.Thread(target=self.arquivar_historico, name="arquivador-historico")
+        self._arquivador.start()
+
+    # --- CÓPIAS DE SEGURANÇA ---
+
+    @property
+    def backups(self):
+        """Cópias de segurança deste banco (ver BackupsBanco)."""
+        # Import tardio: o módulo de backups usa as classes deste módulo
+        from app.database.backups import BackupsBanco
+        return BackupsBanco(self.arquivo, self.geracoes_backup)
+
+    def _backup_automatico(self):
+        """Depois de uma gravação: dispara uma cópia se a última tiver mais de 'backup_horas'."""
+        if not self.backup_horas:
+            return
+        if self._ultimo_backup is None:
+            copias = self.backups.listar()
+            self._ultimo_backup = (
+                datetime.strptime(copias[-1]["criado_em"], "%Y-%m-%d %H:%M:%S").timestamp() if copias else 0
+            )
+        if time.time() - self._ultimo_backup >= self.backup_horas * 3600:
+            self._ultimo_backup = time.time()
+            self.backup_em_segundo_plano()
+
+    def backup_em_segundo_plano(self):
+        """Faz uma cópia de segurança numa thread, se já não houver uma em andamento."""
+        if self._copiador and self._copiador.is_alive():
+            return
+        self._copiador = threading.Thread(target=self.backups.criar, args=("automatico",), name="copia-seguranca")
+        self._copiador.start()
+
+    def fechar(self):
+        """Aguarda um arquivamento (e uma cópia de segurança) em andamento terminar."""
+        if self._arquivador:
+            self._arquivador.join()
+        if self._copiador:
+            self._copiador.join()
+
+
+class BancoDeDadosDiario(BancoDeDadosJson):
+    """
+    Modo com diário (journal) de movimentações.
+
+    Pessoas e veículos ficam no snapshot (o próprio arquivo JSON). Cada
+    ENTRADA/SAIDA vira UMA linha no arquivo '.diario.jsonl', então o custo de
+    registrar um movimento não cresce com o tamanho do histórico.
+    Quando o diário passa de 'limite_compactacao' linhas, uma thread em
+    segundo plano incorpora as linhas ao snapshot.
+
+    Cada linha usa como número de sequência ('seq') a versão do banco, que é
+    compartilhada entre processos. O snapshot guarda a última sequência
+    incorporada em '_seq', assim uma compactação interrompida no meio nunca
+    duplica registros.
+    """
+
+    def __init__(self, arquivo="data/estacionamento.json", fsync=False, limite_compactacao=1000,
+                 particionar=False, backup_horas=None, geracoes_backup=7, formato=None):
+        """
+        :param fsync: Se True, força o sistema operacional a gravar cada linha no disco
+        :param limite_compactacao: Nº de linhas no diário que dispara a compactação
+        :param particionar: Histórico em arquivos diários (a compactação só acrescenta ao dia)
+        :param backup_horas, geracoes_backup, formato: Ver BancoDeDadosJson
+        """
+        base, _ = os.path.splitext(arquivo)
+        self.arquivo_diario = base + ".diario.jsonl"
+        self.arquivo_compactando = base + ".diario.compactando.jsonl"
+        self.fsync = fsync
+        self.limite_compactacao = limite_compactacao
+
+        # Travas entre threads (a trava de arquivo cuida dos outros processos):
+        # _trava_diario protege o append; _trava_snapshot protege a troca do snapshot
+        self._trava_diario = threading.Lock()
+        self._trava_snapshot = threading.RLock()
+        self._compactador = None
+
+        super().__init__(arquivo, particionar, backup_horas, geracoes_backup, formato)
+
+        self._ajustar_versao()
+        self._linhas_diario = len(self._ler_linhas(self.arquivo_diario))
+
+    # --- LEITURA ---
+
+    def _ler_linhas(self, caminho):
+        """Lê as linhas de um diário. Ignora a última linha se estiver incompleta."""
+        linhas = []
+        try:
+            with open(caminho, 'r', encoding='utf-8') as f:
+                self.io["leituras"] += 1
+                for linha in f:
+                    self.io["bytes_lidos"] += len(linha)
+                    if not linha.endswith("\n"):
+                        break  # Escrita em andamento (ou interrompida por crash)
+                    try:
+                        linhas.append(json.loads(linha))
+                    except json.JSONDecodeError:
+                        continue
+        except FileNotFoundError:
+            pass
+        return linhas
+
+    def _ajustar_versao(self):
+        """
+        A versão precisa ser maior que qualquer 'seq' já gravado
+        (ex.: o arquivo '.lock' foi apagado ou veio de uma versão antiga).
+        """
+        with self._trava(exclusiva=True) as trava:
+            seq = self._ler_arquivo().get("_seq", 0)
+            for caminho in (self.arquivo_compactando, self.arquivo_diario):
+                for linha in self._ler_linhas(caminho):
+                    seq = max(seq, linha.get("seq", 0))
+            if self._ler_versao(trava) < seq:
+                self._gravar_versao(trava, seq)
+
+    def _mesclar(self, dados, caminhos):
+        """Acrescenta ao histórico do snapshot as linhas ainda não incorporadas."""
+        ultima = dados.get("_seq", 0)
+        historico = dados.setdefault("historico", [])
+        ocupacao = dados.setdefault("ocupacao", {})
+        for caminho in caminhos:
+            for linha in self._ler_linhas(caminho):
+                seq = linha.pop("seq", 0)
+                if seq > ultima:
+                    historico.append(linha)
+                    atualizar_ocupacao(ocupacao, linha)
+                    ultima = seq
+        dados["_seq"] = ultima
+        return dados
+
+    def ler(self):
+        """Snapshot + linhas pendentes do diário, como se fosse um JSON só."""
+        with self._trava_snapshot, self._trava() as trava:
+            dados = self._mesclar(self._ler_arquivo(), [self.arquivo_compactando, self.arquivo_diario])
+            dados["_versao"] = self._ler_versao(trava)
+        return dados
+
+    # --- ESCRITA ---
+
+    def salvar(self, dados):
+        """
+        Grava o snapshot completo. Como 'dados' veio de ler(), ele já contém
+        o diário mesclado, então as linhas pendentes podem ser descartadas.
+        (Se alguém anexou uma linha depois da leitura, a versão mudou e a
+        gravação é recusada com ConflitoDeVersao.)
+        """
+        with self._trava_snapshot, self._trava_diario:
+            with self._trava(exclusiva=True) as trava:
+                nova_versao = self._verificar_versao(trava, dados)
+                dados["_seq"] = nova_versao
+                self._gravar_atomico(dados)
+                for caminho in (self.arquivo_compactando, self.arquivo_diario):
+                    if os.path.exists(caminho):
+                        os.remove(caminho)
+                self._gravar_versao(trava, nova_versao)
+            self._linhas_diario = 0
+        dados["_versao"] = nova_versao
+
+    def anexar_movimentacao(self, registro: dict, dados=None):
+        """
+        Anexa uma única linha ao diário (custo constante).
+        Se 'dados' estava em dia, continua em dia (recebe o registro e a nova
+        versão); se não, fica com a versão antiga e o cache será recarregado.
+        """
+        with self._trava_diario:
+            with self._trava(exclusiva=True) as trava:
+                anterior = self._ler_versao(trava)
+                seq = anterior + 1
+                linha = json.dumps({"seq": seq, **registro}, ensure_ascii=False)
+                with open(self.arquivo_diario, 'a', encoding='utf-8') as f:
+                    f.write(linha + "\n")
+                    self._apos_gravar_linha(f, seq)
+                self.io["gravacoes"] += 1
+                self.io["bytes_gravados"] += len(linha) + 1
+                self._gravar_versao(trava, seq)
+            self._linhas_diario += 1
+            precisa_compactar = self._linhas_diario >= self.limite_compactacao
+
+        if dados is not None:
+            dados.setdefault("historico", []).append(registro)
+            atualizar_ocupacao(dados.setdefault("ocupacao", {}), registro)
+            if dados.get("_versao") == anterior:
+                dados["_versao"] = seq
+
+        if precisa_compactar:
+            self.compactar_em_segundo_plano()
+
+    def _apos_gravar_linha(self, arquivo, seq):
+        """Chamado com a linha escrita e o diário ainda aberto (sob as travas do diário)."""
+        if self.fsync:
+            arquivo.flush()
+            os.fsync(arquivo.fileno())
+
+    # --- COMPACTAÇÃO ---
+
+    def compactar_em_segundo_plano(self):
+        """Dispara a compactação numa thread, se já não houver uma rodando."""
+        if self._compactador and self._compactador.is_alive():
+            return
+        self._compactador = threading.Thread(target=self.compactar, name="compactador-diario")
+        self._compactador.start()
+
+    def compactar(self):
+        """
+        Incorpora o diário ao snapshot. Não muda o conteúdo lógico do banco,
+        por isso não muda a versão.
+        1. Renomeia o diário (novos movimentos já vão para um arquivo novo);
+        2. Mescla o arquivo renomeado no snapshot, fora da trava de arquivo;
+        3. Troca o snapshot e remove o arquivo renomeado — a menos que outro
+           processo tenha gravado o snapshot nesse meio tempo (ele já
+           incorporou as linhas).
+        """
+        with self._trava_snapshot:
+            with self._trava_diario, self._trava(exclusiva=True):
+                if os.path.exists(self.arquivo_diario) and not os.path.exists(self.arquivo_compactando):
+                    os.replace(self.arquivo_diario, self.arquivo_compactando)
+                    self._linhas_diario = 0
+                snapshot_lido = _assinatura_arquivo(self.arquivo)
+                dados = self._ler_arquivo()
+
+            if not os.path.exists(self.arquivo_compactando):
+                return
+            dados = self._mesclar(dados, [self.arquivo_compactando])
+
+            with self._trava(exclusiva=True):
+                if _assinatura_arquivo(self.arquivo) != snapshot_lido:
+                    return
+                self._gravar_atomico(dados)
+                os.remove(self.arquivo_compactando)
+
+    def fechar(self):
+        """Aguarda uma compactação (e um arquivamento) em andamento terminar."""
+        if self._compactador:
+            self._compactador.join()
+        super().fechar()
+
+
+# Bancos em modo grupo ainda abertos: o que estiver no diário é incorporado ao sair do programa
+_bancos_em_grupo = set()
+
+
+@atexit.register
+def _fechar_bancos_em_grupo():
+    for banco in list(_bancos_em_grupo):
+        banco.fechar()
+
+
+class BancoDeDadosGrupo(BancoDeDadosDiario):
+    """
+    Modo diário com confirmação em grupo (group commit), para a troca de
+    turno, quando dezenas de carros passam por minuto nas portarias.
+
+    - Cada movimento continua sendo UMA linha no diário, e só é confirmado
+      (anexar_movimentacao retorna) depois que a linha está no disco
+      (fsync). Mas quem chega enquanto outro fsync está em andamento não
+      faz o seu: espera o próximo, que vale para todas as linhas escritas
+      até ali. Dentro de um lote() (a fila do servidor) o fsync é um só, ao
+      final do bloco.
+    - Uma thread em segundo plano incorpora o diário ao snapshot a cada
+      'intervalo' segundos (ou antes, ao passar de 'limite_compactacao'
+      linhas), fora do caminho de quem registra o movimento.
+    - Ao fechar o banco (ou ao sair do programa, via atexit) o que estiver
+      no diário é incorporado.
+
+    metricas() informa a fila (movimentos no diário ainda não incorporados
+    e linhas esperando fsync) e a latência da confirmação e da incorporação.
+    """
+
+    # Quantas durações recentes entram nas métricas
+    AMOSTRAS = 1000
+
+    def __init__(self, arquivo="data/estacionamento.json", fsync=True, intervalo=0.2,
+                 limite_compactacao=500, particionar=False, backup_horas=None, geracoes_backup=7,
+                 formato=None):
+        """
+        :param fsync: Se False, confirma assim que a linha é escrita (sem esperar o disco)
+        :param intervalo: Segundos entre as incorporações do diário ao snapshot
+        :param limite_compactacao: Nº de linhas no diário que antecipa a incorporação
+        """
+        self.intervalo = intervalo
+        self._local = threading.local()             # lote em andamento e último seq, por thread
+        self._aguardando = {}                       # inode do diário -> [maior seq, descritor, linhas] sem fsync
+        self._trava_sincronizacao = threading.Lock()
+        self._sincronizado = 0                      # maior seq já garantido no disco
+        self._ultimo_seq = 0
+        self._movimentos = 0
+        self._sincronizacoes = 0
+        self._falhas_incorporacao = 0
+        self._latencias_confirmacao = deque(maxlen=self.AMOSTRAS)
+        self._latencias_incorporacao = deque(maxlen=self.AMOSTRAS)
+        self._acordar = threading.Event()
+        self._parar = threading.Event()
+
+        super().__init__(arquivo, fsync=fsync, limite_compactacao=limite_compactacao, particionar=particionar,
+                         backup_horas=backup_horas, geracoes_backup=geracoes_backup, formato=formato)
+
+        # daemon: quem para a thread é fechar() (chamado também pelo atexit)
+        self._incorporador = threading.Thread(target=self._incorporar_periodicamente,
+                                              name="incorporador-diario", daemon=True)
+        self._incorporador.start()
+        _bancos_em_grupo.add(self)
+
+    # --- CONFIRMAÇÃO EM GRUPO ---
+
+    def _apos_gravar_linha(self, arquivo, seq):
+        """
+        Não faz o fsync aqui (sob trava): anota a linha para o fsync em grupo.
+        Uma cópia do descritor por arquivo do diário (não por linha), mantida
+        até o fsync, mesmo que a compactação renomeie o arquivo.
+        """
+        self._local.seq = seq
+        self._ultimo_seq = seq
+        self._movimentos += 1
+        if self.fsync:
+            arquivo.flush()
+            inode = os.fstat(arquivo.fileno()).st_ino
+            aguardando = self._aguardando.get(inode)
+            if aguardando is None:
+                self._aguardando[inode] = [seq, os.dup(arquivo.fileno()), 1]
+            else:
+                aguardando[0] = seq
+                aguardando[2] += 1
+
+    def _sincronizar(self, seq):
+        """
+        Garante no disco todas as linhas até 'seq'. Um único fsync (por
+        arquivo) cobre todas as linhas que estavam esperando, inclusive as
+        de outras threads, que então não precisam fazer o seu.
+        """
+        if not self.fsync:
+            return
+        with self._trava_sincronizacao:
+            if seq <= self._sincronizado:
+                return
+            with self._trava_diario:
+                grupo, self._aguardando = self._aguardando, {}
+            try:
+                # Se a compactação renomeou o diário no meio, há dois arquivos (inodes)
+                for _, descritor, _ in grupo.values():
+                    os.fsync(descritor)
+            finally:
+                for _, descritor, _ in grupo.values():
+                    os.close(descritor)
+            self._sincronizacoes += 1
+            self._sincronizado = max([self._sincronizado] + [s for s, _, _ in grupo.values()])
+
+    def anexar_movimentacao(self, registro: dict, dados=None):
+        """Escreve a linha no diário e só retorna com ela no disco (ou ao fim do lote())."""
+        inicio = time.perf_counter()
+        super().anexar_movimentacao(registro, dados)
+        pendentes = getattr(self._local, "lote", None)
+        if pendentes is not None:
+            pendentes.append((self._local.seq, inicio))
+            return
+        self._sincronizar(self._local.seq)
+        self._latencias_confirmacao.append(time.perf_counter() - inicio)
+
+    @contextmanager
+    def lote(self):
+        """Os movimentos anexados no bloco são confirmados juntos, com um fsync só no final."""
+        if getattr(self._local, "lote", None) is not None:
+            yield  # lote dentro de lote: quem confirma é o de fora
+            return
+        self._local.lote = pendentes = []
+        try:
+            yield
+        finally:
+            self._local.lote = None
+            if pendentes:
+                self._sincronizar(max(seq for seq, _ in pendentes))
+                agora = time.perf_counter()
+                self._latencias_confirmacao.extend(agora - inicio for _, inicio in pendentes)
+
+    # --- INCORPORAÇÃO EM SEGUNDO PLANO ---
+
+    def compactar_em_segundo_plano(self):
+        """Passou do limite de linhas: acorda a thread de incorporação antes do intervalo."""
+        self._acordar.set()
+
+    def _incorporar_periodicamente(self):
+        while not self._parar.is_set():
+            self._acordar.wait(self.intervalo)
+            self._acordar.clear()
+            if self._parar.is_set() or not self._linhas_diario:
+                continue
+            inicio = time.perf_counter()
+            try:
+                self.compactar()
+            except Exception:
+                # Ex.: disco cheio. As linhas continuam no diário; tenta de novo no próximo ciclo
+                self._falhas_incorporacao += 1
+                continue
+            self._latencias_incorporacao.append(time.perf_counter() - inicio)
+
+    def metricas(self):
+        """Fila, vazão do fsync em grupo e latências (ms) da confirmação e da incorporação."""
+        return {
+            "modo": "grupo",
+            "fsync": self.fsync,
+            "intervalo_ms": round(self.intervalo * 1000),
+            "fila_diario": self._linhas_diario,
+            "aguardando_disco": sum(linhas for _, _, linhas in list(self._aguardando.values())),
+            "movimentos": self._movimentos,
+            "sincronizacoes": self._sincronizacoes,
+            "movimentos_por_sincronizacao": round(self._movimentos / self._sincronizacoes, 2)
+            if self._sincronizacoes else None,
+            "falhas_incorporacao": self._falhas_incorporacao,
+            "confirmacao": resumo_latencias(self._latencias_confirmacao),
+            "incorporacao": resumo_latencias(self._latencias_incorporacao),
+        }
+
+    def fechar(self):
+        """Para a thread de incorporação, leva o diário para o snapshot e libera o banco."""
+        if not self._parar.is_set():
+            self._parar.set()
+            self._acordar.set()
+            self._incorporador.join()
+            self._sincronizar(self._ultimo_seq)
+            if self._linhas_diario:
+                self.compactar()
+            _bancos_em_grupo.discard(self)
+        super().fechar()
+
+
+def criar_banco(arquivo=None):
+    """
+    Escolhe a implementação de armazenamento pelas variáveis de ambiente:
+    - ESTACIONAMENTO_MODO: 'json' (padrão), 'diario', 'grupo' ou 'sqlite'
+    - ESTACIONAMENTO_ARQUIVO: caminho do arquivo
+      (padrão: data/estacionamento.json, ou data/estacionamento.db no modo sqlite)
+    - ESTACIONAMENTO_FSYNC: '1' para gravar cada movimento no disco antes de confirmá-lo
+      (padrão: '0' no modo diario, '1' no modo grupo)
+    - ESTACIONAMENTO_INTERVALO_MS: no modo grupo, intervalo entre as incorporações do diário (padrão: 200)
+    - ESTACIONAMENTO_LIMITE_DIARIO: no modo grupo, nº de linhas que antecipa a incorporação (padrão: 500)
+    - ESTACIONAMENTO_PARTICIONAR: '1' para guardar o histórico em arquivos diários
+    - ESTACIONAMENTO_BACKUP_HORAS: nos modos JSON, intervalo entre as cópias de segurança
+      automáticas (padrão: 24; '0' desliga)
+    - ESTACIONAMENTO_BACKUP_GERACOES: quantas cópias de segurança são mantidas (padrão: 7)
+    - ESTACIONAMENTO_FORMATO: formato do arquivo principal nos modos JSON ('json', 'json_indentado',
+      'orjson', 'msgpack' ou 'binario'; padrão: o do arquivo)
+    """
+    modo = os.environ.get("ESTACIONAMENTO_MODO", "json").lower()
+
+    if modo == "sqlite":
+        # Import tardio: quem usa só JSON não precisa carregar o sqlite3
+        from app.database.conexao_sqlite import BancoDeDadosSQLite
+        arquivo = arquivo or os.environ.get("ESTACIONAMENTO_ARQUIVO", "data/estacionamento.db")
+        return BancoDeDadosSQLite(arquivo)
+
+    arquivo = arquivo or os.environ.get("ESTACIONAMENTO_ARQUIVO", "data/estacionamento.json")
+    particionar = os.environ.get("ESTACIONAMENTO_PARTICIONAR", "0") == "1"
+    opcoes = {
+        "backup_horas": float(os.environ.get("ESTACIONAMENTO_BACKUP_HORAS", "24")) or None,
+        "geracoes_backup": int(os.environ.get("ESTACIONAMENTO_BACKUP_GERACOES", "7")),
+        "formato": os.environ.get("ESTACIONAMENTO_FORMATO") or None,
+    }
+    if modo == "grupo":
+        return BancoDeDadosGrupo(
+            arquivo,
+            fsync=os.environ.get("ESTACIONAMENTO_FSYNC", "1") == "1",
+            intervalo=int(os.environ.get("ESTACIONAMENTO_INTERVALO_MS", "200")) / 1000,
+            limite_compactacao=int(os.environ.get("ESTACIONAMENTO_LIMITE_DIARIO", "500")),
+            particionar=particionar,
+            **opcoes,
+        )
+    if modo == "diario":
+        fsync = os.environ.get("ESTACIONAMENTO_FSYNC", "0") == "1"
+        return BancoDeDadosDiario(arquivo, fsync=fsync, particionar=particionar, **opcoes)
+    return BancoDeDadosJson(arquivo, particionar=particionar, **opcoes)
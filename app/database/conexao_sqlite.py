@@ -0,0 +1,275 @@
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+from app.database.conexao import (
+    BancoDeDados, BancoDeDadosDiario, atualizar_ocupacao, calcular_ocupacao, eventos_iniciais,
+)
+from app.utils.busca import normalizar_texto
+
+ESQUEMA = """
+CREATE TABLE IF NOT EXISTS pessoas (
+    id INTEGER PRIMARY KEY,
+    nome TEXT NOT NULL,
+    cpf TEXT NOT NULL,
+    contato TEXT NOT NULL DEFAULT ''
+);
+CREATE UNIQUE INDEX IF NOT EXISTS ix_pessoas_cpf ON pessoas(cpf);
+
+CREATE TABLE IF NOT EXISTS veiculos (
+    id INTEGER PRIMARY KEY,
+    placa TEXT NOT NULL,
+    modelo TEXT NOT NULL DEFAULT '',
+    cor TEXT NOT NULL DEFAULT '',
+    proprietario_cpf TEXT NOT NULL,
+    autorizado INTEGER NOT NULL DEFAULT 0  -- legado: autorizações agora ficam por evento
+);
+CREATE UNIQUE INDEX IF NOT EXISTS ix_veiculos_placa ON veiculos(placa);
+CREATE INDEX IF NOT EXISTS ix_veiculos_cpf ON veiculos(proprietario_cpf);
+
+CREATE TABLE IF NOT EXISTS historico (
+    id INTEGER PRIMARY KEY,
+    placa TEXT NOT NULL,
+    tipo TEXT NOT NULL,
+    data_hora TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_historico_placa_data ON historico(placa, data_hora);
+CREATE INDEX IF NOT EXISTS ix_historico_data ON historico(data_hora);
+
+-- Veículos no pátio agora (placa -> data/hora da ENTRADA), mantido a cada movimento
+CREATE TABLE IF NOT EXISTS ocupacao (
+    placa TEXT PRIMARY KEY,
+    data_hora TEXT NOT NULL
+);
+
+-- Eventos (inicio NULL = em preparação; fim NULL = ainda não encerrado)
+-- e as placas autorizadas em cada um
+CREATE TABLE IF NOT EXISTS eventos (
+    id INTEGER PRIMARY KEY,
+    nome TEXT NOT NULL,
+    inicio TEXT,
+    fim TEXT
+);
+CREATE TABLE IF NOT EXISTS autorizacoes (
+    evento_id INTEGER NOT NULL,
+    placa TEXT NOT NULL,
+    PRIMARY KEY (evento_id, placa)
+) WITHOUT ROWID;
+CREATE VIEW IF NOT EXISTS evento_ativo AS
+    SELECT * FROM eventos WHERE inicio IS NOT NULL AND fim IS NULL ORDER BY id DESC LIMIT 1;
+"""
+
+SQL_RECONSTRUIR_OCUPACAO = """
+INSERT INTO ocupacao (placa, data_hora)
+SELECT h.placa, h.data_hora
+FROM historico h
+JOIN (SELECT placa, MAX(id) AS ultimo FROM historico GROUP BY placa) u ON u.ultimo = h.id
+WHERE h.tipo = 'ENTRADA'
+"""
+
+
+class BancoDeDadosSQLite(BancoDeDados):
+    """
+    Armazenamento em SQLite (biblioteca padrão), em modo WAL: vários leitores
+    simultâneos, atualizações parciais e índices por placa/CPF.
+
+    Implementa a mesma interface do BancoDeDadosJson (ler/salvar/...), mas o
+    RepositorioSQLite usa SQL direto nas operações do dia a dia.
+    """
+
+    def __init__(self, arquivo="data/estacionamento.db"):
+        self.arquivo = arquivo
+        pasta = os.path.dirname(self.arquivo)
+        if pasta and not os.path.exists(pasta):
+            os.makedirs(pasta)
+
+        self._trava = threading.RLock()
+        self.conexao = sqlite3.connect(self.arquivo, check_same_thread=False)
+        self.conexao.row_factory = sqlite3.Row
+        self.conexao.execute("PRAGMA journal_mode=WAL")
+        self.conexao.execute("PRAGMA synchronous=NORMAL")
+        # lower() do SQLite só entende ASCII; para buscar nomes sem diferenciar
+        # maiúsculas nem acentos usamos a normalização do Python
+        self.conexao.create_function("sem_acento", 1, normalizar_texto, deterministic=True)
+        tinha_ocupacao = self._tem_tabela("ocupacao")
+        tinha_eventos = self._tem_tabela("eventos")
+        with self.conexao:
+            self.conexao.executescript(ESQUEMA)
+        if not tinha_ocupacao:
+            # Banco criado antes da ocupação materializada: calcula uma vez a partir do histórico
+            self.reconstruir_ocupacao()
+        if not tinha_eventos:
+            # Banco criado antes dos eventos: a coluna 'autorizado' vira um evento aberto
+            legado = {
+                "veiculos": self.consultar("SELECT placa, autorizado FROM veiculos WHERE autorizado = 1 ORDER BY id"),
+                "historico": self.consultar("SELECT data_hora FROM historico ORDER BY id LIMIT 1"),
+            }
+            with self._trava, self.conexao:
+                self._inserir_eventos(eventos_iniciais(legado))
+
+    def _tem_tabela(self, nome):
+        return self.conexao.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (nome,)
+        ).fetchone() is not None
+
+    # --- SQL ---
+
+    def consultar(self, sql, parametros=()):
+        """Executa um SELECT e retorna a lista de linhas como dicionários."""
+        with self._trava:
+            return [dict(linha) for linha in self.conexao.execute(sql, parametros)]
+
+    def consultar_em_lotes(self, sql, parametros=(), tamanho=1000):
+        """
+        Gerador para consultas grandes: busca 'tamanho' linhas por vez,
+        sem carregar o resultado inteiro na memória.
+        """
+        with self._trava:
+            cursor = self.conexao.cursor()
+            cursor.execute(sql, parametros)
+        while True:
+            with self._trava:
+                lote = cursor.fetchmany(tamanho)
+            if not lote:
+                break
+            for linha in lote:
+                yield dict(linha)
+
+    def executar(self, sql, parametros=()):
+        """Executa um comando em transação própria. Retorna o nº de linhas afetadas."""
+        with self._trava, self.conexao:
+            return self.conexao.execute(sql, parametros).rowcount
+
+    def executar_varios(self, sql, lista_parametros):
+        with self._trava, self.conexao:
+            return self.conexao.executemany(sql, lista_parametros).rowcount
+
+    @contextmanager
+    def transacao(self):
+        """Agrupa vários comandos numa única transação (tudo ou nada)."""
+        with self._trava, self.conexao:
+            yield self.conexao
+
+    # --- INTERFACE BancoDeDados ---
+
+    def ler(self):
+        veiculos = self.consultar("SELECT placa, modelo, cor, proprietario_cpf FROM veiculos ORDER BY id")
+        eventos = self.consultar("SELECT id, nome, inicio, fim FROM eventos ORDER BY id")
+        for evento in eventos:
+            evento["autorizados"] = [
+                a["placa"] for a in self.consultar("SELECT placa FROM autorizacoes WHERE evento_id = ?", (evento["id"],))
+            ]
+        return {
+            "pessoas": self.consultar("SELECT nome, cpf, contato FROM pessoas ORDER BY id"),
+            "veiculos": veiculos,
+            "historico": self.consultar("SELECT placa, tipo, data_hora FROM historico ORDER BY id"),
+            "ocupacao": {
+                o["placa"]: o["data_hora"]
+                for o in self.consultar("SELECT placa, data_hora FROM ocupacao ORDER BY data_hora")
+            },
+            "eventos": eventos,
+        }
+
+    def salvar(self, dados):
+        """Substitui todas as tabelas numa única transação."""
+        with self._trava, self.conexao:
+            self.conexao.execute("DELETE FROM pessoas")
+            self.conexao.execute("DELETE FROM veiculos")
+            self.conexao.execute("DELETE FROM historico")
+            self.conexao.execute("DELETE FROM ocupacao")
+            self.conexao.execute("DELETE FROM eventos")
+            self.conexao.execute("DELETE FROM autorizacoes")
+            self._inserir_tudo(dados)
+
+    def _inserir_tudo(self, dados):
+        self.conexao.executemany(
+            "INSERT OR REPLACE INTO pessoas (nome, cpf, contato) VALUES (:nome, :cpf, :contato)",
+            [{"contato": "", **p} for p in dados.get("pessoas", [])],
+        )
+        self.conexao.executemany(
+            "INSERT OR REPLACE INTO veiculos (placa, modelo, cor, proprietario_cpf) "
+            "VALUES (:placa, :modelo, :cor, :proprietario_cpf)",
+            dados.get("veiculos", []),
+        )
+        self.conexao.executemany(
+            "INSERT INTO historico (placa, tipo, data_hora) VALUES (:placa, :tipo, :data_hora)",
+            dados.get("historico", []),
+        )
+        ocupacao = dados.get("ocupacao")
+        if ocupacao is None:
+            ocupacao = calcular_ocupacao(dados.get("historico", []))
+        self.conexao.executemany(
+            "INSERT OR REPLACE INTO ocupacao (placa, data_hora) VALUES (?, ?)",
+            ocupacao.items(),
+        )
+        # Dados antigos (sem eventos) trazem 'autorizado' em cada veículo
+        self._inserir_eventos(dados.get("eventos") or eventos_iniciais(dados))
+
+    def _inserir_eventos(self, eventos):
+        self.conexao.executemany(
+            "INSERT OR REPLACE INTO eventos (id, nome, inicio, fim) VALUES (:id, :nome, :inicio, :fim)", eventos
+        )
+        self.conexao.executemany(
+            "INSERT OR IGNORE INTO autorizacoes (evento_id, placa) VALUES (?, ?)",
+            ((e["id"], placa) for e in eventos for placa in e["autorizados"]),
+        )
+
+    def anexar_movimentacao(self, registro: dict, dados=None):
+        if dados is not None:
+            dados.setdefault("historico", []).append(registro)
+            atualizar_ocupacao(dados.setdefault("ocupacao", {}), registro)
+
+        with self._trava, self.conexao:
+            self.conexao.execute(
+                "INSERT INTO historico (placa, tipo, data_hora) VALUES (:placa, :tipo, :data_hora)",
+                registro,
+            )
+            if registro["tipo"] == "ENTRADA":
+                self.conexao.execute(
+                    "INSERT OR REPLACE INTO ocupacao (placa, data_hora) VALUES (:placa, :data_hora)",
+                    registro,
+                )
+            else:
+                self.conexao.execute("DELETE FROM ocupacao WHERE placa = :placa", registro)
+
+    def reconstruir_ocupacao(self):
+        """Recalcula a tabela de ocupação a partir do último movimento de cada placa."""
+        with self._trava, self.conexao:
+            self.conexao.execute("DELETE FROM ocupacao")
+            self.conexao.execute(SQL_RECONSTRUIR_OCUPACAO)
+
+    def assinatura(self):
+        """data_version muda quando OUTRA conexão grava; total_changes cobre as nossas."""
+        with self._trava:
+            versao = self.conexao.execute("PRAGMA data_version").fetchone()[0]
+            return (versao, self.conexao.total_changes)
+
+    def fechar(self):
+        with self._trava:
+            self.conexao.close()
+
+    # --- MIGRAÇÃO ---
+
+    def migrar_de_json(self, arquivo_json="data/estacionamento.json"):
+        """
+        Importa (uma única vez) o conteúdo do banco JSON, incluindo linhas
+        pendentes do diário, se houver.
+        Retorna a contagem de registros importados por tabela.
+        """
+        if not os.path.exists(arquivo_json):
+            raise FileNotFoundError(f"Arquivo não encontrado: {arquivo_json}")
+
+        with self._trava:
+            ja_tem_dados = any(
+                self.conexao.execute(f"SELECT 1 FROM {tabela} LIMIT 1").fetchone()
+                for tabela in ("pessoas", "veiculos", "historico")
+            )
+        if ja_tem_dados:
+            raise ValueError("O banco SQLite já possui dados. Migração cancelada.")
+
+        dados = BancoDeDadosDiario(arquivo_json).ler()
+        with self._trava, self.conexao:
+            self._inserir_tudo(dados)
+
+        return {tabela: len(dados.get(tabela, [])) for tabela in ("pessoas", "veiculos", "historico")}
@@ -0,0 +1,292 @@
+import bisect
+import gzip
+import json
+import os
+import shutil
+import tempfile
+from collections import OrderedDict
+from collections.abc import Sequence
+from itertools import islice
+
+# Quantos dias já lidos ficam guardados em memória (o dia atual quase sempre é um deles)
+DIAS_EM_CACHE = 4
+
+
+def _dia(data_hora: str) -> str:
+    """'AAAA-MM-DD HH:MM:SS' -> 'AAAA-MM-DD'."""
+    return data_hora[:10]
+
+
+class ParticoesHistorico:
+    """
+    Pasta com o histórico dividido em um arquivo por dia:
+      - AAAA-MM-DD.jsonl     dia aberto (uma movimentação por linha, só cresce)
+      - AAAA-MM-DD.jsonl.gz  dia encerrado, compactado pelo arquivador
+
+    Quem sabe quantas movimentações valem em cada dia é o manifesto
+    {dia: {"movimentos": n, "bytes": b}}, gravado no JSON principal. Linhas
+    além do manifesto (ex.: gravação interrompida antes de o JSON principal
+    ser trocado) são ignoradas na leitura e descartadas na próxima gravação.
+    """
+
+    def __init__(self, pasta):
+        self.pasta = pasta
+
+    def caminho(self, dia, compactado=False):
+        return os.path.join(self.pasta, f"{dia}.jsonl" + (".gz" if compactado else ""))
+
+    # --- LEITURA ---
+
+    def ler_dia(self, dia, quantidade):
+        """As 'quantidade' primeiras movimentações do dia (aberto ou arquivado)."""
+        if not quantidade:
+            return []
+        # O arquivador pode trocar .jsonl por .gz (ou o contrário) entre as tentativas
+        for caminho in (self.caminho(dia), self.caminho(dia, True), self.caminho(dia)):
+            abrir = gzip.open if caminho.endswith(".gz") else open
+            try:
+                with abrir(caminho, 'rt', encoding='utf-8') as f:
+                    # Um único json.loads para o dia inteiro (bem mais rápido que um por linha)
+                    return json.loads("[" + ",".join(islice(f, quantidade)) + "]")
+            except FileNotFoundError:
+                continue
+        raise FileNotFoundError(f"Arquivo do histórico de {dia} não encontrado em '{self.pasta}'.")
+
+    # --- ESCRITA ---
+
+    def _garantir_pasta(self):
+        os.makedirs(self.pasta, exist_ok=True)
+
+    def _desarquivar(self, dia):
+        """Movimento atrasado num dia já compactado: volta o dia para .jsonl."""
+        compactado = self.caminho(dia, True)
+        if os.path.exists(self.caminho(dia)) or not os.path.exists(compactado):
+            return
+        descritor, temporario = tempfile.mkstemp(prefix=f".{dia}-", suffix=".tmp", dir=self.pasta)
+        with os.fdopen(descritor, 'wb') as destino, gzip.open(compactado, 'rb') as origem:
+            shutil.copyfileobj(origem, destino)
+        os.replace(temporario, self.caminho(dia))
+        os.remove(compactado)
+
+    def anexar(self, dia, base, novos, manifesto_em_disco):
+        """
+        Acrescenta 'novos' ao arquivo do dia. 'base' é a entrada do manifesto
+        que quem chama leu junto com os dados.
+        Se o tamanho do arquivo não bate com a base, consulta o manifesto
+        gravado ('manifesto_em_disco()'): movimentos que outra gravação já
+        incorporou (ex.: a compactação do diário) não são repetidos e sobras
+        de uma gravação interrompida são cortadas.
+        Retorna a nova entrada do manifesto. Deve ser chamado sob trava exclusiva.
+        """
+        self._garantir_pasta()
+        self._desarquivar(dia)
+        caminho = self.caminho(dia)
+        tamanho = os.path.getsize(caminho) if os.path.exists(caminho) else 0
+
+        if tamanho != base["bytes"]:
+            disco = manifesto_em_disco().get(dia, {"movimentos": 0, "bytes": 0})
+            ja_gravados = max(0, disco["movimentos"] - base["movimentos"])
+            novos = novos[ja_gravados:]
+            base = disco
+
+        with open(caminho, 'a+b') as f:
+            f.truncate(base["bytes"])
+            f.seek(base["bytes"])
+            f.write("".join(json.dumps(r, ensure_ascii=False) + "\n" for r in novos).encode('utf-8'))
+            f.flush()
+            os.fsync(f.fileno())
+            return {"movimentos": base["movimentos"] + len(novos), "bytes": f.tell()}
+
+    def reescrever(self, registros):
+        """Grava o histórico inteiro do zero (conversão de um banco antigo). Retorna o manifesto."""
+        self._garantir_pasta()
+        por_dia = {}
+        for registro in registros:
+            por_dia.setdefault(_dia(registro["data_hora"]), []).append(registro)
+
+        manifesto = {}
+        for dia, lista in por_dia.items():
+            descritor, temporario = tempfile.mkstemp(prefix=f".{dia}-", suffix=".tmp", dir=self.pasta)
+            with os.fdopen(descritor, 'wb') as f:
+                f.write("".join(json.dumps(r, ensure_ascii=False) + "\n" for r in lista).encode('utf-8'))
+                f.flush()
+                os.fsync(f.fileno())
+                manifesto[dia] = {"movimentos": len(lista), "bytes": f.tell()}
+            os.replace(temporario, self.caminho(dia))
+
+        for nome in os.listdir(self.pasta):
+            if nome.endswith((".jsonl", ".jsonl.gz")) and not (nome.endswith(".jsonl") and nome[:-6] in manifesto):
+                os.remove(os.path.join(self.pasta, nome))
+        return manifesto
+
+    # --- ARQUIVAMENTO ---
+
+    def arquivar(self, manifesto, antes_de):
+        """
+        Compacta com gzip os dias anteriores a 'antes_de' ('AAAA-MM-DD') que
+        ainda estão abertos. Deve ser chamado sob trava exclusiva.
+        Retorna quantos dias foram compactados.
+        """
+        compactados = 0
+        for dia, info in sorted(manifesto.items()):
+            caminho = self.caminho(dia)
+            if dia >= antes_de or not os.path.exists(caminho):
+                continue
+            descritor, temporario = tempfile.mkstemp(prefix=f".{dia}-", suffix=".tmp", dir=self.pasta)
+            os.close(descritor)
+            with open(caminho, 'rb') as origem, gzip.open(temporario, 'wb') as destino:
+                destino.write(origem.read(info["bytes"]))
+            os.replace(temporario, self.caminho(dia, True))
+            os.remove(caminho)
+            compactados += 1
+        return compactados
+
+
+class HistoricoParticionado(Sequence):
+    """
+    O histórico de um banco particionado por dia, carregado sob demanda.
+
+    Por fora é a mesma lista de sempre (len(), índice, fatias, iteração e
+    append()), mas só o manifesto fica em memória: cada dia é lido do disco
+    quando alguém precisa dele (e os últimos DIAS_EM_CACHE dias ficam
+    guardados). Assim abrir o banco e registrar um movimento custam o mesmo
+    no 1º e no milésimo dia, e uma consulta por período só abre os dias do
+    período (registros_entre).
+
+    Os movimentos acrescentados com append() ficam pendentes até o banco
+    gravá-los (gravar_pendentes + confirmar).
+    """
+
+    __slots__ = ("particoes", "_manifesto", "_pendentes", "_quantidades", "_dias", "_acumulado", "_cache")
+
+    def __init__(self, particoes, manifesto):
+        self.particoes = particoes
+        self._manifesto = {dia: dict(info) for dia, info in manifesto.items()}
+        self._pendentes = []
+        self._cache = OrderedDict()
+        self._recalcular()
+
+    def _recalcular(self):
+        """Refaz a lista ordenada de dias e a posição inicial de cada um."""
+        self._quantidades = {dia: info["movimentos"] for dia, info in self._manifesto.items()}
+        for registro in self._pendentes:
+            dia = _dia(registro["data_hora"])
+            self._quantidades[dia] = self._quantidades.get(dia, 0) + 1
+        self._dias = sorted(self._quantidades)
+        self._acumulado = []
+        total = 0
+        for dia in self._dias:
+            self._acumulado.append(total)
+            total += self._quantidades[dia]
+        self._acumulado.append(total)
+
+    @property
+    def manifesto(self):
+        """Manifesto do que já está gravado em disco (sem os pendentes)."""
+        return {dia: dict(info) for dia, info in self._manifesto.items()}
+
+    @property
+    def dias(self):
+        return list(self._dias)
+
+    # --- LEITURA ---
+
+    def _do_dia(self, dia):
+        registros = self._cache.get(dia)
+        if registros is None:
+            info = self._manifesto.get(dia)
+            registros = self.particoes.ler_dia(dia, info["movimentos"]) if info else []
+            registros.extend(r for r in self._pendentes if _dia(r["data_hora"]) == dia)
+            self._cache[dia] = registros
+            if len(self._cache) > DIAS_EM_CACHE:
+                self._cache.popitem(last=False)
+        else:
+            self._cache.move_to_end(dia)
+        return registros
+
+    def __len__(self):
+        return self._acumulado[-1]
+
+    def __getitem__(self, indice):
+        if isinstance(indice, slice):
+            de, ate, passo = indice.indices(len(self))
+            if passo != 1:
+                return [self[i] for i in range(de, ate, passo)]
+            return list(self._intervalo(de, ate))
+        if indice < 0:
+            indice += len(self)
+        if not 0 <= indice < len(self):
+            raise IndexError("índice fora do histórico")
+        posicao = bisect.bisect_right(self._acumulado, indice) - 1
+        return self._do_dia(self._dias[posicao])[indice - self._acumulado[posicao]]
+
+    def _intervalo(self, de, ate):
+        """Movimentos das posições [de, ate), abrindo só os dias necessários."""
+        if de >= ate:
+            return
+        posicao = bisect.bisect_right(self._acumulado, de) - 1
+        while de < ate:
+            registros = self._do_dia(self._dias[posicao])
+            inicio_do_dia = self._acumulado[posicao]
+            yield from registros[de - inicio_do_dia:ate - inicio_do_dia]
+            de = self._acumulado[posicao + 1]
+            posicao += 1
+
+    def __iter__(self):
+        for dia in self._dias:
+            yield from self._do_dia(dia)
+
+    def registros_entre(self, inicio=None, fim=None):
+        """
+        Movimentos dos dias que tocam o período (sem filtrar a hora):
+        os demais dias nem são abertos.
+        :param inicio/fim: 'AAAA-MM-DD' ou 'AAAA-MM-DD HH:MM:SS'
+        """
+        de = bisect.bisect_left(self._dias, _dia(inicio)) if inicio else 0
+        ate = bisect.bisect_right(self._dias, _dia(fim)) if fim else len(self._dias)
+        for dia in self._dias[de:ate]:
+            yield from self._do_dia(dia)
+
+    def to_list(self):
+        return list(self)
+
+    def __repr__(self):
+        return f"<HistoricoParticionado: {len(self)} movimentações em {len(self._dias)} dia(s)>"
+
+    # --- ESCRITA ---
+
+    def append(self, registro: dict):
+        dia = _dia(registro["data_hora"])
+        self._pendentes.append(registro)
+        if dia in self._cache:
+            self._cache[dia].append(registro)
+        if self._dias and dia == self._dias[-1]:
+            self._quantidades[dia] += 1
+            self._acumulado[-1] += 1
+        else:
+            self._recalcular()  # primeiro movimento de um dia novo
+
+    def extend(self, registros):
+        for registro in registros:
+            self.append(registro)
+
+    def gravar_pendentes(self, manifesto_em_disco):
+        """
+        Grava os pendentes nos arquivos dos dias e devolve o manifesto
+        resultante, que só passa a valer depois de gravado no JSON principal
+        (e então confirmar() é chamado).
+        """
+        manifesto = self.manifesto
+        por_dia = {}
+        for registro in self._pendentes:
+            por_dia.setdefault(_dia(registro["data_hora"]), []).append(registro)
+        for dia, novos in por_dia.items():
+            base = manifesto.get(dia, {"movimentos": 0, "bytes": 0})
+            manifesto[dia] = self.particoes.anexar(dia, base, novos, manifesto_em_disco)
+        return manifesto
+
+    def confirmar(self, manifesto):
+        """Os pendentes estão no disco: passam a fazer parte do manifesto."""
+        self._manifesto = {dia: dict(info) for dia, info in manifesto.items()}
+        self._pendentes = []
+        self._recalcular()
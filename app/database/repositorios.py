@@ -1,91 +1,394 @@
-from app.database.conexao import BancoDeDadosJson
+import os
+from datetime import datetime
+from itertools import groupby
+from app.database.conexao import criar_banco, calcular_ocupacao, evento_ativo, BancoDeDadosJson, ConflitoDeVersao
+from app.database.autorizacoes import TabelaAutorizados
+from app.database.particoes import HistoricoParticionado
 from app.utils.validadores import ValidadorCPF
 from app.utils.validadores import ValidadorPlaca
+from app.utils.busca import IndicePlacasSemelhantes, IndiceTexto, normalizar_texto
 from app.models.registro import Registro
 from app.models.pessoa import Pessoa
 from app.models.veiculo import Veiculo
+from app.models.historico import HistoricoColunar, IndiceHistorico
+
+def _agora():
+    return datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+
+# --- EVENTOS (listas de eventos guardadas nos modos JSON) ---
+
+def _buscar_evento(eventos, evento_id):
+    for evento in eventos:
+        if evento["id"] == evento_id:
+            return evento
+    return None
+
+
+def _novo_evento(eventos, nome, abrir=False):
+    if abrir and evento_ativo(eventos):
+        raise ValueError("Já existe um evento em andamento. Encerre-o antes de abrir outro.")
+    evento = {
+        "id": max((e["id"] for e in eventos), default=0) + 1,
+        "nome": nome,
+        "inicio": _agora() if abrir else None,  # None: em preparação
+        "fim": None,
+        "autorizados": [],
+    }
+    eventos.append(evento)
+    return evento
+
+
+def _abrir_evento(eventos, evento_id):
+    evento = _buscar_evento(eventos, evento_id)
+    if evento is None or evento.get("fim"):
+        raise ValueError(f"Evento {evento_id} não existe ou já foi encerrado.")
+    if not evento.get("inicio"):
+        if evento_ativo(eventos):
+            raise ValueError("Já existe um evento em andamento. Encerre-o antes de abrir outro.")
+        evento["inicio"] = _agora()
+    return evento
+
+
+def _evento_alvo(eventos, evento_id=None):
+    """
+    Evento que recebe as autorizações: o informado; senão o que está em
+    andamento; senão o que está em preparação; senão um novo (em preparação).
+    """
+    if evento_id is not None:
+        evento = _buscar_evento(eventos, evento_id)
+        if evento is None or evento.get("fim"):
+            raise ValueError(f"Evento {evento_id} não existe ou já foi encerrado.")
+        return evento
+    ativo = evento_ativo(eventos)
+    if ativo:
+        return ativo
+    for evento in reversed(eventos):
+        if not evento.get("inicio"):
+            return evento
+    return _novo_evento(eventos, "Próximo evento")
+
+
+def _autorizar(evento, placa, autorizado):
+    """Inclui/retira a placa da lista do evento. Retorna True se mudou algo."""
+    lista = evento["autorizados"]
+    if autorizado and placa not in lista:
+        lista.append(placa)
+        return True
+    if not autorizado and placa in lista:
+        lista.remove(placa)
+        return True
+    return False
+
+
+def resumo_evento(evento):
+    """Dados do evento para exibição (sem a lista de placas)."""
+    if evento is None:
+        return None
+    if evento.get("fim"):
+        situacao = "ENCERRADO"
+    elif evento.get("inicio"):
+        situacao = "EM ANDAMENTO"
+    else:
+        situacao = "EM PREPARAÇÃO"
+    total = evento["total_autorizados"] if "total_autorizados" in evento else len(evento["autorizados"])
+    return {
+        "id": evento["id"], "nome": evento["nome"], "inicio": evento.get("inicio"),
+        "fim": evento.get("fim"), "situacao": situacao, "total_autorizados": total,
+    }
+
+
+def _placas_autorizadas(dados) -> set:
+    """Placas autorizadas no evento em andamento."""
+    ativo = evento_ativo(dados.get("eventos", []))
+    return set(ativo["autorizados"]) if ativo else set()
+
+
+def _com_status(v_dict, autorizados):
+    """Cópia do veículo com 'autorizado' = está na lista do evento em andamento."""
+    return {**v_dict, "autorizado": v_dict["placa"] in autorizados}
+
+
+def _nome_dono(v_dict, por_cpf):
+    """Nome do proprietário do veículo (ou None), pelo índice cpf -> pessoa."""
+    p_dict = por_cpf.get(v_dict["proprietario_cpf"])
+    return p_dict["nome"] if p_dict else None
+
+
+def _ocupacao_com_dono(ocupacao, por_placa, por_cpf):
+    """Junta ocupação, veículos e pessoas em memória (placas sem cadastro ficam de fora)."""
+    linhas = []
+    # Cópia dos itens (feita de uma vez, sob o GIL): no servidor a thread gravadora
+    # altera a mesma ocupação enquanto o relatório é montado
+    for placa, entrada in list(ocupacao.items()):
+        v_dict = por_placa.get(placa)
+        if v_dict:
+            linhas.append({"placa": placa, "modelo": v_dict["modelo"],
+                           "dono": _nome_dono(v_dict, por_cpf), "entrada": entrada})
+    return linhas
+
+
+def _aplicar_lote(dados, por_cpf, por_placa, pessoas, veiculos, autorizar):
+    """
+    Insere ou atualiza (upsert) pessoas e veículos em memória, usando os
+    índices por CPF e por placa. Campos vazios não sobrescrevem os existentes.
+    O campo 'autorizado' de cada veículo é repassado a autorizar(placa, status)
+    (lista do evento), e não fica gravado no veículo.
+    Retorna (contagem, placas cujo proprietário não existe).
+    """
+    contagem = {"pessoas": 0, "veiculos": 0}
+    sem_dono = []
+
+    for p_dict in pessoas:
+        existente = por_cpf.get(p_dict["cpf"])
+        if existente is None:
+            dados["pessoas"].append(p_dict)
+            por_cpf[p_dict["cpf"]] = p_dict
+        else:
+            existente.update({k: v for k, v in p_dict.items() if v})
+        contagem["pessoas"] += 1
+
+    for v_dict in veiculos:
+        if v_dict["proprietario_cpf"] not in por_cpf:
+            sem_dono.append(v_dict["placa"])
+            continue
+        v_dict = dict(v_dict)
+        autorizar(v_dict["placa"], bool(v_dict.pop("autorizado", False)))
+        existente = por_placa.get(v_dict["placa"])
+        if existente is None:
+            dados["veiculos"].append(v_dict)
+            por_placa[v_dict["placa"]] = v_dict
+        else:
+            existente.update({k: v for k, v in v_dict.items() if v})
+        contagem["veiculos"] += 1
+
+    return contagem, sem_dono
+
+
+def _data_hora(registro):
+    return registro["data_hora"]
+
+
+def _dia_do_registro(registro):
+    return registro["data_hora"][:10]
+
+
+def _filtrar_historico(historico, inicio, fim, placa, tipo):
+    """
+    Percorre o histórico aplicando os filtros e devolve o que passou em ordem
+    cronológica. O histórico fica na ordem em que foi gravado, que nem sempre
+    é a da 'data_hora' (relógio ajustado, registro importado ou reconstruído):
+    por isso nenhum filtro para no primeiro registro fora do período.
+    """
+    placa = ValidadorPlaca.limpar(placa) if placa else None
+    tipo = tipo.upper() if tipo else None
+    if isinstance(historico, HistoricoParticionado):
+        # Um arquivo por dia: só os dias do período são abertos, e cada um é ordenado à parte
+        blocos = (do_dia for _, do_dia in groupby(historico.registros_entre(inicio, fim), key=_dia_do_registro))
+    else:
+        blocos = (historico,)
+    for registros in blocos:
+        selecionados = []
+        for reg in registros:
+            if inicio and reg["data_hora"] < inicio:
+                continue
+            if fim and reg["data_hora"] > fim:
+                continue
+            if placa and reg["placa"] != placa:
+                continue
+            if tipo and reg["tipo"] != tipo:
+                continue
+            selecionados.append(reg)
+        # Ordenação estável: no mesmo segundo fica a ordem de gravação (e, já em ordem, custa O(n))
+        selecionados.sort(key=_data_hora)
+        yield from selecionados
+
 
 class RepositorioEstacionamento:
-    def __init__(self):
-        # Instancia a conexão que criamos antes
-        self.db = BancoDeDadosJson()
+    def __init__(self, db=None):
+        # Instancia a conexão que criamos antes (JSON simples ou com diário)
+        self.db = db or criar_banco()
+
+    def aquecer(self, completo=False):
+        """Adianta o que a primeira consulta teria de carregar (aqui nada: cada operação lê o banco)."""
+        pass
 
-    def resetar_todas_autorizacoes(self):
+    # --- EVENTOS ---
+
+    def encerrar_evento_ativo(self):
         """
-        Define autorizado = False para TODOS os veículos cadastrados.
-        Usado ao fim do evento.
+        Fecha a janela do evento em andamento (grava o 'fim'). Custo O(1):
+        os veículos não são tocados, só deixam de estar no evento ativo.
+        Retorna o resumo do evento encerrado ou None se não havia evento aberto.
         """
+        def encerrar(dados):
+            evento = evento_ativo(dados["eventos"])
+            if evento:
+                evento["fim"] = _agora()
+            return resumo_evento(evento)
+
+        # ler -> alterar -> salvar, repetindo se outro processo gravar no meio
+        return self.db.atualizar(encerrar)
+
+    def criar_evento(self, nome: str, abrir=False):
+        """Cria um evento em preparação (ou já aberto). Retorna o resumo."""
+        return self.db.atualizar(lambda dados: resumo_evento(_novo_evento(dados["eventos"], nome, abrir)))
+
+    def abrir_evento(self, evento_id: int):
+        """Inicia um evento em preparação. ValueError se já houver outro em andamento."""
+        return self.db.atualizar(lambda dados: resumo_evento(_abrir_evento(dados["eventos"], evento_id)))
+
+    def buscar_evento_ativo(self):
+        return resumo_evento(evento_ativo(self.db.ler()["eventos"]))
+
+    def listar_eventos(self):
+        return [resumo_evento(e) for e in self.db.ler()["eventos"]]
+
+    def listar_autorizados(self, evento_id=None):
+        """Veículos (dicionários) autorizados no evento informado ou no que está em andamento."""
+        return self._autorizados(self.db.ler(), evento_id)
+
+    @staticmethod
+    def _autorizados(dados, evento_id):
+        evento = _buscar_evento(dados["eventos"], evento_id) if evento_id else evento_ativo(dados["eventos"])
+        if evento is None:
+            return []
+        placas = set(evento["autorizados"])
+        ativos = _placas_autorizadas(dados)
+        return [_com_status(v, ativos) for v in dados["veiculos"] if v["placa"] in placas]
+
+    # --- CONSULTAS EM LOTE (RELATÓRIOS) ---
+    # Uma leitura do banco por relatório, por maior que ele seja (sem 1 busca por linha)
+
+    def buscar_pessoas_por_cpfs(self, cpfs) -> dict:
+        """{cpf: Pessoa} de vários CPFs de uma vez (os não cadastrados ficam de fora)."""
+        procurados = {ValidadorCPF.limpar(cpf) for cpf in cpfs}
+        return {p["cpf"]: Pessoa.from_storage(p) for p in self.db.ler()["pessoas"] if p["cpf"] in procurados}
+
+    def listar_autorizados_com_dono(self, evento_id=None):
+        """listar_autorizados() com o nome do proprietário em 'dono' (None se não cadastrado)."""
         dados = self.db.ler()
-        total_alterados = 0
+        por_cpf = {p["cpf"]: p for p in dados["pessoas"]}
+        return [{**v, "dono": _nome_dono(v, por_cpf)} for v in self._autorizados(dados, evento_id)]
 
-        for veiculo in dados["veiculos"]:
-            if veiculo.get("autorizado") == True:
-                veiculo["autorizado"] = False
-                total_alterados += 1
-        
-        # Só salva se houve alguma mudança para poupar disco
-        if total_alterados > 0:
-            self.db.salvar(dados)
-            
-        return total_alterados
+    def listar_ocupacao_com_dono(self):
+        """Veículos no pátio: [{'placa', 'modelo', 'dono', 'entrada'}] (placas sem cadastro ficam de fora)."""
+        dados = self.db.ler()
+        por_placa = {v["placa"]: v for v in dados["veiculos"]}
+        por_cpf = {p["cpf"]: p for p in dados["pessoas"]}
+        return _ocupacao_com_dono(dados.get("ocupacao", {}), por_placa, por_cpf)
+
+    def placa_autorizada(self, placa: str) -> bool:
+        """Só a resposta da portaria: a placa está autorizada no evento em andamento?"""
+        return ValidadorPlaca.limpar(placa) in _placas_autorizadas(self.db.ler())
 
-    def atualizar_status_veiculo(self, placa: str, novo_status: bool):
+    def atualizar_status_veiculo(self, placa: str, novo_status: bool, evento_id=None):
         """
-        Busca um veículo pela placa e atualiza apenas o campo 'autorizado'.
+        Autoriza/bloqueia a placa no evento em andamento (ou no informado; sem
+        evento aberto, no que está em preparação). Retorna False se a placa não existe.
         """
-        dados = self.db.ler()
-        
         # Precisamos da placa limpa para comparar
-        from app.utils.validadores import ValidadorPlaca
         placa_limpa = ValidadorPlaca.limpar(placa)
 
-        encontrou = False
-        for v_dict in dados["veiculos"]:
-            if v_dict["placa"] == placa_limpa:
-                v_dict["autorizado"] = novo_status # Atualiza o dicionário
-                encontrou = True
-                break # Para de procurar
-        
-        if encontrou:
-            self.db.salvar(dados) # Salva a lista modificada no arquivo
+        def atualizar(dados):
+            if not any(v_dict["placa"] == placa_limpa for v_dict in dados["veiculos"]):
+                return False
+            _autorizar(_evento_alvo(dados["eventos"], evento_id), placa_limpa, novo_status)
             return True
-        return False
+
+        return self.db.atualizar(atualizar)
     
     def registrar_movimentacao(self, placa: str, tipo: str):
         try:
             # A validação acontece aqui dentro do construtor Registro()
             novo_registro = Registro(placa, tipo)
             
-            dados = self.db.ler()
-            if "historico" not in dados:
-                dados["historico"] = []
-                
-            dados["historico"].append(novo_registro.to_dict())
-            self.db.salvar(dados)
+            # Quem decide como gravar é a conexão (reescrita completa ou diário)
+            self.db.anexar_movimentacao(novo_registro.to_dict())
             return True
         except ValueError as e:
             print(f"Erro grave ao registrar histórico: {e}")
             return False
         
     def listar_todos_veiculos(self):
-        """Retorna a lista crua de dicionários de todos os veículos."""
-        return self.db.ler()["veiculos"]
+        """Retorna a lista de dicionários de todos os veículos ('autorizado' = no evento em andamento)."""
+        dados = self.db.ler()
+        ativos = _placas_autorizadas(dados)
+        return [_com_status(v, ativos) for v in dados["veiculos"]]
 
     def listar_historico_completo(self):
         """Retorna a lista de movimentações registradas."""
         dados = self.db.ler()
         return dados.get("historico", []) # Retorna lista vazia se não houver histórico
 
+    def contar_historico(self) -> int:
+        """Quantidade de movimentações registradas."""
+        return len(self.listar_historico_completo())
+
+    def importar_lote(self, pessoas, veiculos):
+        """
+        Upsert em massa de pessoas e veículos (dicionários já validados e limpos)
+        com UMA única gravação no final.
+        Retorna (contagem, placas recusadas por falta de proprietário).
+        """
+        pessoas, veiculos = list(pessoas), list(veiculos)
+
+        def importar(dados):
+            por_cpf = {p["cpf"]: p for p in dados["pessoas"]}
+            por_placa = {v["placa"]: v for v in dados["veiculos"]}
+            evento = _evento_alvo(dados["eventos"])
+            return _aplicar_lote(dados, por_cpf, por_placa, pessoas, veiculos,
+                                 lambda placa, status: _autorizar(evento, placa, status))
+
+        return self.db.atualizar(importar)
+
+    def iterar_historico(self, inicio=None, fim=None, placa=None, tipo=None):
+        """
+        Gerador de movimentações filtradas, em ordem cronológica.
+        :param inicio/fim: 'AAAA-MM-DD HH:MM:SS' (limites inclusivos)
+        :param placa: Apenas esta placa
+        :param tipo: 'ENTRADA' ou 'SAIDA'
+        """
+        return _filtrar_historico(self.listar_historico_completo(), inicio, fim, placa, tipo)
+
+    def ultimos_movimentos(self, quantidade=20):
+        """Os 'quantidade' movimentos mais recentes, do mais novo para o mais antigo."""
+        if quantidade <= 0:
+            return []
+        return self.listar_historico_completo()[-quantidade:][::-1]
+
+    def historico_entre(self, inicio, fim):
+        """Movimentos entre 'inicio' e 'fim' ('AAAA-MM-DD HH:MM:SS', inclusivos), em ordem cronológica."""
+        return list(self.iterar_historico(inicio=inicio, fim=fim))
+
+    def historico_da_placa(self, placa):
+        """Todas as entradas/saídas de uma placa, em ordem cronológica."""
+        return list(self.iterar_historico(placa=placa))
+
+    # --- OCUPAÇÃO (VEÍCULOS NO PÁTIO) ---
+
+    def listar_ocupacao(self) -> dict:
+        """Retorna {placa: data_hora_entrada} dos veículos que estão no pátio."""
+        return dict(self.db.ler().get("ocupacao", {}))
+
+    def contar_ocupacao(self) -> int:
+        return len(self.listar_ocupacao())
+
+    def reconstruir_ocupacao(self):
+        """Recalcula a ocupação repassando o histórico (use se o dado estiver corrompido)."""
+        def reconstruir(dados):
+            dados["ocupacao"] = calcular_ocupacao(dados.get("historico", []))
+            return len(dados["ocupacao"])
+
+        return self.db.atualizar(reconstruir)
+
     # --- MÉTODOS PARA PESSOA ---
 
     def adicionar_pessoa(self, pessoa: Pessoa):
         """Recebe um objeto Pessoa e salva no banco."""
-        dados = self.db.ler()
-        
         # Converte o objeto para dicionário antes de salvar
-        dados["pessoas"].append(pessoa.to_dict())
-        
-        self.db.salvar(dados)
+        p_dict = pessoa.to_dict()
+        self.db.atualizar(lambda dados: dados["pessoas"].append(p_dict))
 
     def buscar_pessoa_por_cpf(self, cpf: str) -> Pessoa:
         """Busca no JSON e retorna um OBJETOO Pessoa (não um dicionário)."""
@@ -97,32 +400,62 @@ class RepositorioEstacionamento:
         for p_dict in dados["pessoas"]:
             if p_dict["cpf"] == cpf_limpo:
                 # Reconstrói o objeto a partir do dicionário
-                return Pessoa.from_dict(p_dict)
+                return Pessoa.from_storage(p_dict)
         
         return None
     
-    def buscar_pessoas_por_nome(self, nome_parcial: str):
-        """Busca pessoas que contenham o texto no nome (case insensitive)."""
+    def buscar_pessoas_por_nome(self, nome_parcial: str, limite=None):
+        """
+        Busca pessoas que contenham o texto no nome (sem diferenciar maiúsculas
+        nem acentos), das mais relevantes para as menos relevantes.
+        """
         dados = self.db.ler()
-        resultados = []
-        nome_busca = nome_parcial.lower()
-        
-        for p_dict in dados["pessoas"]:
-            if nome_busca in p_dict["nome"].lower():
-                resultados.append(Pessoa.from_dict(p_dict))
-        return resultados
+        # Uma passada só pelas pessoas: montar o índice a cada busca custaria mais que ela
+        por_cpf = {p_dict["cpf"]: p_dict for p_dict in dados["pessoas"]}
+        nomes = ((cpf, p_dict["nome"]) for cpf, p_dict in por_cpf.items())
+        return [Pessoa.from_storage(por_cpf[cpf]) for cpf in IndiceTexto.filtrar(nome_parcial, nomes, limite)]
 
     def listar_pessoas(self):
         """Retorna uma lista de objetos Pessoa."""
         dados = self.db.ler()
-        return [Pessoa.from_dict(p) for p in dados["pessoas"]]
+        return [Pessoa.from_storage(p) for p in dados["pessoas"]]
 
     # --- MÉTODOS PARA VEÍCULO ---
 
-    def adicionar_veiculo(self, veiculo: Veiculo):
+    def buscar_veiculos_por_trecho_placa(self, trecho: str, limite=None):
+        """
+        Veículos cuja placa contém o trecho (ex: os 4 últimos caracteres lidos
+        pelo porteiro), das mais relevantes para as menos relevantes.
+        """
+        dados = self.db.ler()
+        ativos = _placas_autorizadas(dados)
+        por_placa = {v_dict["placa"]: v_dict for v_dict in dados["veiculos"]}
+        placas = IndiceTexto.filtrar(trecho, ((p, p) for p in por_placa), limite, normalizar=ValidadorPlaca.limpar)
+        return [Veiculo.from_storage(_com_status(por_placa[p], ativos)) for p in placas]
+
+    def buscar_veiculos_semelhantes(self, placa: str, limite=5):
+        """
+        Veículos cuja placa é parecida com 'placa' (leitura errada da câmera ou
+        erro de digitação: O/0, I/1, um caractere trocado, faltando ou invertido),
+        do mais parecido para o menos parecido.
+        """
         dados = self.db.ler()
-        dados["veiculos"].append(veiculo.to_dict())
-        self.db.salvar(dados)
+        ativos = _placas_autorizadas(dados)
+        por_placa = {v_dict["placa"]: v_dict for v_dict in dados["veiculos"]}
+        semelhantes = IndicePlacasSemelhantes.filtrar(placa, por_placa, limite, normalizar=ValidadorPlaca.limpar)
+        return [Veiculo.from_storage(_com_status(por_placa[p], ativos)) for p, _ in semelhantes]
+
+    def adicionar_veiculo(self, veiculo: Veiculo, evento_id=None):
+        """Salva o veículo; se veiculo.autorizado, a placa entra na lista do evento."""
+        v_dict = veiculo.to_dict()
+        autorizado = v_dict.pop("autorizado")
+
+        def adicionar(dados):
+            dados["veiculos"].append(v_dict)
+            if autorizado:
+                _autorizar(_evento_alvo(dados["eventos"], evento_id), v_dict["placa"], True)
+
+        self.db.atualizar(adicionar)
 
     def buscar_veiculo_por_placa(self, placa: str) -> Veiculo:
         dados = self.db.ler()
@@ -131,16 +464,818 @@ class RepositorioEstacionamento:
 
         for v_dict in dados["veiculos"]:
             if v_dict["placa"] == placa_limpa:
-                return Veiculo.from_dict(v_dict)
+                return Veiculo.from_storage(_com_status(v_dict, _placas_autorizadas(dados)))
         
         return None
     
     def buscar_veiculos_por_cpf(self, cpf: str):
         """Retorna lista de objetos Veiculo de um CPF."""
         dados = self.db.ler()
+        ativos = _placas_autorizadas(dados)
         cpf_limpo = ValidadorCPF.limpar(cpf)
         lista = []
         for v_dict in dados["veiculos"]:
             if v_dict["proprietario_cpf"] == cpf_limpo:
-                lista.append(Veiculo.from_dict(v_dict))
-        return lista
\ No newline at end of file
+                lista.append(Veiculo.from_storage(_com_status(v_dict, ativos)))
+        return lista
+
+class RepositorioIndexado(RepositorioEstacionamento):
+    """
+    Mesma API do RepositorioEstacionamento, mas carrega o banco UMA vez e
+    mantém índices em memória (dicionários):
+      - placa -> veículo
+      - cpf   -> pessoa
+      - cpf   -> lista de veículos (montado na primeira busca por CPF)
+      - evento -> conjunto de placas autorizadas (montado na primeira consulta ao evento)
+      - trigramas do nome -> pessoas e trigramas da placa -> veículos
+        (IndiceTexto, montados na primeira busca por nome/trecho de placa)
+      - pedaços da placa -> veículos com placa parecida (IndicePlacasSemelhantes,
+        montado na primeira busca por placa semelhante)
+
+    O carregamento pode ser adiantado com aquecer() (ex.: numa thread,
+    enquanto o menu é desenhado).
+
+    placa_autorizada() responde pela TabelaAutorizados do evento em
+    andamento (placas como inteiros), corrigida a cada autorização em vez de
+    remontada. Com arquivo_autorizados, a tabela é regravada nesse arquivo
+    sempre que muda, para processos de portaria que só consultam (mmap).
+
+    As buscas da portaria viram O(1) e não releem o banco. Antes de cada
+    operação a versão do banco (contador no arquivo '.lock') é conferida: se
+    outro processo alterou o banco, o cache é descartado e recarregado.
+
+    Com exclusivo=True (ex.: o servidor, único processo que grava) essa
+    conferência é dispensada e as leituras ficam 100% em memória.
+
+    O histórico também é indexado (IndiceHistorico): por data/hora em
+    segundos (busca binária) e por placa, atualizado só com o que foi
+    acrescentado desde a última consulta.
+
+    Com historico_colunar=True o histórico em memória fica num
+    HistoricoColunar (inteiros/bytes em vez de dicionários), que ocupa uma
+    fração da memória em bancos com milhões de movimentações.
+
+    Num banco com histórico particionado por dia (HistoricoParticionado) o
+    histórico não é carregado nem indexado por inteiro: as consultas abrem
+    só os dias de que precisam.
+    """
+
+    def __init__(self, db=None, exclusivo=False, historico_colunar=False, arquivo_autorizados=None):
+        super().__init__(db)
+        self.exclusivo = exclusivo
+        self.historico_colunar = historico_colunar
+        self.arquivo_autorizados = arquivo_autorizados
+        self._dados = None
+        self._assinatura = None
+        self._por_placa = {}
+        self._por_cpf = {}
+        self._veiculos_por_cpf = None
+        self._indice_historico = IndiceHistorico()
+        self._indice_nomes = None
+        self._indice_placas = None
+        self._indice_semelhantes = None
+        self._autorizados = {}
+        self._tabela_autorizados = None
+        self._tabela_alterada = False
+        self._indices_completos = False
+
+    # --- CACHE E ÍNDICES ---
+
+    def _carregar(self):
+        """Garante que o cache está atualizado e o retorna."""
+        if self.exclusivo and self._dados is not None:
+            return self._dados
+
+        assinatura = self.db.assinatura()
+        if self._dados is None or assinatura != self._assinatura:
+            self._dados = self.db.ler()
+            self._dados.setdefault("pessoas", [])
+            self._dados.setdefault("veiculos", [])
+            self._dados.setdefault("historico", [])
+            self._dados.setdefault("ocupacao", {})
+            if self.historico_colunar and not isinstance(self._dados["historico"], HistoricoParticionado):
+                self._dados["historico"] = HistoricoColunar(self._dados["historico"])
+            self._assinatura = self._dados.get("_versao", assinatura)
+            self._indice_historico = IndiceHistorico()  # refeito sob demanda
+            self._reindexar()
+        return self._dados
+
+    def _reindexar(self):
+        # Só os índices da portaria, montados em bloco; os demais ficam para a primeira consulta
+        por_placa = {v_dict["placa"]: v_dict for v_dict in self._dados["veiculos"]}
+        por_cpf = {p_dict["cpf"]: p_dict for p_dict in self._dados["pessoas"]}
+        veiculos_por_cpf = indice_nomes = indice_placas = indice_semelhantes = None  # refeitos sob demanda
+        if self._indices_completos:
+            # Depois de aquecer(completo=True) (ex.: servidor) ninguém monta índice na hora da
+            # consulta: os novos são montados aqui, ao lado dos antigos, e trocados de uma vez
+            veiculos_por_cpf = self._montar_veiculos_por_cpf()
+            indice_nomes = self._montar_indice_nomes()
+            indice_placas = self._montar_indice_placas(por_placa)
+            indice_semelhantes = self._montar_indice_semelhantes(por_placa)
+        self._por_placa, self._por_cpf = por_placa, por_cpf
+        self._veiculos_por_cpf = veiculos_por_cpf
+        self._indice_nomes = indice_nomes
+        self._indice_placas = indice_placas
+        self._indice_semelhantes = indice_semelhantes
+        self._autorizados = {}
+        self._tabela_autorizados = None
+
+    def aquecer(self, completo=False):
+        """
+        Carrega o banco e monta os índices da portaria agora, em vez de na primeira consulta.
+        Com completo=True também os de busca por CPF, nome e placa parecida, e daí em
+        diante _reindexar() os refaz na hora (ver ServidorEstacionamento).
+        """
+        self._carregar()
+        self._ativos()
+        self._tabela_ativa()
+        self._publicar_autorizados()
+        if completo:
+            self._indices_completos = True
+            self._indice_veiculos_por_cpf()
+            self._indice_de_nomes()
+            self._indice_de_placas()
+            self._indice_de_semelhantes()
+
+    def _placas_do_evento(self, evento):
+        """Conjunto de placas autorizadas no evento (montado na primeira vez)."""
+        placas = self._autorizados.get(evento["id"])
+        if placas is None:
+            # setdefault: se outra thread montou o conjunto ao mesmo tempo, fica valendo um só
+            placas = self._autorizados.setdefault(evento["id"], set(evento["autorizados"]))
+        return placas
+
+    def _ativos(self):
+        """Conjunto de placas autorizadas no evento em andamento."""
+        ativo = evento_ativo(self._carregar()["eventos"])
+        return self._placas_do_evento(ativo) if ativo else frozenset()
+
+    def _autorizar(self, evento, placa, autorizado):
+        placas = self._placas_do_evento(evento)
+        if autorizado and placa not in placas:
+            placas.add(placa)
+            evento["autorizados"].append(placa)
+        elif not autorizado and placa in placas:
+            placas.discard(placa)
+            evento["autorizados"].remove(placa)
+        else:
+            return
+        tabela = self._tabela_autorizados
+        if tabela is not None and tabela.evento_id == evento["id"]:
+            if autorizado:
+                tabela.adicionar(placa)
+            else:
+                tabela.remover(placa)
+            self._tabela_alterada = True
+
+    def _tabela_ativa(self):
+        """TabelaAutorizados do evento em andamento (remontada só quando o evento muda)."""
+        ativo = evento_ativo(self._carregar()["eventos"])
+        evento_id = ativo["id"] if ativo else None
+        tabela = self._tabela_autorizados
+        if tabela is None or tabela.evento_id != evento_id:
+            tabela = TabelaAutorizados(ativo["autorizados"] if ativo else (), evento_id)
+            self._tabela_autorizados = tabela
+            self._tabela_alterada = True
+        return tabela
+
+    def _publicar_autorizados(self):
+        """Regrava o arquivo_autorizados se a tabela do evento em andamento mudou."""
+        if self.arquivo_autorizados is None:
+            return
+        tabela = self._tabela_ativa()
+        if self._tabela_alterada:
+            tabela.salvar(self.arquivo_autorizados)
+            self._tabela_alterada = False
+
+    # Os índices são montados por inteiro antes de ficarem visíveis (atribuição única)
+
+    def _montar_indice_nomes(self):
+        indice = IndiceTexto()
+        for p_dict in self._dados["pessoas"]:
+            indice.adicionar(p_dict["cpf"], p_dict["nome"])
+        return indice
+
+    @staticmethod
+    def _montar_indice_placas(por_placa):
+        indice = IndiceTexto(normalizar=ValidadorPlaca.limpar)
+        for placa in por_placa:
+            indice.adicionar(placa, placa)
+        return indice
+
+    @staticmethod
+    def _montar_indice_semelhantes(por_placa):
+        indice = IndicePlacasSemelhantes(normalizar=ValidadorPlaca.limpar)
+        for placa in por_placa:
+            indice.adicionar(placa)
+        return indice
+
+    def _montar_veiculos_por_cpf(self):
+        veiculos_por_cpf = {}
+        for v_dict in self._dados["veiculos"]:
+            veiculos_por_cpf.setdefault(v_dict["proprietario_cpf"], []).append(v_dict)
+        return veiculos_por_cpf
+
+    def _indice_de_nomes(self):
+        self._carregar()
+        if self._indice_nomes is None:
+            self._indice_nomes = self._montar_indice_nomes()
+        return self._indice_nomes
+
+    def _indice_de_placas(self):
+        self._carregar()
+        if self._indice_placas is None:
+            self._indice_placas = self._montar_indice_placas(self._por_placa)
+        return self._indice_placas
+
+    def _indice_de_semelhantes(self):
+        self._carregar()
+        if self._indice_semelhantes is None:
+            self._indice_semelhantes = self._montar_indice_semelhantes(self._por_placa)
+        return self._indice_semelhantes
+
+    def _historico_indexado(self):
+        """Histórico do cache + índice em dia com os movimentos acrescentados."""
+        historico = self._carregar()["historico"]
+        self._indice_historico.atualizar(historico)
+        return historico, self._indice_historico
+
+    def _indice_veiculos_por_cpf(self):
+        self._carregar()
+        if self._veiculos_por_cpf is None:
+            self._veiculos_por_cpf = self._montar_veiculos_por_cpf()
+        return self._veiculos_por_cpf
+
+    def _indexar_veiculo(self, v_dict):
+        self._por_placa[v_dict["placa"]] = v_dict
+        if self._veiculos_por_cpf is not None:
+            self._veiculos_por_cpf.setdefault(v_dict["proprietario_cpf"], []).append(v_dict)
+        if self._indice_placas is not None:
+            self._indice_placas.adicionar(v_dict["placa"], v_dict["placa"])
+        if self._indice_semelhantes is not None:
+            self._indice_semelhantes.adicionar(v_dict["placa"])
+
+    def _alterar(self, operacao):
+        """
+        Executa 'operacao(dados)' sobre o cache (ela altera e grava). Se outro
+        processo gravou desde a última leitura (ConflitoDeVersao), descarta o
+        cache, recarrega e tenta de novo. Nossa própria gravação não invalida o cache.
+        """
+        for _ in range(BancoDeDadosJson.TENTATIVAS):
+            dados = self._carregar()
+            try:
+                resultado = operacao(dados)
+            except ConflitoDeVersao:
+                self._dados = None
+                continue
+            self._assinatura = dados.get("_versao")
+            self._publicar_autorizados()
+            return resultado
+        raise ConflitoDeVersao(f"Não foi possível gravar após {BancoDeDadosJson.TENTATIVAS} tentativas.")
+
+    # --- EVENTOS ---
+
+    def encerrar_evento_ativo(self):
+        def encerrar(dados):
+            evento = evento_ativo(dados["eventos"])
+            # Só salva se havia evento aberto, para poupar disco
+            if evento:
+                evento["fim"] = _agora()
+                self.db.salvar(dados)
+            return resumo_evento(evento)
+
+        return self._alterar(encerrar)
+
+    def criar_evento(self, nome: str, abrir=False):
+        def criar(dados):
+            evento = _novo_evento(dados["eventos"], nome, abrir)
+            self.db.salvar(dados)
+            return resumo_evento(evento)
+
+        return self._alterar(criar)
+
+    def abrir_evento(self, evento_id: int):
+        def abrir(dados):
+            evento = _abrir_evento(dados["eventos"], evento_id)
+            self.db.salvar(dados)
+            return resumo_evento(evento)
+
+        return self._alterar(abrir)
+
+    def buscar_evento_ativo(self):
+        return resumo_evento(evento_ativo(self._carregar()["eventos"]))
+
+    def listar_eventos(self):
+        return [resumo_evento(e) for e in self._carregar()["eventos"]]
+
+    def listar_autorizados(self, evento_id=None):
+        eventos = self._carregar()["eventos"]
+        evento = _buscar_evento(eventos, evento_id) if evento_id else evento_ativo(eventos)
+        if evento is None:
+            return []
+        # Só as placas do evento: não percorre todos os veículos
+        ativos = self._ativos()
+        return [_com_status(self._por_placa[p], ativos) for p in evento["autorizados"] if p in self._por_placa]
+
+    def buscar_pessoas_por_cpfs(self, cpfs) -> dict:
+        self._carregar()
+        encontrados = (self._por_cpf.get(ValidadorCPF.limpar(cpf)) for cpf in cpfs)
+        return {p["cpf"]: Pessoa.from_storage(p) for p in encontrados if p}
+
+    def listar_autorizados_com_dono(self, evento_id=None):
+        return [{**v, "dono": _nome_dono(v, self._por_cpf)} for v in self.listar_autorizados(evento_id)]
+
+    def listar_ocupacao_com_dono(self):
+        return _ocupacao_com_dono(self._carregar()["ocupacao"], self._por_placa, self._por_cpf)
+
+    def placa_autorizada(self, placa: str) -> bool:
+        return placa in self._tabela_ativa()
+
+    # --- ESCRITA ---
+
+    def atualizar_status_veiculo(self, placa: str, novo_status: bool, evento_id=None):
+        placa_limpa = ValidadorPlaca.limpar(placa)
+
+        def atualizar(dados):
+            if placa_limpa not in self._por_placa:
+                return False
+            self._autorizar(_evento_alvo(dados["eventos"], evento_id), placa_limpa, novo_status)
+            self.db.salvar(dados)
+            return True
+
+        return self._alterar(atualizar)
+
+    def registrar_movimentacao(self, placa: str, tipo: str):
+        try:
+            novo_registro = Registro(placa, tipo)
+        except ValueError as e:
+            print(f"Erro grave ao registrar histórico: {e}")
+            return False
+
+        registro = novo_registro.to_dict()
+        self._alterar(lambda dados: self.db.anexar_movimentacao(registro, dados=dados))
+        return True
+
+    def adicionar_pessoa(self, pessoa: Pessoa):
+        p_dict = pessoa.to_dict()
+
+        def adicionar(dados):
+            dados["pessoas"].append(p_dict)
+            self._por_cpf[p_dict["cpf"]] = p_dict
+            if self._indice_nomes is not None:
+                self._indice_nomes.adicionar(p_dict["cpf"], p_dict["nome"])
+            self.db.salvar(dados)
+
+        self._alterar(adicionar)
+
+    def adicionar_veiculo(self, veiculo: Veiculo, evento_id=None):
+        v_dict = veiculo.to_dict()
+        autorizado = v_dict.pop("autorizado")
+
+        def adicionar(dados):
+            dados["veiculos"].append(v_dict)
+            self._indexar_veiculo(v_dict)
+            if autorizado:
+                self._autorizar(_evento_alvo(dados["eventos"], evento_id), v_dict["placa"], True)
+            self.db.salvar(dados)
+
+        self._alterar(adicionar)
+
+    def importar_lote(self, pessoas, veiculos):
+        pessoas, veiculos = list(pessoas), list(veiculos)
+
+        def importar(dados):
+            evento = _evento_alvo(dados["eventos"])
+            resultado = _aplicar_lote(dados, self._por_cpf, self._por_placa, pessoas, veiculos,
+                                      lambda placa, status: self._autorizar(evento, placa, status))
+            # Um veículo pode ter trocado de dono: refaz o índice cpf -> veículos
+            self._reindexar()
+            self.db.salvar(dados)
+            return resultado
+
+        return self._alterar(importar)
+
+    # --- LEITURA ---
+
+    def listar_todos_veiculos(self):
+        ativos = self._ativos()
+        return [_com_status(v, ativos) for v in self._carregar()["veiculos"]]
+
+    def listar_historico_completo(self):
+        return list(self._carregar()["historico"])
+
+    def contar_historico(self) -> int:
+        return len(self._carregar()["historico"])
+
+    def iterar_historico(self, inicio=None, fim=None, placa=None, tipo=None):
+        historico = self._carregar()["historico"]
+        if isinstance(historico, HistoricoParticionado):
+            # Indexar exigiria ler todos os dias: filtra só os dias do período
+            return _filtrar_historico(historico, inicio, fim, placa, tipo)
+        historico, indice = self._historico_indexado()
+        # Busca binária no período (e só nas posições da placa, se informada)
+        posicoes = indice.posicoes(inicio, fim, ValidadorPlaca.limpar(placa) if placa else None)
+        tipo = tipo.upper() if tipo else None
+        return (
+            historico[i] for i in posicoes
+            if tipo is None or historico[i]["tipo"] == tipo
+        )
+
+    def ultimos_movimentos(self, quantidade=20):
+        if quantidade <= 0:
+            return []
+        return self._carregar()["historico"][-quantidade:][::-1]
+
+    def listar_pessoas(self):
+        return [Pessoa.from_storage(p) for p in self._carregar()["pessoas"]]
+
+    def listar_ocupacao(self) -> dict:
+        return dict(self._carregar()["ocupacao"])
+
+    def contar_ocupacao(self) -> int:
+        return len(self._carregar()["ocupacao"])
+
+    def reconstruir_ocupacao(self):
+        def reconstruir(dados):
+            dados["ocupacao"] = calcular_ocupacao(dados["historico"])
+            self.db.salvar(dados)
+            return len(dados["ocupacao"])
+
+        return self._alterar(reconstruir)
+
+    def buscar_pessoas_por_nome(self, nome_parcial: str, limite=None):
+        cpfs = self._indice_de_nomes().buscar(nome_parcial, limite)
+        return [Pessoa.from_storage(self._por_cpf[cpf]) for cpf in cpfs]
+
+    def buscar_veiculos_por_trecho_placa(self, trecho: str, limite=None):
+        placas = self._indice_de_placas().buscar(trecho, limite)
+        ativos = self._ativos()
+        return [Veiculo.from_storage(_com_status(self._por_placa[placa], ativos)) for placa in placas]
+
+    def buscar_veiculos_semelhantes(self, placa: str, limite=5):
+        semelhantes = self._indice_de_semelhantes().buscar(placa, limite)
+        ativos = self._ativos()
+        return [Veiculo.from_storage(_com_status(self._por_placa[p], ativos)) for p, _ in semelhantes]
+
+    def buscar_pessoa_por_cpf(self, cpf: str) -> Pessoa:
+        self._carregar()
+        p_dict = self._por_cpf.get(ValidadorCPF.limpar(cpf))
+        return Pessoa.from_storage(p_dict) if p_dict else None
+
+    def buscar_veiculo_por_placa(self, placa: str) -> Veiculo:
+        self._carregar()
+        v_dict = self._por_placa.get(ValidadorPlaca.limpar(placa))
+        return Veiculo.from_storage(_com_status(v_dict, self._ativos())) if v_dict else None
+
+    def buscar_veiculos_por_cpf(self, cpf: str):
+        ativos = self._ativos()
+        lista = self._indice_veiculos_por_cpf().get(ValidadorCPF.limpar(cpf), [])
+        return [Veiculo.from_storage(_com_status(v_dict, ativos)) for v_dict in lista]
+
+
+class RepositorioSQLite(RepositorioEstacionamento):
+    """
+    Mesma API do RepositorioEstacionamento sobre o BancoDeDadosSQLite.
+    Cada operação vira uma consulta indexada ou um UPDATE pontual, sem
+    ler/regravar o banco inteiro.
+    """
+
+    # 'autorizado' = a placa está na lista do evento em andamento (busca pela chave primária)
+    COLUNAS_VEICULO = (
+        "veiculos.placa, modelo, cor, proprietario_cpf, EXISTS("
+        "SELECT 1 FROM autorizacoes a WHERE a.evento_id = (SELECT id FROM evento_ativo) "
+        "AND a.placa = veiculos.placa) AS autorizado"
+    )
+    COLUNAS_EVENTO = (
+        "id, nome, inicio, fim, "
+        "(SELECT COUNT(*) FROM autorizacoes a WHERE a.evento_id = eventos.id) AS total_autorizados"
+    )
+
+    def __init__(self, db=None):
+        if db is None:
+            # Import tardio: quem usa só JSON não precisa carregar o sqlite3
+            from app.database.conexao_sqlite import BancoDeDadosSQLite
+            db = BancoDeDadosSQLite()
+        super().__init__(db)
+
+    @staticmethod
+    def _veiculo_dict(linha):
+        linha["autorizado"] = bool(linha["autorizado"])
+        return linha
+
+    @staticmethod
+    def _evento_alvo(conexao, evento_id=None):
+        """Mesma regra do _evento_alvo dos modos JSON, dentro de uma transação. Retorna o id."""
+        if evento_id is not None:
+            linha = conexao.execute("SELECT id FROM eventos WHERE id = ? AND fim IS NULL", (evento_id,)).fetchone()
+            if linha is None:
+                raise ValueError(f"Evento {evento_id} não existe ou já foi encerrado.")
+            return linha["id"]
+        linha = (conexao.execute("SELECT id FROM evento_ativo").fetchone()
+                 or conexao.execute("SELECT id FROM eventos WHERE inicio IS NULL AND fim IS NULL "
+                                    "ORDER BY id DESC LIMIT 1").fetchone())
+        if linha:
+            return linha["id"]
+        return conexao.execute("INSERT INTO eventos (nome) VALUES ('Próximo evento')").lastrowid
+
+    def _resumo(self, evento_id):
+        linhas = self.db.consultar(f"SELECT {self.COLUNAS_EVENTO} FROM eventos WHERE id = ?", (evento_id,))
+        return resumo_evento(linhas[0]) if linhas else None
+
+    # --- EVENTOS ---
+
+    def encerrar_evento_ativo(self):
+        with self.db.transacao() as conexao:
+            linha = conexao.execute("SELECT id FROM evento_ativo").fetchone()
+            if linha is None:
+                return None
+            conexao.execute("UPDATE eventos SET fim = ? WHERE id = ?", (_agora(), linha["id"]))
+        return self._resumo(linha["id"])
+
+    def criar_evento(self, nome: str, abrir=False):
+        with self.db.transacao() as conexao:
+            if abrir and conexao.execute("SELECT 1 FROM evento_ativo").fetchone():
+                raise ValueError("Já existe um evento em andamento. Encerre-o antes de abrir outro.")
+            evento_id = conexao.execute(
+                "INSERT INTO eventos (nome, inicio) VALUES (?, ?)", (nome, _agora() if abrir else None)
+            ).lastrowid
+        return self._resumo(evento_id)
+
+    def abrir_evento(self, evento_id: int):
+        with self.db.transacao() as conexao:
+            evento = conexao.execute("SELECT inicio, fim FROM eventos WHERE id = ?", (evento_id,)).fetchone()
+            if evento is None or evento["fim"]:
+                raise ValueError(f"Evento {evento_id} não existe ou já foi encerrado.")
+            if not evento["inicio"]:
+                if conexao.execute("SELECT 1 FROM evento_ativo").fetchone():
+                    raise ValueError("Já existe um evento em andamento. Encerre-o antes de abrir outro.")
+                conexao.execute("UPDATE eventos SET inicio = ? WHERE id = ?", (_agora(), evento_id))
+        return self._resumo(evento_id)
+
+    def buscar_evento_ativo(self):
+        linhas = self.db.consultar("SELECT id FROM evento_ativo")
+        return self._resumo(linhas[0]["id"]) if linhas else None
+
+    def listar_eventos(self):
+        return [resumo_evento(e) for e in self.db.consultar(f"SELECT {self.COLUNAS_EVENTO} FROM eventos ORDER BY id")]
+
+    def listar_autorizados(self, evento_id=None):
+        linhas = self.db.consultar(
+            f"SELECT {self.COLUNAS_VEICULO} FROM autorizacoes "
+            "JOIN veiculos ON veiculos.placa = autorizacoes.placa "
+            "WHERE autorizacoes.evento_id = COALESCE(?, (SELECT id FROM evento_ativo)) ORDER BY veiculos.id",
+            (evento_id,),
+        )
+        return [self._veiculo_dict(l) for l in linhas]
+
+    # Limite seguro de parâmetros '?' por consulta (SQLite antigo: 999)
+    LOTE_PARAMETROS = 500
+
+    def buscar_pessoas_por_cpfs(self, cpfs) -> dict:
+        procurados = sorted({ValidadorCPF.limpar(cpf) for cpf in cpfs})
+        encontrados = {}
+        for i in range(0, len(procurados), self.LOTE_PARAMETROS):
+            lote = procurados[i:i + self.LOTE_PARAMETROS]
+            marcadores = ", ".join("?" * len(lote))
+            for linha in self.db.consultar(f"SELECT nome, cpf, contato FROM pessoas WHERE cpf IN ({marcadores})", lote):
+                encontrados[linha["cpf"]] = Pessoa.from_storage(linha)
+        return encontrados
+
+    def listar_autorizados_com_dono(self, evento_id=None):
+        linhas = self.db.consultar(
+            f"SELECT {self.COLUNAS_VEICULO}, pessoas.nome AS dono FROM autorizacoes "
+            "JOIN veiculos ON veiculos.placa = autorizacoes.placa "
+            "LEFT JOIN pessoas ON pessoas.cpf = veiculos.proprietario_cpf "
+            "WHERE autorizacoes.evento_id = COALESCE(?, (SELECT id FROM evento_ativo)) ORDER BY veiculos.id",
+            (evento_id,),
+        )
+        return [self._veiculo_dict(l) for l in linhas]
+
+    def listar_ocupacao_com_dono(self):
+        return self.db.consultar(
+            "SELECT o.placa, v.modelo, p.nome AS dono, o.data_hora AS entrada FROM ocupacao o "
+            "JOIN veiculos v ON v.placa = o.placa "
+            "LEFT JOIN pessoas p ON p.cpf = v.proprietario_cpf "
+            "ORDER BY o.data_hora"
+        )
+
+    def placa_autorizada(self, placa: str) -> bool:
+        linhas = self.db.consultar(
+            "SELECT 1 FROM autorizacoes WHERE evento_id = (SELECT id FROM evento_ativo) AND placa = ?",
+            (ValidadorPlaca.limpar(placa),),
+        )
+        return bool(linhas)
+
+    # --- ESCRITA ---
+
+    def atualizar_status_veiculo(self, placa: str, novo_status: bool, evento_id=None):
+        placa_limpa = ValidadorPlaca.limpar(placa)
+        with self.db.transacao() as conexao:
+            if not conexao.execute("SELECT 1 FROM veiculos WHERE placa = ?", (placa_limpa,)).fetchone():
+                return False
+            alvo = self._evento_alvo(conexao, evento_id)
+            if novo_status:
+                conexao.execute("INSERT OR IGNORE INTO autorizacoes (evento_id, placa) VALUES (?, ?)", (alvo, placa_limpa))
+            else:
+                conexao.execute("DELETE FROM autorizacoes WHERE evento_id = ? AND placa = ?", (alvo, placa_limpa))
+        return True
+
+    def adicionar_pessoa(self, pessoa: Pessoa):
+        self.db.executar(
+            "INSERT INTO pessoas (nome, cpf, contato) VALUES (:nome, :cpf, :contato)",
+            pessoa.to_dict(),
+        )
+
+    def adicionar_veiculo(self, veiculo: Veiculo, evento_id=None):
+        v_dict = veiculo.to_dict()
+        with self.db.transacao() as conexao:
+            conexao.execute(
+                "INSERT INTO veiculos (placa, modelo, cor, proprietario_cpf) "
+                "VALUES (:placa, :modelo, :cor, :proprietario_cpf)",
+                v_dict,
+            )
+            if v_dict["autorizado"]:
+                conexao.execute(
+                    "INSERT OR IGNORE INTO autorizacoes (evento_id, placa) VALUES (?, ?)",
+                    (self._evento_alvo(conexao, evento_id), v_dict["placa"]),
+                )
+
+    def importar_lote(self, pessoas, veiculos):
+        pessoas = list(pessoas)
+        veiculos = list(veiculos)
+        cpfs_lote = {p["cpf"] for p in pessoas}
+
+        # Donos que não vieram no arquivo precisam já existir no banco
+        cpfs_fora = list({v["proprietario_cpf"] for v in veiculos} - cpfs_lote)
+        cpfs_existentes = set(cpfs_lote)
+        for i in range(0, len(cpfs_fora), 500):
+            bloco = cpfs_fora[i:i + 500]
+            marcadores = ",".join("?" * len(bloco))
+            linhas = self.db.consultar(f"SELECT cpf FROM pessoas WHERE cpf IN ({marcadores})", bloco)
+            cpfs_existentes.update(l["cpf"] for l in linhas)
+
+        sem_dono = [v["placa"] for v in veiculos if v["proprietario_cpf"] not in cpfs_existentes]
+        veiculos = [v for v in veiculos if v["proprietario_cpf"] in cpfs_existentes]
+
+        with self.db.transacao() as conexao:
+            conexao.executemany(
+                "INSERT INTO pessoas (nome, cpf, contato) VALUES (:nome, :cpf, :contato) "
+                "ON CONFLICT(cpf) DO UPDATE SET "
+                "nome = COALESCE(NULLIF(excluded.nome, ''), nome), "
+                "contato = COALESCE(NULLIF(excluded.contato, ''), contato)",
+                pessoas,
+            )
+            conexao.executemany(
+                "INSERT INTO veiculos (placa, modelo, cor, proprietario_cpf) "
+                "VALUES (:placa, :modelo, :cor, :proprietario_cpf) "
+                "ON CONFLICT(placa) DO UPDATE SET "
+                "modelo = COALESCE(NULLIF(excluded.modelo, ''), modelo), "
+                "cor = COALESCE(NULLIF(excluded.cor, ''), cor), "
+                "proprietario_cpf = excluded.proprietario_cpf",
+                veiculos,
+            )
+            # Autorizações vão para a lista do evento (em andamento ou em preparação)
+            alvo = self._evento_alvo(conexao)
+            conexao.executemany(
+                "INSERT OR IGNORE INTO autorizacoes (evento_id, placa) VALUES (?, ?)",
+                [(alvo, v["placa"]) for v in veiculos if v.get("autorizado")],
+            )
+            conexao.executemany(
+                "DELETE FROM autorizacoes WHERE evento_id = ? AND placa = ?",
+                [(alvo, v["placa"]) for v in veiculos if not v.get("autorizado")],
+            )
+
+        contagem = {"pessoas": len(pessoas), "veiculos": len(veiculos)}
+        return contagem, sem_dono
+
+    # --- LEITURA ---
+
+    def listar_todos_veiculos(self):
+        linhas = self.db.consultar(f"SELECT {self.COLUNAS_VEICULO} FROM veiculos ORDER BY id")
+        return [self._veiculo_dict(l) for l in linhas]
+
+    def listar_historico_completo(self):
+        return self.db.consultar("SELECT placa, tipo, data_hora FROM historico ORDER BY id")
+
+    def contar_historico(self) -> int:
+        return self.db.consultar("SELECT COUNT(*) AS total FROM historico")[0]["total"]
+
+    def iterar_historico(self, inicio=None, fim=None, placa=None, tipo=None):
+        condicoes, parametros = [], []
+        if inicio:
+            condicoes.append("data_hora >= ?")
+            parametros.append(inicio)
+        if fim:
+            condicoes.append("data_hora <= ?")
+            parametros.append(fim)
+        if placa:
+            condicoes.append("placa = ?")
+            parametros.append(ValidadorPlaca.limpar(placa))
+        if tipo:
+            condicoes.append("tipo = ?")
+            parametros.append(tipo.upper())
+        where = f"WHERE {' AND '.join(condicoes)}" if condicoes else ""
+        return self.db.consultar_em_lotes(
+            f"SELECT placa, tipo, data_hora FROM historico {where} ORDER BY data_hora, id", parametros
+        )
+
+    def ultimos_movimentos(self, quantidade=20):
+        return self.db.consultar(
+            "SELECT placa, tipo, data_hora FROM historico ORDER BY id DESC LIMIT ?", (max(quantidade, 0),)
+        )
+
+    def listar_pessoas(self):
+        linhas = self.db.consultar("SELECT nome, cpf, contato FROM pessoas ORDER BY id")
+        return [Pessoa.from_storage(p) for p in linhas]
+
+    def listar_ocupacao(self) -> dict:
+        linhas = self.db.consultar("SELECT placa, data_hora FROM ocupacao ORDER BY data_hora")
+        return {l["placa"]: l["data_hora"] for l in linhas}
+
+    def contar_ocupacao(self) -> int:
+        return self.db.consultar("SELECT COUNT(*) AS total FROM ocupacao")[0]["total"]
+
+    def reconstruir_ocupacao(self):
+        self.db.reconstruir_ocupacao()
+        return self.contar_ocupacao()
+
+    def buscar_pessoas_por_nome(self, nome_parcial: str, limite=None):
+        termos = normalizar_texto(nome_parcial).split()
+        if not termos:
+            return []
+        # O SQLite filtra pelo termo mais longo; a ordenação por relevância é feita aqui
+        linhas = self.db.consultar(
+            "SELECT nome, cpf, contato FROM pessoas WHERE instr(sem_acento(nome), ?) > 0",
+            (max(termos, key=len),),
+        )
+        return self._ranquear(linhas, "cpf", "nome", nome_parcial, limite, Pessoa, normalizar_texto)
+
+    def buscar_veiculos_por_trecho_placa(self, trecho: str, limite=None):
+        trecho_limpo = ValidadorPlaca.limpar(trecho)
+        if not trecho_limpo:
+            return []
+        linhas = self.db.consultar(
+            f"SELECT {self.COLUNAS_VEICULO} FROM veiculos WHERE instr(placa, ?) > 0", (trecho_limpo,)
+        )
+        linhas = [self._veiculo_dict(l) for l in linhas]
+        return self._ranquear(linhas, "placa", "placa", trecho_limpo, limite, Veiculo, ValidadorPlaca.limpar)
+
+    def buscar_veiculos_semelhantes(self, placa: str, limite=5):
+        # Não há índice para "placa parecida" no SQLite: filtra as placas aqui e busca só as escolhidas
+        placas = [l["placa"] for l in self.db.consultar("SELECT placa FROM veiculos")]
+        semelhantes = [p for p, _ in IndicePlacasSemelhantes.filtrar(placa, placas, limite,
+                                                                     normalizar=ValidadorPlaca.limpar)]
+        if not semelhantes:
+            return []
+        linhas = self.db.consultar(
+            f"SELECT {self.COLUNAS_VEICULO} FROM veiculos WHERE placa IN ({', '.join('?' * len(semelhantes))})",
+            semelhantes,
+        )
+        por_placa = {l["placa"]: self._veiculo_dict(l) for l in linhas}
+        return [Veiculo.from_storage(por_placa[p]) for p in semelhantes]
+
+    @staticmethod
+    def _ranquear(linhas, campo_chave, campo_texto, termo, limite, modelo, normalizar):
+        """Ordena as linhas encontradas por relevância (mesma regra do IndiceTexto)."""
+        por_chave = {linha[campo_chave]: linha for linha in linhas}
+        textos = ((chave, linha[campo_texto]) for chave, linha in por_chave.items())
+        return [modelo.from_storage(por_chave[c]) for c in IndiceTexto.filtrar(termo, textos, limite, normalizar)]
+
+    def buscar_pessoa_por_cpf(self, cpf: str) -> Pessoa:
+        linhas = self.db.consultar(
+            "SELECT nome, cpf, contato FROM pessoas WHERE cpf = ?", (ValidadorCPF.limpar(cpf),)
+        )
+        return Pessoa.from_storage(linhas[0]) if linhas else None
+
+    def buscar_veiculo_por_placa(self, placa: str) -> Veiculo:
+        linhas = self.db.consultar(
+            f"SELECT {self.COLUNAS_VEICULO} FROM veiculos WHERE placa = ?",
+            (ValidadorPlaca.limpar(placa),),
+        )
+        return Veiculo.from_storage(self._veiculo_dict(linhas[0])) if linhas else None
+
+    def buscar_veiculos_por_cpf(self, cpf: str):
+        linhas = self.db.consultar(
+            f"SELECT {self.COLUNAS_VEICULO} FROM veiculos WHERE proprietario_cpf = ? ORDER BY id",
+            (ValidadorCPF.limpar(cpf),),
+        )
+        return [Veiculo.from_storage(self._veiculo_dict(l)) for l in linhas]
+
+
+def criar_repositorio(db=None, exclusivo=False):
+    """
+    Repositório padrão do sistema: SQL direto no modo SQLite,
+    índices em memória nos modos JSON.
+    :param exclusivo: Este processo é o único que grava no banco (ver RepositorioIndexado)
+    ESTACIONAMENTO_HISTORICO_COLUNAR='1' guarda o histórico em colunas (menos memória).
+    ESTACIONAMENTO_AUTORIZADOS=CAMINHO mantém a tabela binária de autorizados nesse arquivo.
+    """
+    db = db or criar_banco()
+    if not isinstance(db, BancoDeDadosJson):
+        # Import tardio (só chega aqui quem não usa os modos JSON)
+        from app.database.conexao_sqlite import BancoDeDadosSQLite
+        if isinstance(db, BancoDeDadosSQLite):
+            return RepositorioSQLite(db)
+    colunar = os.environ.get("ESTACIONAMENTO_HISTORICO_COLUNAR", "0") == "1"
+    return RepositorioIndexado(db, exclusivo=exclusivo, historico_colunar=colunar,
+                               arquivo_autorizados=os.environ.get("ESTACIONAMENTO_AUTORIZADOS") or None)
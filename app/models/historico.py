@@ -0,0 +1,200 @@
+import bisect
+import sys
+import time
+from array import array
+from calendar import timegm
+from collections.abc import Sequence
+from functools import lru_cache
+from operator import le
+
+FORMATO_DATA_HORA = "%Y-%m-%d %H:%M:%S"
+
+# Tipo da movimentação guardado em 1 byte
+_CODIGO_TIPO = {"ENTRADA": ord("E"), "SAIDA": ord("S")}
+_TIPO_CODIGO = {codigo: tipo for tipo, codigo in _CODIGO_TIPO.items()}
+
+
+@lru_cache(maxsize=4096)
+def _epoch_do_dia(data: str) -> int:
+    return timegm(time.strptime(data, "%Y-%m-%d"))
+
+
+def data_hora_para_epoch(data_hora: str) -> int:
+    """'AAAA-MM-DD HH:MM:SS' -> segundos desde 1970 (sem fuso: o texto é guardado como está)."""
+    # strptime só uma vez por dia; a hora é somada direto
+    return (_epoch_do_dia(data_hora[:10]) + int(data_hora[11:13]) * 3600
+            + int(data_hora[14:16]) * 60 + int(data_hora[17:19]))
+
+
+def epoch_para_data_hora(segundos: int) -> str:
+    return time.strftime(FORMATO_DATA_HORA, time.gmtime(segundos))
+
+
+class HistoricoColunar(Sequence):
+    """
+    Histórico de movimentações guardado em colunas, em vez de uma lista de
+    dicionários (~400 bytes por movimento):
+      - data/hora: array de inteiros (segundos), 8 bytes
+      - tipo: 1 byte ('E' ou 'S')
+      - placa: referência a uma string internada (uma cópia por placa)
+
+    Por fora se comporta como a lista de sempre: len(), índice, iteração e
+    append() com dicionários {'placa', 'tipo', 'data_hora'}. Os dicionários
+    são montados na hora, a cada acesso.
+    """
+
+    __slots__ = ("_segundos", "_tipos", "_placas")
+
+    def __init__(self, registros=()):
+        self._segundos = array("q")
+        self._tipos = bytearray()
+        self._placas = []
+        self.extend(registros)
+
+    def append(self, registro: dict):
+        self._segundos.append(data_hora_para_epoch(registro["data_hora"]))
+        self._tipos.append(_CODIGO_TIPO[registro["tipo"]])
+        self._placas.append(sys.intern(registro["placa"]))
+
+    def extend(self, registros):
+        for registro in registros:
+            self.append(registro)
+
+    def __len__(self):
+        return len(self._segundos)
+
+    def _registro(self, i):
+        return {
+            "placa": self._placas[i],
+            "tipo": _TIPO_CODIGO[self._tipos[i]],
+            "data_hora": epoch_para_data_hora(self._segundos[i]),
+        }
+
+    def __getitem__(self, indice):
+        if isinstance(indice, slice):
+            return [self._registro(i) for i in range(*indice.indices(len(self)))]
+        if indice < 0:
+            indice += len(self)
+        if not 0 <= indice < len(self):
+            raise IndexError("índice fora do histórico")
+        return self._registro(indice)
+
+    def __iter__(self):
+        for segundos, codigo, placa in zip(self._segundos, self._tipos, self._placas):
+            yield {"placa": placa, "tipo": _TIPO_CODIGO[codigo], "data_hora": epoch_para_data_hora(segundos)}
+
+    def to_list(self):
+        """Lista de dicionários (formato gravado no JSON)."""
+        return list(self)
+
+    def __repr__(self):
+        return f"<HistoricoColunar: {len(self)} movimentações>"
+
+
+def _bisect_por_instante(posicoes, instantes, alvo, direita=False):
+    """
+    bisect_left/bisect_right sobre 'posicoes' comparando instantes[posicao]
+    (bisect com key= só existe a partir do Python 3.10).
+    """
+    baixo, alto = 0, len(posicoes)
+    while baixo < alto:
+        meio = (baixo + alto) // 2
+        valor = instantes[posicoes[meio]]
+        if valor < alvo or (direita and valor == alvo):
+            baixo = meio + 1
+        else:
+            alto = meio
+    return baixo
+
+
+def _inserir_em_ordem(posicoes, instantes, posicao):
+    """Acrescenta 'posicao' mantendo 'posicoes' ordenada por instante (e, no mesmo instante, por posição)."""
+    instante = instantes[posicao]
+    if not posicoes or instantes[posicoes[-1]] <= instante:
+        posicoes.append(posicao)
+    else:
+        posicoes.insert(_bisect_por_instante(posicoes, instantes, instante, direita=True), posicao)
+
+
+class IndiceHistorico:
+    """
+    Índices sobre o histórico (que só cresce, na ordem em que foi gravado):
+      - instantes: data/hora de cada posição em segundos
+      - ordem: as posições ordenadas por data/hora. Enquanto o histórico está
+        em ordem cronológica a própria posição já é a ordem (None: nada a guardar)
+      - placa -> posições das movimentações daquela placa, ordenadas por data/hora
+
+    A ordem de gravação nem sempre é a cronológica (relógio ajustado, registro
+    importado): um movimento com data/hora anterior à do último entra no lugar
+    certo das listas ordenadas.
+
+    atualizar() indexa apenas o que foi acrescentado desde a chamada anterior.
+    Com eles, "entre T1 e T2", "da placa X" e "últimos N" custam O(log n + k).
+    """
+
+    __slots__ = ("_instantes", "_ordem", "_por_placa")
+
+    def __init__(self):
+        self._instantes = array("q")
+        self._ordem = None
+        self._por_placa = {}
+
+    def __len__(self):
+        return len(self._instantes)
+
+    def atualizar(self, historico):
+        inicio = len(self._instantes)
+        if len(historico) <= inicio:
+            return
+        instantes = self._instantes
+        if isinstance(historico, HistoricoColunar):
+            # Já está em segundos: copia a coluna
+            instantes.extend(historico._segundos[inicio:])
+            placas = historico._placas[inicio:]
+        else:
+            novos = historico[inicio:]
+            instantes.extend(data_hora_para_epoch(r["data_hora"]) for r in novos)
+            placas = [r["placa"] for r in novos]
+        por_placa = self._por_placa
+        ordem = self._ordem
+        anterior = instantes[inicio - 1] if inicio else None
+        chegaram = instantes[inicio:]
+        if ordem is None and (anterior is None or anterior <= chegaram[0]) and all(map(le, chegaram, chegaram[1:])):
+            # Caso comum: tudo o que chegou é mais novo que o já indexado e está em ordem
+            for posicao, placa in enumerate(placas, start=inicio):
+                lista = por_placa.get(placa)
+                if lista is None:
+                    por_placa[placa] = lista = array("l")
+                lista.append(posicao)
+            return
+        for posicao, placa in enumerate(placas, start=inicio):
+            instante = instantes[posicao]
+            if ordem is not None:
+                _inserir_em_ordem(ordem, instantes, posicao)
+            elif anterior is not None and instante < anterior:
+                # Primeiro movimento fora de ordem: a partir daqui a ordem é guardada à parte
+                self._ordem = ordem = array("l", range(posicao))
+                _inserir_em_ordem(ordem, instantes, posicao)
+            else:
+                anterior = instante
+            lista = por_placa.get(placa)
+            if lista is None:
+                por_placa[placa] = lista = array("l")
+            _inserir_em_ordem(lista, instantes, posicao)
+
+    def posicoes(self, inicio=None, fim=None, placa=None):
+        """
+        Posições das movimentações no período e/ou da placa, em ordem cronológica
+        (no mesmo segundo, na ordem de gravação).
+        :param inicio/fim: 'AAAA-MM-DD HH:MM:SS' (limites inclusivos)
+        """
+        instantes = self._instantes
+        if placa is None and self._ordem is None:
+            de = bisect.bisect_left(instantes, data_hora_para_epoch(inicio)) if inicio else 0
+            ate = bisect.bisect_right(instantes, data_hora_para_epoch(fim)) if fim else len(instantes)
+            return range(de, ate)
+
+        lista = self._ordem if placa is None else self._por_placa.get(placa, ())
+        de = _bisect_por_instante(lista, instantes, data_hora_para_epoch(inicio)) if inicio else 0
+        ate = _bisect_por_instante(lista, instantes, data_hora_para_epoch(fim), direita=True) if fim else len(lista)
+        return lista[de:ate]
@@ -1,14 +1,16 @@
 from app.utils.validadores import ValidadorCPF
 
 class Pessoa:
+    # Sem __dict__ por objeto: menos memória em listagens grandes
+    __slots__ = ("nome", "_cpf", "contato")
+
     def __init__(self, nome: str, cpf: str, contato: str):
-        # Validação
-        if not ValidadorCPF.validar(cpf):
+        # Validação e limpeza numa passada só - O atributo _cpf guarda APENAS números
+        self._cpf = ValidadorCPF.normalizar(cpf)
+        if self._cpf is None:
             raise ValueError(f"CPF inválido: {cpf}")
 
         self.nome = nome
-        # Limpeza - O atributo _cpf guarda APENAS números
-        self._cpf = ValidadorCPF.limpar(cpf) 
         self.contato = contato
 
     @property
@@ -39,5 +41,17 @@ class Pessoa:
             contato=dados.get("contato", "")
         )
 
+    @classmethod
+    def from_storage(cls, dados):
+        """
+        Reconstrói do banco SEM validar de novo: o CPF foi validado e limpo
+        antes de ser gravado. Use from_dict para dados vindos de fora.
+        """
+        pessoa = cls.__new__(cls)
+        pessoa.nome = dados["nome"]
+        pessoa._cpf = dados["cpf"]
+        pessoa.contato = dados.get("contato", "")
+        return pessoa
+
     def __repr__(self):
         return f"<Pessoa: {self.nome} | CPF: {self.cpf_formatado}>"
\ No newline at end of file
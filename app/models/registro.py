@@ -2,6 +2,8 @@ from datetime import datetime
 from app.utils.validadores import ValidadorPlaca
 
 class Registro:
+    __slots__ = ("placa", "tipo", "data_hora")
+
     def __init__(self, placa: str, tipo: str = 'ENTRADA', data_hora: str = None):
         """
         Representa uma movimentação no estacionamento.
@@ -10,10 +12,10 @@ class Registro:
         :param data_hora: String com data e hora. Se None, pega a hora atual.
         """
 
-        if not ValidadorPlaca.validar(placa):
+        self.placa = ValidadorPlaca.normalizar(placa)
+        if self.placa is None:
             raise ValueError(f"Tentativa de registrar placa inválida: {placa}")
 
-        self.placa = ValidadorPlaca.limpar(placa)
         self.tipo = tipo.upper()
         
         # Se não informarmos a hora, ele pega a do sistema automaticamente
@@ -39,5 +41,14 @@ class Registro:
             data_hora=dados["data_hora"]
         )
 
+    @classmethod
+    def from_storage(cls, dados):
+        """Reconstrói do banco SEM validar de novo a placa."""
+        registro = cls.__new__(cls)
+        registro.placa = dados["placa"]
+        registro.tipo = dados["tipo"]
+        registro.data_hora = dados["data_hora"]
+        return registro
+
     def __repr__(self):
         return f"[{self.data_hora}] {self.tipo}: {self.placa}"
\ No newline at end of file
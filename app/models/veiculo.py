@@ -1,16 +1,19 @@
 from app.utils.validadores import ValidadorPlaca, ValidadorCPF
 
 class Veiculo:
+    # Sem __dict__ por objeto: menos memória em listagens grandes
+    __slots__ = ("_placa", "modelo", "cor", "proprietario_cpf", "autorizado")
+
     def __init__(self, placa: str, modelo: str, cor: str, proprietario_cpf: str, autorizado: bool = False):
         """
         :param autorizado: Define se o veículo pode entrar (padrão False)
         """
         
-        # Validações
-        if not ValidadorPlaca.validar(placa):
+        # Validação e limpeza numa passada só
+        self._placa = ValidadorPlaca.normalizar(placa)
+        if self._placa is None:
             raise ValueError(f"Placa inválida: {placa}")
-        
-        self._placa = ValidadorPlaca.limpar(placa)
+
         self.modelo = modelo
         self.cor = cor
         self.proprietario_cpf = ValidadorCPF.limpar(proprietario_cpf)
@@ -44,6 +47,20 @@ class Veiculo:
             autorizado=dados.get("autorizado", False) 
         )
 
+    @classmethod
+    def from_storage(cls, dados):
+        """
+        Reconstrói do banco SEM validar de novo: a placa e o CPF foram
+        validados e limpos antes de serem gravados.
+        """
+        veiculo = cls.__new__(cls)
+        veiculo._placa = dados["placa"]
+        veiculo.modelo = dados["modelo"]
+        veiculo.cor = dados["cor"]
+        veiculo.proprietario_cpf = dados["proprietario_cpf"]
+        veiculo.autorizado = dados.get("autorizado", False)
+        return veiculo
+
     def __repr__(self):
         status = "LIBERADO" if self.autorizado else "BLOQUEADO"
         return f"<Veiculo: {self.placa} | {status}>"
\ No newline at end of file
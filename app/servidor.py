@@ -0,0 +1,312 @@
+"""
+Servidor HTTP/JSON para várias portarias usarem o MESMO sistema ao mesmo tempo.
+
+Apenas biblioteca padrão (asyncio). Um único processo carrega o banco em
+memória e todas as alterações passam por uma fila atendida por UMA tarefa
+gravadora, que as executa uma de cada vez numa thread separada (o disco não
+trava o loop). As alterações que se acumulam na fila enquanto isso são
+executadas juntas, num db.lote() (no modo grupo, um único fsync confirma todas).
+
+Consultas da portaria (acesso, eventos) são respondidas no próprio loop,
+direto do cache e sem trava: só leem dicionários e índices que a thread
+gravadora monta por inteiro antes de deixá-los visíveis (repo.aquecer(completo=True)
+na partida e depois de cada lote). Relatórios (ocupação, autorizados,
+histórico, estatísticas) rodam na thread gravadora, entre um lote e outro:
+não disputam o cache com as alterações e não seguram as consultas da portaria.
+
+Rotas:
+    GET  /acesso?termo=ABC1234           -> buscar_acesso (placa ou CPF)
+    POST /fluxo       {placa, tipo}       -> registrar_fluxo
+    POST /pessoas     {nome, cpf, contato}
+    POST /veiculos    {placa, modelo, cor, cpf_dono, autorizado}
+    GET  /ocupacao                        -> total e lista de veículos no pátio
+    GET  /relatorios/autorizados?evento=2  -> lista do evento (padrão: o em andamento)
+    GET  /relatorios/historico?limite=20
+    GET  /relatorios/historico?inicio=2026-02-04&fim=2026-02-05
+    GET  /relatorios/historico?placa=ABC1234 -> linha do tempo da placa
+    GET  /relatorios/estatisticas?inicio=2026-02-04&fim=2026-02-05 -> fluxo por hora, pico, permanência
+    GET  /eventos                         -> eventos (preparação, andamento, encerrados)
+    POST /eventos     {nome, abrir}       -> novo evento (em preparação, ou já aberto)
+    POST /eventos/abrir {id}
+    POST /evento/encerrar
+    GET  /metricas                        -> latência (p50/p99...) por rota, medida no servidor
+                                             (+ 'banco': bytes lidos/gravados; fila e fsync em grupo
+                                             no modo grupo; + 'metodos', com --metricas)
+"""
+import asyncio
+import json
+import signal
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit, parse_qs
+
+from app.controllers.controle_acesso import ControleEstacionamento
+from app.database.repositorios import criar_repositorio
+from app.utils.estatisticas import resumo_latencias
+
+MOTIVOS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed", 500: "Internal Server Error"}
+
+
+class ServidorEstacionamento:
+    # Máximo de alterações num mesmo db.lote(): limita a espera da primeira da fila
+    # e o que fica aberto até o fsync (ex.: descritores do diário)
+    LOTE_MAXIMO = 200
+
+    def __init__(self, sistema=None, host="127.0.0.1", porta=8080):
+        # O servidor é o único processo que grava: o cache não precisa conferir o disco
+        self.sistema = sistema or ControleEstacionamento(criar_repositorio(exclusivo=True))
+        self.host = host
+        self.porta = porta
+
+        self._fila_escrita = None
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="gravador")
+        self._latencias = {}  # rota -> últimas durações (segundos)
+        self.instrumentacao = None  # Instrumentação por método (opcional, ver executar_servidor)
+
+        self.rotas = {
+            ("GET", "/acesso"): self._get_acesso,
+            ("POST", "/fluxo"): self._post_fluxo,
+            ("POST", "/pessoas"): self._post_pessoas,
+            ("POST", "/veiculos"): self._post_veiculos,
+            ("GET", "/ocupacao"): self._get_ocupacao,
+            ("GET", "/relatorios/autorizados"): self._get_autorizados,
+            ("GET", "/relatorios/historico"): self._get_historico,
+            ("GET", "/relatorios/estatisticas"): self._get_estatisticas,
+            ("GET", "/eventos"): self._get_eventos,
+            ("POST", "/eventos"): self._post_eventos,
+            ("POST", "/eventos/abrir"): self._post_abrir_evento,
+            ("POST", "/evento/encerrar"): self._post_encerrar,
+            ("GET", "/metricas"): self._get_metricas,
+        }
+
+    # --- CICLO DE VIDA ---
+
+    async def iniciar(self):
+        """Abre a porta e sobe a tarefa gravadora. Retorna o asyncio.Server."""
+        self._fila_escrita = asyncio.Queue()
+        self._gravador = asyncio.create_task(self._tarefa_gravadora())
+        # Aquece o cache e todos os índices antes de aceitar conexões (ninguém os monta no loop)
+        await self._na_thread_gravadora(self.sistema.aquecer, True)
+        return await asyncio.start_server(self._atender, self.host, self.porta)
+
+    async def executar(self):
+        servidor = await self.iniciar()
+        print(f"Servidor ouvindo em http://{self.host}:{self.porta} (Ctrl+C para sair)")
+        try:
+            async with servidor:
+                await servidor.serve_forever()
+        finally:
+            await self.parar()
+
+    async def parar(self):
+        """Espera as gravações pendentes e libera o banco."""
+        if self._fila_escrita is not None:
+            await self._fila_escrita.join()
+            self._gravador.cancel()
+        self._executor.shutdown(wait=True)
+        self.sistema.repo.db.fechar()
+
+    # --- GRAVAÇÃO SERIALIZADA ---
+
+    def _executar_lote(self, pedidos):
+        """
+        Executa as alterações acumuladas na fila, uma de cada vez e em ordem,
+        dentro de um db.lote(): no modo grupo todas vão ao disco num fsync só.
+        Retorna (resultado, erro) de cada uma.
+        """
+        saidas = []
+        try:
+            with self.sistema.repo.db.lote():
+                for funcao, args, _ in pedidos:
+                    try:
+                        saidas.append((funcao(*args), None))
+                    except Exception as e:
+                        saidas.append((None, e))
+        finally:
+            # Índices que o lote descartou ou trocou (ex.: conjunto de autorizados do evento
+            # recém-aberto) ficam prontos aqui, antes que uma consulta no loop precise deles
+            self.sistema.aquecer(True)
+        return saidas
+
+    async def _tarefa_gravadora(self):
+        """
+        Única tarefa que altera o banco: consome a fila, levando junto o que
+        já estiver esperando (até LOTE_MAXIMO alterações por lote).
+        """
+        loop = asyncio.get_running_loop()
+        while True:
+            pedidos = [await self._fila_escrita.get()]
+            while len(pedidos) < self.LOTE_MAXIMO and not self._fila_escrita.empty():
+                pedidos.append(self._fila_escrita.get_nowait())
+            try:
+                saidas = await loop.run_in_executor(self._executor, self._executar_lote, pedidos)
+            except Exception as e:
+                # Falha ao confirmar o lote (ex.: fsync): ninguém do lote recebe sucesso
+                saidas = [(None, e)] * len(pedidos)
+            for (_, _, futuro), (resultado, erro) in zip(pedidos, saidas):
+                if not futuro.cancelled():
+                    if erro is None:
+                        futuro.set_result(resultado)
+                    else:
+                        futuro.set_exception(erro)
+                self._fila_escrita.task_done()
+
+    async def _na_thread_gravadora(self, funcao, *args):
+        """Executa 'funcao' na thread gravadora (na vez dela, entre os lotes de alterações)."""
+        return await asyncio.get_running_loop().run_in_executor(self._executor, funcao, *args)
+
+    async def _escrever(self, funcao, *args):
+        futuro = asyncio.get_running_loop().create_future()
+        await self._fila_escrita.put((funcao, args, futuro))
+        return await futuro
+
+    # --- HTTP ---
+
+    async def _atender(self, leitor, escritor):
+        """Atende uma conexão (HTTP/1.1 com keep-alive)."""
+        try:
+            while True:
+                linha = await leitor.readline()
+                if not linha:
+                    break
+                metodo, alvo, versao = linha.decode("latin-1").rstrip("\r\n").split(" ", 2)
+
+                cabecalhos = {}
+                while True:
+                    linha = await leitor.readline()
+                    if linha in (b"\r\n", b"\n", b""):
+                        break
+                    nome, _, valor = linha.decode("latin-1").partition(":")
+                    cabecalhos[nome.strip().lower()] = valor.strip()
+
+                tamanho = int(cabecalhos.get("content-length", 0))
+                corpo = await leitor.readexactly(tamanho) if tamanho else b""
+
+                status, resposta = await self._rotear(metodo, alvo, corpo)
+
+                conteudo = json.dumps(resposta, ensure_ascii=False).encode("utf-8")
+                manter = cabecalhos.get("connection", "").lower() != "close" and versao == "HTTP/1.1"
+                escritor.write(
+                    f"HTTP/1.1 {status} {MOTIVOS.get(status, '')}\r\n"
+                    "Content-Type: application/json; charset=utf-8\r\n"
+                    f"Content-Length: {len(conteudo)}\r\n"
+                    f"Connection: {'keep-alive' if manter else 'close'}\r\n\r\n".encode("latin-1") + conteudo
+                )
+                await escritor.drain()
+                if not manter:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass
+        finally:
+            escritor.close()
+
+    async def _rotear(self, metodo, alvo, corpo):
+        url = urlsplit(alvo)
+        parametros = {k: v[-1] for k, v in parse_qs(url.query).items()}
+
+        manipulador = self.rotas.get((metodo, url.path))
+        if manipulador is None:
+            if any(caminho == url.path for _, caminho in self.rotas):
+                return 405, {"erro": "Método não permitido."}
+            return 404, {"erro": "Rota não encontrada."}
+
+        try:
+            dados = json.loads(corpo) if corpo else {}
+        except json.JSONDecodeError:
+            return 400, {"erro": "Corpo JSON inválido."}
+
+        inicio = time.perf_counter()
+        try:
+            resposta = await manipulador(parametros, dados)
+        except (KeyError, TypeError) as e:
+            return 400, {"erro": f"Parâmetro ausente ou inválido: {e}"}
+        except Exception as e:
+            return 500, {"erro": str(e)}
+        finally:
+            self._latencias.setdefault(url.path, deque(maxlen=100_000)).append(time.perf_counter() - inicio)
+        return 200, resposta
+
+    # --- ROTAS: LEITURA (no loop: consultas da portaria; na thread gravadora: relatórios) ---
+
+    async def _get_acesso(self, parametros, dados):
+        return self.sistema.buscar_acesso(parametros["termo"])
+
+    async def _get_ocupacao(self, parametros, dados):
+        # A lista (com dono e modelo de cada veículo) é um relatório: vai para a thread gravadora
+        veiculos = await self._na_thread_gravadora(self.sistema.relatorio_veiculos_internos)
+        return {"total": len(veiculos), "veiculos": veiculos}
+
+    async def _get_autorizados(self, parametros, dados):
+        evento = parametros.get("evento")
+        return await self._na_thread_gravadora(self.sistema.relatorio_autorizados, int(evento) if evento else None)
+
+    async def _get_eventos(self, parametros, dados):
+        return self.sistema.listar_eventos()
+
+    async def _get_historico(self, parametros, dados):
+        if "placa" in parametros:
+            return await self._na_thread_gravadora(self.sistema.historico_veiculo, parametros["placa"])
+        if "inicio" in parametros or "fim" in parametros:
+            return await self._na_thread_gravadora(self.sistema.historico_periodo,
+                                                   parametros.get("inicio"), parametros.get("fim"))
+        return await self._na_thread_gravadora(self.sistema.relatorio_historico, int(parametros.get("limite", 20)))
+
+    async def _get_estatisticas(self, parametros, dados):
+        return await self._na_thread_gravadora(self.sistema.relatorio_estatisticas,
+                                               parametros.get("inicio"), parametros.get("fim"))
+
+    async def _get_metricas(self, parametros, dados):
+        metricas = {rota: resumo_latencias(duracoes) for rota, duracoes in self._latencias.items()}
+        metricas_banco = getattr(self.sistema.repo.db, "metricas", None)
+        if metricas_banco:
+            metricas["banco"] = metricas_banco()
+        if hasattr(self.sistema.repo.db, "io"):
+            metricas.setdefault("banco", {})["io"] = dict(self.sistema.repo.db.io)
+        if self.instrumentacao:
+            metricas["metodos"] = self.instrumentacao.resumo()
+        return metricas
+
+    # --- ROTAS: ESCRITA (pela fila da tarefa gravadora) ---
+
+    async def _post_fluxo(self, parametros, dados):
+        return await self._escrever(self.sistema.registrar_fluxo, dados["placa"], dados["tipo"].upper())
+
+    async def _post_pessoas(self, parametros, dados):
+        return await self._escrever(self.sistema.cadastrar_pessoa, dados["nome"], dados["cpf"], dados.get("contato", ""))
+
+    async def _post_veiculos(self, parametros, dados):
+        return await self._escrever(
+            self.sistema.processar_veiculo_evento,
+            dados["placa"], dados.get("modelo", ""), dados.get("cor", ""),
+            dados["cpf_dono"], bool(dados.get("autorizado", False)),
+        )
+
+    async def _post_eventos(self, parametros, dados):
+        return await self._escrever(self.sistema.criar_evento, dados["nome"], bool(dados.get("abrir", False)))
+
+    async def _post_abrir_evento(self, parametros, dados):
+        return await self._escrever(self.sistema.abrir_evento, dados["id"])
+
+    async def _post_encerrar(self, parametros, dados):
+        return await self._escrever(self.sistema.encerrar_evento)
+
+
+def executar_servidor(host="127.0.0.1", porta=8080, metricas=None):
+    """
+    :param metricas: Liga a instrumentação por método (ver app/utils/instrumentacao.py)
+                     e grava as medições neste arquivo ao encerrar ('-' = tela)
+    """
+    # 'kill' (ex.: serviço parado pelo sistema) encerra como o Ctrl+C: o diário é incorporado antes de sair
+    signal.signal(signal.SIGTERM, signal.default_int_handler)
+    servidor = ServidorEstacionamento(host=host, porta=porta)
+    if metricas:
+        from app.utils.instrumentacao import instrumentar_sistema
+        servidor.instrumentacao = instrumentar_sistema(servidor.sistema)
+    try:
+        asyncio.run(servidor.executar())
+    except KeyboardInterrupt:
+        print("\nServidor encerrado.")
+    finally:
+        if servidor.instrumentacao:
+            servidor.instrumentacao.exportar(metricas)
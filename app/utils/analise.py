@@ -0,0 +1,242 @@
+from datetime import date, timedelta
+from itertools import groupby
+
+from app.models.historico import data_hora_para_epoch
+from app.utils.estatisticas import percentil_histograma
+
+
+def _dia(registro):
+    return registro["data_hora"][:10]
+
+
+class ResumoDia:
+    """
+    Tudo o que os relatórios precisam de um dia, calculado numa única passada
+    pelas movimentações dele. Os números de dias diferentes se somam, então
+    um período é a soma dos resumos dos seus dias.
+    """
+
+    __slots__ = ("dia", "movimentos", "entradas_por_hora", "saidas_por_hora", "ocupacao_inicial",
+                 "pico", "pico_em", "permanencias", "visitas")
+
+    def __init__(self, dia, ocupacao_inicial):
+        self.dia = dia
+        self.movimentos = 0
+        self.entradas_por_hora = [0] * 24
+        self.saidas_por_hora = [0] * 24
+        self.ocupacao_inicial = ocupacao_inicial
+        self.pico = ocupacao_inicial
+        self.pico_em = f"{dia} 00:00:00"
+        self.permanencias = {}  # minutos -> nº de estadias (histograma das saídas do dia)
+        self.visitas = {}       # placa -> [entradas, estadias concluídas, soma das estadias em segundos]
+
+
+def resumir_dia(dia, registros, dentro):
+    """
+    Passa uma vez pelas movimentações do dia (em ordem cronológica).
+    :param dentro: {placa: instante da entrada em segundos} no início do dia.
+                   É atualizado no lugar: ao final, vale para o início do dia seguinte.
+    """
+    resumo = ResumoDia(dia, len(dentro))
+    entradas, saidas = resumo.entradas_por_hora, resumo.saidas_por_hora
+    permanencias, visitas = resumo.permanencias, resumo.visitas
+    meia_noite = data_hora_para_epoch(f"{dia} 00:00:00")
+
+    for reg in registros:
+        resumo.movimentos += 1
+        data_hora, placa = reg["data_hora"], reg["placa"]
+        # Todos do mesmo dia: só a hora precisa ser convertida
+        hora = int(data_hora[11:13])
+        instante = meia_noite + hora * 3600 + int(data_hora[14:16]) * 60 + int(data_hora[17:19])
+        visita = visitas.get(placa)
+        if visita is None:
+            visitas[placa] = visita = [0, 0, 0]
+
+        if reg["tipo"] == "ENTRADA":
+            entradas[hora] += 1
+            visita[0] += 1
+            # Mesma regra da ocupação: uma ENTRADA repetida vale a partir da última
+            dentro[placa] = instante
+            if len(dentro) > resumo.pico:
+                resumo.pico, resumo.pico_em = len(dentro), data_hora
+        else:
+            saidas[hora] += 1
+            entrada = dentro.pop(placa, None)
+            if entrada is not None:
+                segundos = instante - entrada
+                minutos = segundos // 60
+                permanencias[minutos] = permanencias.get(minutos, 0) + 1
+                visita[1] += 1
+                visita[2] += segundos
+    return resumo
+
+
+class AnaliseHistorico:
+    """
+    Estatísticas do histórico (fluxo por hora, pico de ocupação, tempo de
+    permanência e visitantes recorrentes) sem pareamento ENTRADA/SAIDA
+    sobre a lista inteira a cada relatório.
+
+    Os dias encerrados (todos menos o da movimentação mais recente) quase
+    nunca mudam: o resumo de cada um é calculado uma única vez e guardado,
+    junto com quem estava no pátio ao fim do último deles. Depois da
+    primeira consulta, cada relatório só repassa o dia atual.
+
+    Um movimento gravado com atraso (data/hora num dia já encerrado) é
+    notado pela contagem do histórico: os resumos são refeitos a partir do
+    primeiro dia cuja quantidade de movimentações mudou.
+    """
+
+    def __init__(self):
+        self._fechados = {}       # dia -> ResumoDia
+        self._ultimo_fechado = None
+        self._movimentos_fechados = 0
+        self._dentro = {}         # placa -> entrada (segundos) ao fim do último dia fechado
+
+    def resumos(self, repo, inicio=None, fim=None):
+        """
+        Resumos dos dias entre 'inicio' e 'fim' ('AAAA-MM-DD', inclusivos), em ordem.
+        Lê do repositório só o que vem depois do último dia já resumido.
+        """
+        total = repo.contar_historico()
+        ja_resumidos = self._movimentos_fechados
+        aberto, lidos = self._resumir_novos(repo)
+        if ja_resumidos + lidos != total:
+            # Um dia já encerrado ganhou (ou perdeu) movimentações
+            self._descartar_alterados(repo)
+            aberto, _ = self._resumir_novos(repo)
+
+        selecionados = [r for d, r in self._fechados.items() if (not inicio or d >= inicio) and (not fim or d <= fim)]
+        if aberto is not None and (not inicio or aberto.dia >= inicio) and (not fim or aberto.dia <= fim):
+            selecionados.append(aberto)
+        return selecionados
+
+    def _resumir_novos(self, repo):
+        """Resume os dias depois do último fechado. Devolve o resumo do último dia (aberto) e quantos movimentos leu."""
+        desde = None
+        if self._ultimo_fechado:
+            seguinte = date.fromisoformat(self._ultimo_fechado) + timedelta(days=1)
+            desde = f"{seguinte.isoformat()} 00:00:00"
+
+        # iterar_historico devolve em ordem cronológica: cada dia vem inteiro, de uma vez
+        aberto, lidos = None, 0
+        for dia, do_dia in groupby(repo.iterar_historico(inicio=desde), key=_dia):
+            if aberto is not None:
+                # Apareceu um dia depois dele: o anterior está encerrado
+                self._fechar(aberto, dentro)
+            dentro = dict(self._dentro)
+            aberto = resumir_dia(dia, do_dia, dentro)
+            lidos += aberto.movimentos
+        return aberto, lidos
+
+    def _descartar_alterados(self, repo):
+        """
+        Repassa os dias fechados até o primeiro cuja quantidade de
+        movimentações não confere e descarta os resumos dele em diante
+        (guardando quem estava no pátio no início dele).
+        """
+        if not self._fechados:
+            return
+        guardados = sorted(self._fechados)
+        dentro = {}
+        i = 0
+        alterado = False
+        for dia, do_dia in groupby(repo.iterar_historico(fim=f"{self._ultimo_fechado} 23:59:59"), key=_dia):
+            if i < len(guardados) and guardados[i] < dia:
+                alterado = True  # O dia guardado não tem mais movimentações
+                break
+            no_inicio = dict(dentro)
+            movimentos = resumir_dia(dia, do_dia, dentro).movimentos
+            if i == len(guardados) or guardados[i] != dia or self._fechados[dia].movimentos != movimentos:
+                alterado, dentro = True, no_inicio
+                break
+            i += 1
+        if not alterado and i == len(guardados):
+            return  # Os dias fechados conferem: a diferença é de um movimento gravado durante a leitura
+
+        for dia in guardados[i:]:
+            del self._fechados[dia]
+        self._ultimo_fechado = guardados[i - 1] if i else None
+        self._movimentos_fechados = sum(r.movimentos for r in self._fechados.values())
+        self._dentro = dentro
+
+    def _fechar(self, resumo, dentro):
+        self._fechados[resumo.dia] = resumo
+        self._ultimo_fechado = resumo.dia
+        self._movimentos_fechados += resumo.movimentos
+        self._dentro = dentro
+
+    # --- RELATÓRIOS (somando os resumos do período) ---
+
+    @staticmethod
+    def fluxo_por_hora(resumos):
+        """Entradas e saídas em cada hora do dia (0-23), somadas no período."""
+        return [
+            {
+                "hora": f"{hora:02d}:00",
+                "entradas": sum(r.entradas_por_hora[hora] for r in resumos),
+                "saidas": sum(r.saidas_por_hora[hora] for r in resumos),
+            }
+            for hora in range(24)
+        ]
+
+    @staticmethod
+    def pico_ocupacao(resumos):
+        """Maior nº de veículos ao mesmo tempo no pátio e quando aconteceu (primeira vez)."""
+        pico = {"veiculos": 0, "data_hora": None}
+        for r in resumos:
+            if r.pico > pico["veiculos"]:
+                pico = {"veiculos": r.pico, "data_hora": r.pico_em}
+        return pico
+
+    @staticmethod
+    def permanencia(resumos):
+        """Tempo de permanência (ENTRADA -> SAIDA) das estadias encerradas no período, em minutos."""
+        histograma = {}
+        for r in resumos:
+            for minutos, quantidade in r.permanencias.items():
+                histograma[minutos] = histograma.get(minutos, 0) + quantidade
+        estadias = sum(histograma.values())
+        if not estadias:
+            return {"estadias": 0}
+        segundos = sum(v[2] for r in resumos for v in r.visitas.values())
+        return {
+            "estadias": estadias,
+            "media_min": round(segundos / estadias / 60, 1),
+            "p50_min": percentil_histograma(histograma, 50),
+            "p95_min": percentil_histograma(histograma, 95),
+            "max_min": max(histograma),
+        }
+
+    @staticmethod
+    def visitantes(resumos, limite=10):
+        """
+        Veículos que entraram mais de uma vez no período, dos mais frequentes
+        para os menos, com a permanência média de cada um.
+        """
+        por_placa = {}  # placa -> [entradas, estadias, segundos, dias]
+        for r in resumos:
+            for placa, (entradas, estadias, segundos) in r.visitas.items():
+                total = por_placa.get(placa)
+                if total is None:
+                    por_placa[placa] = total = [0, 0, 0, 0]
+                total[0] += entradas
+                total[1] += estadias
+                total[2] += segundos
+                total[3] += 1 if entradas else 0
+
+        recorrentes = [(placa, t) for placa, t in por_placa.items() if t[0] > 1]
+        recorrentes.sort(key=lambda item: (-item[1][0], item[0]))
+        return {
+            "visitantes": sum(1 for t in por_placa.values() if t[0]),
+            "recorrentes": len(recorrentes),
+            "mais_frequentes": [
+                {
+                    "placa": placa,
+                    "visitas": t[0],
+                    "dias": t[3],
+                    "permanencia_media_min": round(t[2] / t[1] / 60, 1) if t[1] else None,
+                }
+                for placa, t in recorrentes[:limite]
+            ],
+        }
@@ -0,0 +1,250 @@
+import unicodedata
+
+TAMANHO_NGRAMA = 3
+
+
+def normalizar_texto(texto: str) -> str:
+    """
+    Minúsculas e sem acentos, para buscas que não dependem da digitação.
+    Ex: 'João Conceição' vira 'joao conceicao'.
+    """
+    if not texto:
+        return ""
+    if texto.isascii():
+        return texto.lower()
+    decomposto = unicodedata.normalize("NFKD", texto)
+    return "".join(c for c in decomposto if not unicodedata.combining(c)).casefold()
+
+
+def _ngramas(texto: str):
+    return {texto[i:i + TAMANHO_NGRAMA] for i in range(len(texto) - TAMANHO_NGRAMA + 1)}
+
+
+class IndiceTexto:
+    """
+    Índice invertido de trigramas (pedaços de 3 letras) para busca por
+    trecho: 'silv' só confere os textos que contêm 'sil' E 'ilv', em vez de
+    percorrer todos. Usado para nomes de pessoas e para pedaços de placa.
+
+    Cada termo da busca precisa aparecer no texto (em qualquer ordem). Os
+    resultados vêm ordenados por relevância: texto igual, começo/fim do
+    texto, começo de palavra e, por último, trecho no meio.
+    """
+
+    __slots__ = ("_normalizar", "_textos", "_postagens")
+
+    def __init__(self, normalizar=normalizar_texto):
+        self._normalizar = normalizar
+        self._textos = {}     # chave -> texto normalizado
+        self._postagens = {}  # trigrama -> conjunto de chaves
+
+    def __len__(self):
+        return len(self._textos)
+
+    def adicionar(self, chave, texto):
+        """Indexa (ou reindexa, se a chave já existir) o texto da chave."""
+        if chave in self._textos:
+            self.remover(chave)
+        normalizado = self._normalizar(texto)
+        self._textos[chave] = normalizado
+        for ngrama in _ngramas(normalizado):
+            self._postagens.setdefault(ngrama, set()).add(chave)
+
+    def remover(self, chave):
+        normalizado = self._textos.pop(chave, None)
+        if normalizado is None:
+            return
+        for ngrama in _ngramas(normalizado):
+            chaves = self._postagens.get(ngrama)
+            if chaves is not None:
+                chaves.discard(chave)
+                if not chaves:
+                    del self._postagens[ngrama]
+
+    def _candidatos(self, termos):
+        """Chaves que têm todos os trigramas dos termos (termos curtos não filtram)."""
+        ngramas = set().union(*(_ngramas(t) for t in termos))
+        if not ngramas:
+            return list(self._textos)  # Cópia: o índice pode ganhar chaves durante a busca
+        # Começa pelo trigrama mais raro: a interseção encolhe mais rápido
+        listas = sorted((self._postagens.get(n, ()) for n in ngramas), key=len)
+        if not listas[0]:
+            return ()  # Algum trigrama não aparece em nenhum texto
+        candidatos = set(listas[0])
+        for chaves in listas[1:]:
+            candidatos &= chaves
+            if not candidatos:
+                break
+        return candidatos
+
+    def buscar(self, termo, limite=None):
+        """Retorna as chaves cujo texto contém todos os termos, da mais para a menos relevante."""
+        consulta = self._normalizar(termo).strip()
+        termos = consulta.split()
+        if not termos:
+            return []
+        textos = self._textos
+        pares = ((chave, textos.get(chave)) for chave in self._candidatos(termos))
+        return _ranquear_textos(consulta, termos, pares, limite)
+
+    @staticmethod
+    def filtrar(termo, textos, limite=None, normalizar=normalizar_texto):
+        """
+        Mesmo resultado de buscar(), percorrendo os pares (chave, texto) uma vez
+        sem montar o índice (para quem não guarda índice em memória).
+        """
+        consulta = normalizar(termo).strip()
+        termos = consulta.split()
+        if not termos:
+            return []
+        return _ranquear_textos(consulta, termos, ((chave, normalizar(texto)) for chave, texto in textos), limite)
+
+
+def _ranquear_textos(consulta, termos, pares, limite):
+    """Chaves dos pares (chave, texto normalizado) que contêm todos os termos, por relevância."""
+    encontrados = []
+    for chave, texto in pares:
+        if texto is None or not all(t in texto for t in termos):
+            continue
+        if texto == consulta:
+            categoria = 0
+        elif texto.startswith(consulta) or texto.endswith(consulta):
+            categoria = 1
+        elif all(any(p.startswith(t) for p in texto.split()) for t in termos):
+            categoria = 2
+        else:
+            categoria = 3
+        encontrados.append((categoria, texto.find(termos[0]), texto, chave))
+
+    encontrados.sort(key=lambda e: e[:3])
+    return [e[3] for e in encontrados[:limite]]
+
+
+# Caracteres que o OCR das câmeras (e o porteiro) costumam trocar entre si
+GRUPOS_CONFUSAO = ("0ODQ", "1IL", "8B", "5S", "2Z", "6G", "4A", "7T")
+_TABELA_ESQUELETO = str.maketrans({c: grupo[0] for grupo in GRUPOS_CONFUSAO for c in grupo})
+
+CUSTO_CONFUSAO = 0.25  # Trocar O por 0 custa bem menos que trocar O por X
+
+
+def _esqueleto(placa: str) -> str:
+    """Placa com cada grupo de confusão reduzido a um símbolo ('B0L' e '8O1' ficam iguais)."""
+    return placa.translate(_TABELA_ESQUELETO)
+
+
+def distancia_placas(a: str, b: str) -> float:
+    """
+    Distância de edição entre duas placas (inserção, remoção, troca e
+    inversão de vizinhos custam 1), mas trocar caracteres parecidos
+    (O/0, I/1, B/8...) custa só CUSTO_CONFUSAO.
+    """
+    ea, eb = _esqueleto(a), _esqueleto(b)
+    anterior2, anterior = None, list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        atual = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            if a[i - 1] == b[j - 1]:
+                troca = 0
+            elif ea[i - 1] == eb[j - 1]:
+                troca = CUSTO_CONFUSAO
+            else:
+                troca = 1
+            atual[j] = min(anterior[j] + 1, atual[j - 1] + 1, anterior[j - 1] + troca)
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                atual[j] = min(atual[j], anterior2[j - 2] + 1)
+        anterior2, anterior = anterior, atual
+    return anterior[-1]
+
+
+def _chaves_semelhanca(esqueleto: str):
+    """
+    Três pedaços do esqueleto. Duas placas a até UM erro de digitação/leitura
+    (troca, falta ou sobra de um caractere, inversão de vizinhos) têm sempre
+    um pedaço igual: um erro nos 4 primeiros caracteres não toca os 3
+    últimos, um erro nos 3 últimos não toca os 4 primeiros, e a inversão do
+    4º com o 5º não toca os 3 primeiros nem os 2 últimos.
+    """
+    return ("<" + esqueleto[:4], ">" + esqueleto[-3:], "=" + esqueleto[:3] + esqueleto[-2:])
+
+
+class IndicePlacasSemelhantes:
+    """
+    Placas parecidas com uma placa mal lida (OCR) ou mal digitada, para o
+    "você quis dizer" da portaria.
+
+    Cada placa é guardada sob 3 chaves (ver _chaves_semelhanca), calculadas
+    sobre o esqueleto da placa: qualquer quantidade de confusões O/0, I/1,
+    B/8... mais um erro comum cai numa chave em comum. A busca só confere
+    as placas dessas 3 chaves (dezenas, não o cadastro inteiro) e as ordena
+    por distancia_placas(). Ocupa bem menos memória que guardar todas as
+    remoções de 1 caractere (8 chaves por placa).
+    """
+
+    __slots__ = ("_normalizar", "_postagens", "_placas")
+
+    def __init__(self, normalizar=str.upper):
+        self._normalizar = normalizar
+        self._postagens = {}   # chave -> lista de placas
+        self._placas = set()
+
+    def __len__(self):
+        return len(self._placas)
+
+    def adicionar(self, placa):
+        placa = self._normalizar(placa)
+        if placa in self._placas:
+            return
+        self._placas.add(placa)
+        for chave in _chaves_semelhanca(_esqueleto(placa)):
+            self._postagens.setdefault(chave, []).append(placa)
+
+    def remover(self, placa):
+        placa = self._normalizar(placa)
+        if placa not in self._placas:
+            return
+        self._placas.discard(placa)
+        for chave in _chaves_semelhanca(_esqueleto(placa)):
+            placas = self._postagens[chave]
+            placas.remove(placa)
+            if not placas:
+                del self._postagens[chave]
+
+    def buscar(self, termo, limite=5, distancia_maxima=1.5):
+        """[(placa, distância)] das placas mais parecidas com 'termo', da mais para a menos parecida."""
+        consulta = self._normalizar(termo)
+        if not 6 <= len(consulta) <= 8:
+            return []
+        candidatos = set()
+        for chave in _chaves_semelhanca(_esqueleto(consulta)):
+            candidatos.update(self._postagens.get(chave, ()))
+        return _ranquear_semelhantes(consulta, candidatos, limite, distancia_maxima)
+
+    @classmethod
+    def filtrar(cls, termo, placas, limite=5, distancia_maxima=1.5, normalizar=str.upper):
+        """
+        Mesmo resultado de buscar(), percorrendo 'placas' uma vez sem montar o
+        índice (para quem não guarda índice em memória, ex.: repositório SQLite).
+        """
+        consulta = normalizar(termo)
+        if not 6 <= len(consulta) <= 8:
+            return []
+        chaves = set(_chaves_semelhanca(_esqueleto(consulta)))
+        candidatos = {p for p in map(normalizar, placas) if not chaves.isdisjoint(_chaves_semelhanca(_esqueleto(p)))}
+        return _ranquear_semelhantes(consulta, candidatos, limite, distancia_maxima)
+
+
+def _ranquear_semelhantes(consulta, candidatos, limite, distancia_maxima):
+    esqueleto = _esqueleto(consulta)
+    encontrados = []
+    for placa in candidatos:
+        if len(placa) == len(consulta):
+            # Atalho: com o mesmo tamanho, cada erro comum muda no máximo 2 posições do
+            # esqueleto (inversão), então a distância é pelo menos metade das diferenças
+            diferencas = sum(a != b for a, b in zip(esqueleto, _esqueleto(placa)))
+            if (diferencas + 1) // 2 > distancia_maxima:
+                continue
+        distancia = distancia_placas(consulta, placa)
+        if distancia <= distancia_maxima:
+            encontrados.append((distancia, placa))
+    encontrados.sort()
+    return [(placa, distancia) for distancia, placa in encontrados[:limite]]
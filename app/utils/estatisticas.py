@@ -0,0 +1,41 @@
+def percentil(valores_ordenados, p: float):
+    """Percentil 'p' (0-100) de uma lista JÁ ORDENADA (método do vizinho mais próximo)."""
+    if not valores_ordenados:
+        return 0.0
+    indice = min(len(valores_ordenados) - 1, int(len(valores_ordenados) * p / 100))
+    return valores_ordenados[indice]
+
+
+def percentil_histograma(contagens: dict, p: float):
+    """
+    Mesmo percentil de percentil(), mas a partir de um histograma {valor: quantidade}
+    (ex.: permanências em minutos), sem expandir a lista de valores.
+    """
+    total = sum(contagens.values())
+    if not total:
+        return 0.0
+    indice = min(total - 1, int(total * p / 100))
+    acumulado = 0
+    for valor in sorted(contagens):
+        acumulado += contagens[valor]
+        if acumulado > indice:
+            return valor
+
+
+def resumo_latencias(duracoes):
+    """
+    Resume uma lista de durações (em segundos) em milissegundos:
+    quantidade de amostras, média, p50, p90, p99 e máximo.
+    """
+    ordenadas = sorted(duracoes)
+    n = len(ordenadas)
+    if n == 0:
+        return {"amostras": 0}
+    return {
+        "amostras": n,
+        "media_ms": round(sum(ordenadas) / n * 1000, 4),
+        "p50_ms": round(percentil(ordenadas, 50) * 1000, 4),
+        "p90_ms": round(percentil(ordenadas, 90) * 1000, 4),
+        "p99_ms": round(percentil(ordenadas, 99) * 1000, 4),
+        "max_ms": round(ordenadas[-1] * 1000, 4),
+    }
@@ -0,0 +1,214 @@
+"""
+Instrumentação opcional: contadores e histogramas de latência por método.
+
+Desligada, não custa nada: nenhuma classe é alterada. Ao ligar
+(instrumentar_sistema), cada método público do controlador, do repositório
+e do banco daquela instância é trocado por um invólucro que mede a chamada.
+Os contadores de bytes lidos/gravados ficam no próprio banco (atributo
+'io' dos bancos JSON) e só são lidos na exportação.
+
+Exportação no formato texto do Prometheus (arquivo ou saída padrão).
+"""
+import bisect
+import cProfile
+import functools
+import io
+import os
+import pstats
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from types import GeneratorType
+
+# Limites (em segundos) das faixas dos histogramas
+FAIXAS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+PREFIXO = "estacionamento"
+
+
+class Instrumentacao:
+    """Registro das medições: {(camada, método): [chamadas, erros, soma, contagem por faixa]}."""
+
+    def __init__(self):
+        self._medicoes = {}
+        self._bancos = []
+        self._trava = threading.Lock()
+
+    # --- COLETA ---
+
+    def registrar(self, camada, metodo, duracao, erro=False):
+        """Acrescenta uma chamada de 'duracao' segundos ao histograma do método."""
+        faixa = bisect.bisect_left(FAIXAS, duracao)
+        with self._trava:
+            medicao = self._medicoes.get((camada, metodo))
+            if medicao is None:
+                medicao = self._medicoes[(camada, metodo)] = [0, 0, 0.0, [0] * (len(FAIXAS) + 1)]
+            medicao[0] += 1
+            medicao[1] += erro
+            medicao[2] += duracao
+            medicao[3][faixa] += 1
+
+    def _medir(self, camada, nome, metodo):
+        registrar = self.registrar
+        relogio = time.perf_counter
+
+        def acompanhar(gerador, inicio):
+            erro = True
+            try:
+                yield from gerador
+                erro = False
+            except GeneratorExit:
+                erro = False  # O consumidor parou antes do fim (ex.: next() só do primeiro)
+                raise
+            finally:
+                registrar(camada, nome, relogio() - inicio, erro)
+
+        @functools.wraps(metodo)
+        def medido(*args, **kwargs):
+            inicio = relogio()
+            try:
+                resultado = metodo(*args, **kwargs)
+            except BaseException:
+                registrar(camada, nome, relogio() - inicio, True)
+                raise
+            if isinstance(resultado, GeneratorType):
+                # Geradores (ex.: iterar_historico): mede até o consumidor terminar
+                return acompanhar(resultado, inicio)
+            registrar(camada, nome, relogio() - inicio)
+            return resultado
+        return medido
+
+    def instrumentar(self, objeto, camada):
+        """
+        Mede todos os métodos públicos de 'objeto' (só nesta instância).
+        As chamadas internas (self.metodo()) também são medidas; super() não.
+        """
+        for nome in dir(type(objeto)):
+            if nome.startswith("_"):
+                continue
+            atributo = getattr(type(objeto), nome, None)
+            if not callable(atributo) or isinstance(atributo, type):
+                continue
+            metodo = getattr(objeto, nome)
+            if getattr(metodo, "__wrapped__", None) is not None:
+                continue  # Já instrumentado
+            setattr(objeto, nome, self._medir(camada, nome, metodo))
+        if camada == "banco" and hasattr(objeto, "io"):
+            self._bancos.append(objeto)
+        return objeto
+
+    # --- EXPORTAÇÃO ---
+
+    def resumo(self):
+        """{'camada.metodo': {'chamadas', 'erros', 'total_ms', 'media_ms'}}, do mais demorado ao menos."""
+        with self._trava:
+            itens = [(chave, m[0], m[1], m[2]) for chave, m in self._medicoes.items()]
+        itens.sort(key=lambda item: item[3], reverse=True)
+        return {
+            f"{camada}.{metodo}": {
+                "chamadas": chamadas,
+                "erros": erros,
+                "total_ms": round(soma * 1000, 3),
+                "media_ms": round(soma / chamadas * 1000, 4) if chamadas else 0.0,
+            }
+            for (camada, metodo), chamadas, erros, soma in itens
+        }
+
+    def texto_prometheus(self):
+        """Todas as medições no formato texto do Prometheus."""
+        with self._trava:
+            medicoes = sorted((chave, m[0], m[1], m[2], list(m[3])) for chave, m in self._medicoes.items())
+
+        linhas = [
+            f"# HELP {PREFIXO}_chamadas_total Chamadas por método.",
+            f"# TYPE {PREFIXO}_chamadas_total counter",
+        ]
+        for (camada, metodo), chamadas, _, _, _ in medicoes:
+            linhas.append(f'{PREFIXO}_chamadas_total{{camada="{camada}",metodo="{metodo}"}} {chamadas}')
+
+        linhas += [
+            f"# HELP {PREFIXO}_erros_total Chamadas que terminaram com exceção.",
+            f"# TYPE {PREFIXO}_erros_total counter",
+        ]
+        for (camada, metodo), _, erros, _, _ in medicoes:
+            linhas.append(f'{PREFIXO}_erros_total{{camada="{camada}",metodo="{metodo}"}} {erros}')
+
+        linhas += [
+            f"# HELP {PREFIXO}_duracao_segundos Duração das chamadas por método.",
+            f"# TYPE {PREFIXO}_duracao_segundos histogram",
+        ]
+        for (camada, metodo), chamadas, _, soma, faixas in medicoes:
+            rotulos = f'camada="{camada}",metodo="{metodo}"'
+            acumulado = 0
+            for limite, quantidade in zip(FAIXAS, faixas):
+                acumulado += quantidade
+                linhas.append(f'{PREFIXO}_duracao_segundos_bucket{{{rotulos},le="{limite}"}} {acumulado}')
+            linhas.append(f'{PREFIXO}_duracao_segundos_bucket{{{rotulos},le="+Inf"}} {chamadas}')
+            linhas.append(f"{PREFIXO}_duracao_segundos_sum{{{rotulos}}} {soma:.6f}")
+            linhas.append(f"{PREFIXO}_duracao_segundos_count{{{rotulos}}} {chamadas}")
+
+        for banco in self._bancos:
+            rotulo = f'arquivo="{banco.arquivo}"'
+            for nome, valor in banco.io.items():
+                linhas.append(f"# TYPE {PREFIXO}_banco_{nome}_total counter")
+                linhas.append(f"{PREFIXO}_banco_{nome}_total{{{rotulo}}} {valor}")
+        return "\n".join(linhas) + "\n"
+
+    def exportar(self, destino="-"):
+        """Grava texto_prometheus() em 'destino' ('-' = saída padrão). Troca o arquivo atomicamente."""
+        texto = self.texto_prometheus()
+        if destino == "-":
+            sys.stdout.write(texto)
+            return
+        pasta = os.path.dirname(destino) or "."
+        os.makedirs(pasta, exist_ok=True)
+        descritor, temporario = tempfile.mkstemp(prefix=".metricas-", suffix=".tmp", dir=pasta)
+        with os.fdopen(descritor, 'w', encoding='utf-8') as f:
+            f.write(texto)
+        os.replace(temporario, destino)
+
+
+def instrumentar_sistema(sistema, instrumentacao=None):
+    """Liga a instrumentação no controlador, no repositório e no banco de 'sistema'."""
+    instrumentacao = instrumentacao or Instrumentacao()
+    instrumentacao.instrumentar(sistema, "controle")
+    instrumentacao.instrumentar(sistema.repo, "repositorio")
+    instrumentacao.instrumentar(sistema.repo.db, "banco")
+    return instrumentacao
+
+
+@contextmanager
+def capturar_perfil(destino, linhas=25):
+    """
+    Perfil de uma sessão inteira: cProfile (tempo por função) e tracemalloc
+    (memória por linha de código). Grava 'destino' (abre com pstats ou
+    snakeviz) e um resumo legível em '<destino>.txt'.
+    """
+    perfil = cProfile.Profile()
+    tracemalloc.start()
+    perfil.enable()
+    try:
+        yield perfil
+    finally:
+        perfil.disable()
+        foto = tracemalloc.take_snapshot()
+        _, pico = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        pasta = os.path.dirname(destino)
+        if pasta:
+            os.makedirs(pasta, exist_ok=True)
+        perfil.dump_stats(destino)
+
+        texto = io.StringIO()
+        texto.write(f"Pico de memória alocada (tracemalloc): {pico / 1024 / 1024:.1f} MiB\n\n")
+        texto.write(f"--- {linhas} funções com maior tempo acumulado ---\n")
+        pstats.Stats(perfil, stream=texto).sort_stats("cumulative").print_stats(linhas)
+        texto.write(f"--- {linhas} linhas que mais alocaram memória (ainda alocada no fim) ---\n")
+        for estatistica in foto.statistics("lineno")[:linhas]:
+            texto.write(f"{estatistica}\n")
+        with open(destino + ".txt", 'w', encoding='utf-8') as f:
+            f.write(texto.getvalue())
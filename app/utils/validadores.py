@@ -1,4 +1,63 @@
 import re
+import sys
+from functools import lru_cache
+from operator import mul
+
+# Padrões compilados uma única vez (e não a cada chamada)
+# Antigo: 3 letras + 4 números | Mercosul: 3 letras, 1 num, 1 letra, 2 num
+PADRAO_PLACA = re.compile(r'[A-Z]{3}[0-9][A-Z0-9][0-9]{2}')  # um ou outro, num único teste
+
+# Pesos dos dígitos verificadores do CPF
+_PESOS_1 = tuple(range(10, 1, -1))
+_PESOS_2 = tuple(range(11, 1, -1))
+
+# A partir de quantos itens vale a pena usar o NumPy na validação em lote
+LOTE_MINIMO_NUMPY = 1000
+
+
+@lru_cache(maxsize=None)
+def _numpy():
+    """
+    NumPy, importado só na primeira validação em lote (o import leva ~0,1 s e
+    abrir o sistema não precisa dele). None se não estiver instalado.
+    """
+    try:
+        import numpy
+    except ImportError:  # NumPy é opcional: sem ele o lote é validado item a item
+        return None
+    return numpy
+
+
+class _TabelaLimpeza(dict):
+    """
+    Tabela para str.translate(): decide uma vez, por caractere, se ele fica
+    (e como fica) ou sai, e guarda a resposta para as próximas chamadas.
+    """
+
+    def __init__(self, converter):
+        super().__init__()
+        self._converter = converter
+
+    def __missing__(self, caractere):
+        self[caractere] = resultado = self._converter(chr(caractere))
+        return resultado
+
+
+# CPF: só dígitos ASCII | Placa: só letras/dígitos ASCII, em maiúsculo
+_TABELA_CPF = _TabelaLimpeza(lambda c: c if '0' <= c <= '9' else None)
+_TABELA_PLACA = _TabelaLimpeza(lambda c: c.upper() if c.isascii() and c.isalnum() else None)
+
+
+def _digitos_conferem(cpf_limpo: str) -> bool:
+    """Confere os dois dígitos verificadores de um CPF com 11 dígitos."""
+    # Em bytes, cada dígito vira o código ASCII (48 = '0'): sem int() por caractere
+    d = cpf_limpo.encode('ascii')
+    resto = 11 - (sum(map(mul, d, _PESOS_1)) - 48 * 54) % 11
+    if (0 if resto > 9 else resto) != d[9] - 48:
+        return False
+    resto = 11 - (sum(map(mul, d, _PESOS_2)) - 48 * 65) % 11
+    return (0 if resto > 9 else resto) == d[10] - 48
+
 
 class ValidadorCPF:
     @staticmethod
@@ -10,57 +69,67 @@ class ValidadorCPF:
         if not cpf:
             return ""
         # Remove tudo que não for número
-        return re.sub(r'[^0-9]', '', str(cpf))
+        return str(cpf).translate(_TABELA_CPF)
 
     @staticmethod
-    def validar(cpf: str) -> bool:
+    def normalizar(cpf: str):
         """
-        Verifica se um CPF é válido seguindo as regras matemáticas.
-        Retorna True se válido, False caso contrário.
+        Limpa e valida numa única passada.
+        Retorna o CPF limpo (apenas números) ou None se for inválido.
         """
         cpf_limpo = ValidadorCPF.limpar(cpf)
 
         if len(cpf_limpo) != 11:
-            return False
-        
+            return None
+
         # Caso de 11 numeros iguais que passa na matemática mas é invalido (Ex: 111.111.111-11)
         if cpf_limpo == cpf_limpo[0] * 11:
-            return False
-
-        # Calcula os dígitos verificadores
-        try:
-            # Cálculo do primeiro dígito
-            soma = 0
-            for i in range(9):
-                soma += int(cpf_limpo[i]) * (10 - i)
-            resto = 11 - (soma % 11)
-            digito1 = 0 if resto > 9 else resto
-
-            # Verifica o primeiro dígito
-            if digito1 != int(cpf_limpo[9]):
-                return False
-
-            # Cálculo do segundo dígito
-            soma = 0
-            for i in range(10):
-                soma += int(cpf_limpo[i]) * (11 - i)
-            resto = 11 - (soma % 11)
-            digito2 = 0 if resto > 9 else resto
-
-            # Verifica o segundo dígito
-            return digito2 == int(cpf_limpo[10])
-
-        except (ValueError, IndexError):
-            return False
+            return None
+
+        return cpf_limpo if _digitos_conferem(cpf_limpo) else None
+
+    @staticmethod
+    def validar(cpf: str) -> bool:
+        """
+        Verifica se um CPF é válido seguindo as regras matemáticas.
+        Retorna True se válido, False caso contrário.
+        """
+        return ValidadorCPF.normalizar(cpf) is not None
+
+    @staticmethod
+    def validar_lote(cpfs):
+        """
+        Normaliza uma lista (ou array NumPy) de CPFs de uma vez.
+        Retorna uma lista do mesmo tamanho com o CPF limpo ou None (inválido).
+        Com NumPy instalado, os dígitos verificadores são calculados em bloco.
+        """
+        limpos = [ValidadorCPF.limpar(c) for c in _como_lista(cpfs)]
+        np = _numpy() if len(limpos) >= LOTE_MINIMO_NUMPY else None
+        if np is None:
+            return [ValidadorCPF.normalizar(c) for c in limpos]
+
+        tamanho_ok = np.fromiter((len(c) == 11 for c in limpos), dtype=bool, count=len(limpos))
+        bloco = "".join(c if len(c) == 11 else "0" * 11 for c in limpos).encode('ascii')
+        d = np.frombuffer(bloco, dtype=np.uint8).reshape(-1, 11).astype(np.int32) - 48
+
+        digito1 = 11 - (d[:, :9] @ np.array(_PESOS_1)) % 11
+        digito1[digito1 > 9] = 0
+        digito2 = 11 - (d[:, :10] @ np.array(_PESOS_2)) % 11
+        digito2[digito2 > 9] = 0
+        repetidos = (d == d[:, :1]).all(axis=1)
+
+        validos = tamanho_ok & ~repetidos & (digito1 == d[:, 9]) & (digito2 == d[:, 10])
+        return [c if ok else None for c, ok in zip(limpos, validos.tolist())]
 
     @staticmethod
     def formatar(cpf: str) -> str:
         """Retorna o CPF formatado (XXX.XXX.XXX-XX)"""
-        cpf_limpo = re.sub(r'[^0-9]', '', str(cpf))
+        cpf_limpo = ValidadorCPF.limpar(cpf)
         if len(cpf_limpo) != 11:
             return cpf  # Retorna original se não der para formatar
         return f"{cpf_limpo[:3]}.{cpf_limpo[3:6]}.{cpf_limpo[6:9]}-{cpf_limpo[9:]}"
-    
+
+
 class ValidadorPlaca:
     @staticmethod
     def limpar(placa: str) -> str:
@@ -71,25 +140,54 @@ class ValidadorPlaca:
         if not placa:
             return ""
         # Remove tudo que não for letra ou número e joga para UpperCase
-        limpa = re.sub(r'[^a-zA-Z0-9]', '', str(placa))
-        return limpa.upper()
+        return str(placa).translate(_TABELA_PLACA)
+
+    @staticmethod
+    def normalizar(placa: str):
+        """
+        Limpa e valida numa única passada.
+        Retorna a placa limpa (ex: 'ABC1234') ou None se não for Antiga nem Mercosul.
+        """
+        placa_limpa = ValidadorPlaca.limpar(placa)
+        return placa_limpa if PADRAO_PLACA.fullmatch(placa_limpa) else None
 
     @staticmethod
     def validar(placa: str) -> bool:
         """
         Verifica se a placa bate com o padrão Antigo ou Mercosul.
         """
-        placa_limpa = ValidadorPlaca.limpar(placa)
+        return ValidadorPlaca.normalizar(placa) is not None
+
+    @staticmethod
+    def validar_lote(placas):
+        """
+        Normaliza uma lista (ou array NumPy) de placas de uma vez.
+        Retorna uma lista do mesmo tamanho com a placa limpa ou None (inválida).
+        """
+        limpas = [ValidadorPlaca.limpar(p) for p in _como_lista(placas)]
+        np = _numpy() if len(limpas) >= LOTE_MINIMO_NUMPY else None
+        if np is None:
+            return [p if PADRAO_PLACA.fullmatch(p) else None for p in limpas]
+
+        tamanho_ok = np.fromiter((len(p) == 7 for p in limpas), dtype=bool, count=len(limpas))
+        bloco = "".join(p if len(p) == 7 else "#" * 7 for p in limpas).encode('ascii')
+        c = np.frombuffer(bloco, dtype=np.uint8).reshape(-1, 7)
+
+        letra = (c >= ord('A')) & (c <= ord('Z'))
+        numero = (c >= ord('0')) & (c <= ord('9'))
+        validas = (
+            tamanho_ok
+            & letra[:, :3].all(axis=1)
+            & numero[:, 3]
+            & (letra[:, 4] | numero[:, 4])
+            & numero[:, 5:].all(axis=1)
+        )
+        return [p if ok else None for p, ok in zip(limpas, validas.tolist())]
+
 
-        # Regex para Padrão Antigo (3 letras, 4 números): ^[A-Z]{3}[0-9]{4}$
-        # Regex para Mercosul (3 letras, 1 num, 1 letra, 2 num): ^[A-Z]{3}[0-9][A-Z][0-9]{2}$
-        
-        padrao_antigo = re.compile(r'^[A-Z]{3}[0-9]{4}$')
-        padrao_mercosul = re.compile(r'^[A-Z]{3}[0-9][A-Z][0-9]{2}$')
-
-        if padrao_antigo.match(placa_limpa):
-            return True
-        if padrao_mercosul.match(placa_limpa):
-            return True
-            
-        return False
\ No newline at end of file
+def _como_lista(valores):
+    """Aceita lista, gerador ou array NumPy e devolve uma lista de objetos Python."""
+    np = sys.modules.get("numpy")  # Quem passou um array já importou o NumPy
+    if np is not None and isinstance(valores, np.ndarray):
+        return valores.ravel().tolist()
+    return list(valores)
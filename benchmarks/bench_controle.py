@@ -0,0 +1,180 @@
+"""
+Benchmark das operações mais usadas do ControleEstacionamento.
+
+Para cada armazenamento (json, diario, particionado, sqlite) e cada escala (nº de veículos),
+gera um banco sintético, mede cada operação e salva o resultado em JSON:
+ops/s, latência (média, p50, p90, p99, máx.) e pico de memória (tracemalloc).
+
+Uso:
+    python -m benchmarks.bench_controle --escalas 1000 10000 100000
+    python -m benchmarks.bench_controle --backends json sqlite --saida base.json
+    python -m benchmarks.bench_controle --comparar base.json novo.json
+"""
+import argparse
+import functools
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+
+from app.controllers.controle_acesso import ControleEstacionamento
+from app.database.conexao import BancoDeDadosJson, BancoDeDadosDiario, BancoDeDadosGrupo
+from app.database.conexao_sqlite import BancoDeDadosSQLite
+from app.database.repositorios import criar_repositorio
+from app.utils.estatisticas import resumo_latencias
+from benchmarks.gerador import gerar_dados
+
+BACKENDS = {
+    "json": (BancoDeDadosJson, "estacionamento.json"),
+    "diario": (BancoDeDadosDiario, "estacionamento.json"),
+    "particionado": (functools.partial(BancoDeDadosDiario, particionar=True), "estacionamento.json"),
+    "grupo": (BancoDeDadosGrupo, "estacionamento.json"),
+    "sqlite": (BancoDeDadosSQLite, "estacionamento.db"),
+}
+
+
+def preparar_banco(backend, pasta, dados):
+    """Grava o banco sintético e devolve uma conexão nova apontando para ele."""
+    classe, nome = BACKENDS[backend]
+    caminho = os.path.join(pasta, nome)
+    inicial = classe(caminho)
+    inicial.salvar(dict(dados))
+    inicial.fechar()
+    return classe(caminho)
+
+
+def medir(funcao, repeticoes, tempo_max):
+    """Executa 'funcao' até 'repeticoes' vezes (ou até estourar 'tempo_max' segundos)."""
+    duracoes = []
+    limite = time.perf_counter() + tempo_max
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        funcao()
+        duracoes.append(time.perf_counter() - inicio)
+        if time.perf_counter() > limite:
+            break
+    return duracoes
+
+
+def pico_memoria(funcao):
+    """Pico de memória alocada (KiB) durante UMA execução de 'funcao'."""
+    tracemalloc.start()
+    try:
+        funcao()
+        _, pico = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return round(pico / 1024, 1)
+
+
+def operacoes(sistema, dados, aleatorio):
+    """(nome, função, repetições) de cada operação medida, na ordem de execução."""
+    placas = [v["placa"] for v in dados["veiculos"]]
+    cpfs = [p["cpf"] for p in dados["pessoas"]]
+    ultimo_dia = dados["historico"][-1]["data_hora"][:10] if dados["historico"] else None
+    return [
+        ("buscar_acesso_placa", lambda: sistema.buscar_acesso(aleatorio.choice(placas)), 2000),
+        ("buscar_acesso_cpf", lambda: sistema.buscar_acesso(aleatorio.choice(cpfs)), 2000),
+        ("registrar_fluxo", lambda: sistema.registrar_fluxo(aleatorio.choice(placas), aleatorio.choice(["ENTRADA", "SAIDA"])), 200),
+        ("relatorio_autorizados", sistema.relatorio_autorizados, 20),
+        ("relatorio_veiculos_internos", sistema.relatorio_veiculos_internos, 20),
+        ("historico_ultimos_20", lambda: sistema.relatorio_historico(limite=20), 200),
+        ("historico_do_dia", lambda: sistema.historico_periodo(ultimo_dia, ultimo_dia), 20),
+        # Destrutiva: por último
+        ("encerrar_evento", sistema.encerrar_evento, 3),
+    ]
+
+
+def executar_cenario(backend, escala, tempo_max, memoria, semente=42):
+    dados = gerar_dados(escala, semente=semente)
+    aleatorio = random.Random(semente)
+    resultados = []
+
+    with tempfile.TemporaryDirectory(prefix="bench-estacionamento-") as pasta:
+        db = preparar_banco(backend, pasta, dados)
+        sistema = ControleEstacionamento(criar_repositorio(db))
+
+        # Primeira operação paga o carregamento do banco (cache frio)
+        inicio = time.perf_counter()
+        sistema.buscar_acesso(dados["veiculos"][0]["placa"])
+        resultados.append({"operacao": "primeira_consulta", **resumo_latencias([time.perf_counter() - inicio])})
+
+        for nome, funcao, repeticoes in operacoes(sistema, dados, aleatorio):
+            duracoes = medir(funcao, repeticoes, tempo_max)
+            resultado = {
+                "operacao": nome,
+                "ops_por_seg": round(len(duracoes) / sum(duracoes), 1) if sum(duracoes) else None,
+                **resumo_latencias(duracoes),
+            }
+            if memoria:
+                resultado["pico_memoria_kib"] = pico_memoria(funcao)
+            resultados.append(resultado)
+
+        db.fechar()
+
+    for r in resultados:
+        r.update({"backend": backend, "escala": escala})
+    return resultados
+
+
+def comparar(arquivo_base, arquivo_novo):
+    """Mostra a variação de p50 entre duas execuções (ex.: antes/depois, json/sqlite)."""
+    def indexar(caminho):
+        with open(caminho, encoding="utf-8") as f:
+            return {(r["backend"], r["escala"], r["operacao"]): r for r in json.load(f)["resultados"]}
+
+    base, novo = indexar(arquivo_base), indexar(arquivo_novo)
+    print(f"{'BACKEND':<12} {'ESCALA':>8} {'OPERAÇÃO':<28} {'p50 base':>10} {'p50 novo':>10} {'VARIAÇÃO':>9}")
+    for chave in sorted(base.keys() & novo.keys()):
+        a, b = base[chave]["p50_ms"], novo[chave]["p50_ms"]
+        variacao = f"{(b / a - 1) * 100:+.0f}%" if a else "-"
+        print(f"{chave[0]:<12} {chave[1]:>8} {chave[2]:<28} {a:>10.3f} {b:>10.3f} {variacao:>9}")
+
+
+def principal():
+    parser = argparse.ArgumentParser(description="Benchmark do controle de estacionamento")
+    parser.add_argument("--escalas", type=int, nargs="+", default=[1_000, 10_000, 100_000],
+                        help="Nº de veículos de cada cenário (ex.: 1000 10000 100000 1000000)")
+    parser.add_argument("--backends", nargs="+", choices=sorted(BACKENDS), default=sorted(BACKENDS))
+    parser.add_argument("--tempo-max", type=float, default=5.0, help="Segundos máximos por operação")
+    parser.add_argument("--sem-memoria", action="store_true", help="Não mede o pico de memória")
+    parser.add_argument("--saida", help="Arquivo JSON de resultados (padrão: benchmarks/resultados/<data>.json)")
+    parser.add_argument("--comparar", nargs=2, metavar=("BASE", "NOVO"), help="Compara dois arquivos de resultados")
+    args = parser.parse_args()
+
+    if args.comparar:
+        comparar(*args.comparar)
+        return
+
+    resultados = []
+    for escala in args.escalas:
+        for backend in args.backends:
+            print(f"--- {backend} / {escala} veículos ---", flush=True)
+            for r in executar_cenario(backend, escala, args.tempo_max, not args.sem_memoria):
+                resultados.append(r)
+                print(f"{r['operacao']:<28} p50={r['p50_ms']:>10.3f}ms  p99={r['p99_ms']:>10.3f}ms  "
+                      f"ops/s={r.get('ops_por_seg') or '-'}  mem={r.get('pico_memoria_kib', '-')}KiB", flush=True)
+
+    saida = args.saida or os.path.join("benchmarks", "resultados", f"{datetime.now():%Y%m%d-%H%M%S}.json")
+    os.makedirs(os.path.dirname(saida) or ".", exist_ok=True)
+    with open(saida, "w", encoding="utf-8") as f:
+        json.dump({
+            "meta": {
+                "data": datetime.now().isoformat(timespec="seconds"),
+                "python": sys.version.split()[0],
+                "plataforma": platform.platform(),
+                "escalas": args.escalas,
+                "backends": args.backends,
+            },
+            "resultados": resultados,
+        }, f, indent=2, ensure_ascii=False)
+    print(f"\nResultados salvos em {saida}")
+
+
+if __name__ == "__main__":
+    principal()
@@ -0,0 +1,71 @@
+"""
+Benchmark dos formatos do arquivo principal (json, json_indentado, orjson, msgpack, binario).
+
+Para cada escala (nº de veículos), gera um banco sintético e mede, em cada
+formato disponível: tempo para gravar (codificar + escrever), tempo para ler
+(ler + decodificar) e tamanho do arquivo. Os formatos que dependem de uma
+biblioteca não instalada aparecem como indisponíveis.
+
+Uso:
+    python -m benchmarks.bench_formatos
+    python -m benchmarks.bench_formatos --escalas 10000 100000 --repeticoes 5
+"""
+import argparse
+import os
+import tempfile
+import time
+
+from app.database.conexao import FORMATOS, FormatoIndisponivel, codec, completar_dados, decodificar
+from app.utils.estatisticas import resumo_latencias
+from benchmarks.gerador import gerar_dados
+
+
+def medir_formato(nome, dados, pasta, repeticoes):
+    escritor = codec(nome)
+    caminho = os.path.join(pasta, f"estacionamento.{nome}")
+    gravacoes, leituras = [], []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        with open(caminho, 'wb') as f:
+            f.write(escritor.codificar(dados))
+        gravacoes.append(time.perf_counter() - inicio)
+
+        inicio = time.perf_counter()
+        with open(caminho, 'rb') as f:
+            lidos = decodificar(f.read())
+        leituras.append(time.perf_counter() - inicio)
+
+    if lidos != dados:
+        raise AssertionError(f"O formato '{nome}' não devolveu os mesmos dados.")
+    return {
+        "formato": nome,
+        "gravar_p50_ms": resumo_latencias(gravacoes)["p50_ms"],
+        "ler_p50_ms": resumo_latencias(leituras)["p50_ms"],
+        "tamanho_kib": round(os.path.getsize(caminho) / 1024),
+    }
+
+
+def principal():
+    parser = argparse.ArgumentParser(description="Benchmark dos formatos do arquivo principal")
+    parser.add_argument("--escalas", type=int, nargs="+", default=[100_000], help="Nº de veículos de cada cenário")
+    parser.add_argument("--repeticoes", type=int, default=3, help="Gravações/leituras por formato")
+    args = parser.parse_args()
+
+    for escala in args.escalas:
+        # Mesmo conteúdo que o banco grava (eventos, sem o campo antigo 'autorizado')
+        dados = completar_dados(gerar_dados(escala))
+        print(f"--- {escala} veículos, {len(dados['historico'])} movimentações ---")
+        print(f"{'FORMATO':<16} {'GRAVAR p50':>12} {'LER p50':>12} {'TAMANHO':>12}")
+        with tempfile.TemporaryDirectory(prefix="bench-formatos-") as pasta:
+            for nome in FORMATOS:
+                try:
+                    r = medir_formato(nome, dados, pasta, args.repeticoes)
+                except FormatoIndisponivel:
+                    print(f"{nome:<16} {'(biblioteca não instalada)':>38}")
+                    continue
+                print(f"{nome:<16} {r['gravar_p50_ms']:>10.1f}ms {r['ler_p50_ms']:>10.1f}ms "
+                      f"{r['tamanho_kib']:>8} KiB")
+
+
+if __name__ == "__main__":
+    principal()
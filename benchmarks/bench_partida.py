@@ -0,0 +1,83 @@
+"""
+Benchmark da partida a frio do main.py (processo Python novo a cada medição).
+
+Mede, num banco sintético de cada escala (nº de veículos):
+  - ate_o_menu:          importar o main.py e montar o parser (o que acontece antes do menu aparecer)
+  - primeira_consulta:   importar + a primeira consulta de placa na portaria, sem aquecimento
+  - carga_em_segundo_plano / consulta_aquecida: com o aquecimento do menu (sistema.aquecer()),
+                          quanto a thread leva para carregar e quanto custa a consulta depois disso
+
+Uso:
+    python -m benchmarks.bench_partida
+    python -m benchmarks.bench_partida --escalas 10000 100000 --repeticoes 5
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+from app.database.conexao import BancoDeDadosJson
+from app.utils.estatisticas import resumo_latencias
+from benchmarks.gerador import gerar_dados
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Roda num processo novo: nada importado nem carregado antes do relógio começar
+PROCESSO_FILHO = """
+import json, sys, time
+inicio = time.perf_counter()
+import main
+main.criar_parser()
+menu = time.perf_counter()
+placa = sys.argv[1]
+if sys.argv[2] == "aquecer":
+    main.sistema.aquecer()
+    while not main.sistema.pronto():
+        time.sleep(0.001)
+    pronto = time.perf_counter()
+    main.sistema.buscar_acesso(placa)
+    fim = time.perf_counter()
+    print(json.dumps({"carga_em_segundo_plano": pronto - menu, "consulta_aquecida": fim - pronto}))
+else:
+    main.sistema.buscar_acesso(placa)
+    fim = time.perf_counter()
+    print(json.dumps({"ate_o_menu": menu - inicio, "primeira_consulta": fim - inicio}))
+"""
+
+
+def medir_partida(arquivo, placa, repeticoes):
+    """{medida: resumo de latências} de 'repeticoes' partidas com e sem aquecimento."""
+    ambiente = dict(os.environ, ESTACIONAMENTO_ARQUIVO=arquivo, ESTACIONAMENTO_MODO="json")
+    amostras = {}
+    for _ in range(repeticoes):
+        for modo in ("frio", "aquecer"):
+            saida = subprocess.run([sys.executable, "-c", PROCESSO_FILHO, placa, modo], cwd=RAIZ, env=ambiente,
+                                   capture_output=True, text=True, check=True).stdout
+            for medida, duracao in json.loads(saida.strip().splitlines()[-1]).items():
+                amostras.setdefault(medida, []).append(duracao)
+    return {medida: resumo_latencias(duracoes) for medida, duracoes in amostras.items()}
+
+
+def principal():
+    parser = argparse.ArgumentParser(description="Benchmark da partida a frio do main.py")
+    parser.add_argument("--escalas", type=int, nargs="+", default=[100_000], help="Nº de veículos de cada cenário")
+    parser.add_argument("--repeticoes", type=int, default=5, help="Partidas medidas por cenário")
+    args = parser.parse_args()
+
+    for escala in args.escalas:
+        dados = gerar_dados(escala)
+        placa = dados["veiculos"][len(dados["veiculos"]) // 2]["placa"]
+        with tempfile.TemporaryDirectory(prefix="bench-partida-") as pasta:
+            arquivo = os.path.join(pasta, "estacionamento.json")
+            banco = BancoDeDadosJson(arquivo, backup_horas=None)
+            banco.salvar(dados)
+            banco.fechar()
+            print(f"--- {escala} veículos ({os.path.getsize(arquivo) / 1024 / 1024:.1f} MiB) ---")
+            for medida, r in medir_partida(arquivo, placa, args.repeticoes).items():
+                print(f"{medida:<24} p50={r['p50_ms']:>9.1f}ms  max={r['max_ms']:>9.1f}ms", flush=True)
+
+
+if __name__ == "__main__":
+    principal()
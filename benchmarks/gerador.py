@@ -0,0 +1,79 @@
+"""
+Gera bancos sintéticos (pessoas, veículos e histórico) com CPFs válidos e
+placas nos padrões Antigo (ABC1234) e Mercosul (ABC1D23), sem repetições.
+Determinístico: a mesma semente gera sempre os mesmos dados.
+"""
+import random
+from datetime import datetime, timedelta
+
+LETRAS = "ABCDEFGHIJKLMNOPQRSTUVWXYZ"
+TOTAL_PLACAS = 26 ** 3 * 10 ** 4  # Mesma quantidade nos dois padrões
+# Multiplicador coprimo com TOTAL_PLACAS: espalha os índices sem repetir
+PASSO_PLACAS = 7_368_787
+
+
+def gerar_cpf(indice: int) -> str:
+    """CPF válido e único para cada índice (até 10^9)."""
+    base = f"{(indice * 7_919 + 100_000_007) % 1_000_000_000:09d}"
+    digitos = [int(c) for c in base]
+    for peso_inicial in (10, 11):
+        soma = sum(d * (peso_inicial - i) for i, d in enumerate(digitos))
+        resto = 11 - (soma % 11)
+        digitos.append(0 if resto > 9 else resto)
+    return "".join(map(str, digitos))
+
+
+def gerar_placa(indice: int) -> str:
+    """
+    Placa única: índices pares no padrão Antigo, ímpares no Mercosul
+    (o 2º dígito vira letra A-J, como na conversão oficial).
+    """
+    n = (indice // 2 * PASSO_PLACAS) % TOTAL_PLACAS
+    bloco, numero = divmod(n, 10_000)
+    letras = LETRAS[bloco // 676] + LETRAS[bloco // 26 % 26] + LETRAS[bloco % 26]
+    if indice % 2 == 0:
+        return f"{letras}{numero:04d}"
+    return f"{letras}{numero // 1000}{LETRAS[numero // 100 % 10]}{numero % 100:02d}"
+
+
+def gerar_dados(qtd_veiculos: int, qtd_movimentos: int = None, semente: int = 42) -> dict:
+    """
+    Monta um dicionário no formato do banco JSON.
+    :param qtd_veiculos: Nº de veículos (há ~1 pessoa para cada 2 veículos)
+    :param qtd_movimentos: Nº de registros no histórico (padrão: igual a qtd_veiculos)
+    """
+    aleatorio = random.Random(semente)
+    qtd_movimentos = qtd_veiculos if qtd_movimentos is None else qtd_movimentos
+    qtd_pessoas = max(1, qtd_veiculos // 2)
+
+    pessoas = [
+        {"nome": f"Pessoa Sintética {i}", "cpf": gerar_cpf(i), "contato": f"pessoa{i}@exemplo.com"}
+        for i in range(qtd_pessoas)
+    ]
+    veiculos = [
+        {
+            "placa": gerar_placa(i),
+            "modelo": aleatorio.choice(["Fiat Uno", "VW Gol", "Chevrolet Onix", "Honda Civic"]),
+            "cor": aleatorio.choice(["Preto", "Prata", "Branco", "Vermelho"]),
+            "proprietario_cpf": pessoas[i % qtd_pessoas]["cpf"],
+            "autorizado": aleatorio.random() < 0.5,
+        }
+        for i in range(qtd_veiculos)
+    ]
+
+    # Movimentos em ordem cronológica, alternando ENTRADA/SAIDA por placa
+    historico = []
+    dentro = {}  # placa -> data/hora da entrada (a ocupação gravada no banco)
+    instante = datetime(2026, 1, 1, 8, 0, 0)
+    for _ in range(qtd_movimentos):
+        placa = veiculos[aleatorio.randrange(qtd_veiculos)]["placa"]
+        tipo = "SAIDA" if placa in dentro else "ENTRADA"
+        instante += timedelta(seconds=aleatorio.randint(1, 30))
+        data_hora = instante.strftime("%Y-%m-%d %H:%M:%S")
+        if tipo == "SAIDA":
+            del dentro[placa]
+        else:
+            dentro[placa] = data_hora
+        historico.append({"placa": placa, "tipo": tipo, "data_hora": data_hora})
+
+    return {"pessoas": pessoas, "veiculos": veiculos, "historico": historico, "ocupacao": dentro}
@@ -1,9 +1,55 @@
 import os
 import sys
-from app.controllers.controle_acesso import ControleEstacionamento
+import argparse
+import threading
+from contextlib import nullcontext
 
-# Inicializa o controlador (o cérebro do sistema)
-sistema = ControleEstacionamento()
+
+class SistemaSobDemanda:
+    """
+    O controlador (o cérebro do sistema), criado só no primeiro uso: abrir o
+    menu ou rodar um comando que não mexe no banco não carrega nada.
+    aquecer() carrega o banco e os índices numa thread, enquanto o menu é
+    desenhado; quem usar o sistema antes disso espera a carga terminar.
+    """
+
+    def __init__(self):
+        self._sistema = None
+        self._trava = threading.Lock()
+        self._aquecedor = None
+
+    def obter(self):
+        """O ControleEstacionamento de verdade (criado na primeira chamada)."""
+        if self._sistema is None:
+            with self._trava:
+                if self._sistema is None:
+                    from app.controllers.controle_acesso import ControleEstacionamento
+                    self._sistema = ControleEstacionamento()
+        return self._sistema
+
+    def aquecer(self):
+        """Dispara a carga em segundo plano (uma vez só)."""
+        if self._aquecedor is None:
+            self._aquecedor = threading.Thread(target=self._aquecer, name="aquecedor", daemon=True)
+            self._aquecedor.start()
+
+    def _aquecer(self):
+        try:
+            self.obter().aquecer()
+        except Exception:
+            pass  # Ex.: banco corrompido. O erro aparece (e é tratado) na primeira consulta
+
+    def pronto(self):
+        """True se já dá para consultar sem esperar a carga."""
+        return self._aquecedor is None or not self._aquecedor.is_alive()
+
+    def __getattr__(self, nome):
+        if self._aquecedor is not None:
+            self._aquecedor.join()  # O cache não é compartilhado entre threads no meio da carga
+        return getattr(self.obter(), nome)
+
+
+sistema = SistemaSobDemanda()
 
 def limpar_tela():
     """Limpa o console de comando (funciona em Windows e Linux/Mac)."""
@@ -15,12 +61,19 @@ def exibir_cabecalho():
     print("="*50)
 
 def menu_principal():
+    sistema.aquecer()  # O banco carrega enquanto o operador lê o menu
     while True:
         limpar_tela()
         exibir_cabecalho()
+        if sistema.pronto():
+            evento = sistema.evento_atual()
+            print(f"Evento em andamento: {evento['nome'] if evento else '(nenhum)'}")
+        else:
+            print("Evento em andamento: (carregando o banco...)")
         print("\n[ CADASTRO E GESTÃO ]")
         print("1. Cadastrar Pessoa")
         print("2. Gerenciar Veículo (Autorizar)")
+        print("E. Eventos (Preparar / Abrir)")
         
         print("\n[ OPERAÇÃO ]")
         print("3. PORTARIA (Consulta & Fluxo)")
@@ -30,8 +83,10 @@ def menu_principal():
         print("5. Ver Lista de Autorizados")
         print("6. Ver Histórico Completo")
         print("7. Exportar Histórico para Excel (CSV)")
+        print("A. Estatísticas (Fluxo por Hora, Pico, Permanência)")
         
         print("\n[ MANUTENÇÃO ]")
+        print("8. Recalcular Ocupação do Pátio")
         print("9. ENCERRAR EVENTO (Reset)")
         print("0. Sair")
         
@@ -41,6 +96,8 @@ def menu_principal():
             tela_cadastro_pessoa()
         elif opcao == '2':
             tela_gestao_veiculo()
+        elif opcao.upper() == 'E':
+            tela_eventos()
         elif opcao == '3':
             tela_consulta_acesso()
         elif opcao == '4':
@@ -52,6 +109,11 @@ def menu_principal():
         elif opcao == '7':
             res = sistema.exportar_historico_csv()
             input(f"\n>> {res['mensagem']}\nPressione Enter...")
+        elif opcao.upper() == 'A':
+            tela_estatisticas()
+        elif opcao == '8':
+            res = sistema.recalcular_ocupacao()
+            input(f"\n>> {res['mensagem']}\nPressione Enter...")
         elif opcao == '9':
             tela_reset_evento()
         elif opcao == '0':
@@ -99,11 +161,32 @@ def tela_gestao_veiculo():
     print(f"\n>> {resultado['mensagem']}")
     input("\nPressione Enter para voltar ao menu...")
 
+def tela_eventos():
+    while True:
+        limpar_tela()
+        print("--- EVENTOS ---")
+        print("As autorizações valem para o evento EM ANDAMENTO. A lista do próximo")
+        print("evento pode ser montada antes (EM PREPARAÇÃO) e aberta quando ele começar.\n")
+        print(f"{'Nº':<4} | {'NOME':<25} | {'SITUAÇÃO':<14} | {'AUTORIZADOS':>11}")
+        print("-" * 63)
+        for evento in sistema.listar_eventos():
+            print(f"{evento['id']:<4} | {evento['nome']:<25} | {evento['situacao']:<14} | {evento['total_autorizados']:>11}")
+        print("-" * 63)
+
+        acao = input("[N] Novo evento (preparação) | [A] Abrir evento | [Enter] Voltar: ").strip().upper()
+        if acao == 'N':
+            resultado = sistema.criar_evento(input("Nome do evento: "))
+        elif acao == 'A':
+            resultado = sistema.abrir_evento(input("Nº do evento a abrir: ").strip() or 0)
+        else:
+            break
+        input(f"\n>> {resultado['mensagem']}\nPressione Enter...")
+
 def tela_consulta_acesso():
     while True:
         limpar_tela()
         print("--- 3. PORTARIA (CONSULTA & REGISTRO) ---\n")
-        busca = input("Digite a PLACA ou o CPF (ou 'sair'): ").strip()
+        busca = input("Digite a PLACA, o CPF ou parte do nome/placa (ou 'sair'): ").strip()
         if busca.lower() == 'sair': break
         
         resultado = sistema.buscar_acesso(busca)
@@ -142,6 +225,8 @@ def tela_consulta_acesso():
                     print(f"\n>> {res_reg['mensagem']}")
         else:
             print(f"AVISO: {resultado['mensagem']}")
+            for sugestao in resultado.get('sugestoes', []):
+                print(f"  -> {sugestao['termo']}: {sugestao['descricao']}")
         
         print("="*40)
         input("\nProxima consulta (Enter)...")
@@ -154,10 +239,12 @@ def tela_veiculos_dentro():
     if not lista:
         print("\nO pátio está vazio.")
     else:
-        print(f"{'PLACA':<10} | {'VEÍCULO':<20} | {'PROPRIETÁRIO'}")
-        print("-" * 50)
+        print(f"{'PLACA':<10} | {'ENTRADA':<19} | {'VEÍCULO':<20} | {'PROPRIETÁRIO'}")
+        print("-" * 72)
         for item in lista:
-            print(f"{item['placa']:<10} | {item['modelo']:<20} | {item['dono']}")
+            print(f"{item['placa']:<10} | {item['entrada']:<19} | {item['modelo']:<20} | {item['dono']}")
+        print("-" * 72)
+        print(f"Total no pátio: {sistema.ocupacao_atual()} veículo(s).")
     
     input("\nPressione Enter para voltar...")
 
@@ -185,25 +272,61 @@ def tela_relatorio_historico():
     print(f"{'DATA/HORA':<20} | {'TIPO':<10} | {'PLACA':<10}")
     print("-" * 46)
     
-    historico = sistema.relatorio_historico()
+    # Mostra apenas os últimos 20 para não poluir a tela
+    historico = sistema.relatorio_historico(limite=20)
     
     if not historico:
         print(">> Nenhum registro de movimentação encontrado.")
     else:
-        # Mostra apenas os últimos 20 para não poluir a tela
-        for item in historico[:20]:
+        for item in historico:
             print(f"{item['data_hora']:<20} | {item['tipo']:<10} | {item['placa']:<10}")
             
     print("-" * 46)
     input("\nPressione Enter para voltar...")
 
+def tela_estatisticas():
+    limpar_tela()
+    print("--- ESTATÍSTICAS DO PERÍODO ---")
+    inicio = input("Data inicial (AAAA-MM-DD) [Enter = desde o início]: ").strip() or None
+    fim = input("Data final   (AAAA-MM-DD) [Enter = até hoje]: ").strip() or None
+    estatisticas = sistema.relatorio_estatisticas(inicio, fim)
+
+    if not estatisticas["dias"]:
+        input("\nNenhuma movimentação no período. Enter para voltar...")
+        return
+
+    print(f"\n[ FLUXO POR HORA ] ({estatisticas['dias']} dia(s))")
+    print(f"{'HORA':<6} | {'ENTRADAS':>8} | {'SAÍDAS':>8}")
+    for linha in estatisticas["fluxo_por_hora"]:
+        if linha["entradas"] or linha["saidas"]:
+            print(f"{linha['hora']:<6} | {linha['entradas']:>8} | {linha['saidas']:>8}")
+
+    pico = estatisticas["pico_ocupacao"]
+    print(f"\n[ PICO DE OCUPAÇÃO ] {pico['veiculos']} veículo(s) em {pico['data_hora'] or '-'}")
+
+    permanencia = estatisticas["permanencia"]
+    print("\n[ PERMANÊNCIA ]")
+    if permanencia["estadias"]:
+        print(f"{permanencia['estadias']} estadia(s) | média {permanencia['media_min']} min | "
+              f"p50 {permanencia['p50_min']} min | p95 {permanencia['p95_min']} min | máx. {permanencia['max_min']} min")
+    else:
+        print("Nenhuma estadia encerrada no período.")
+
+    visitantes = estatisticas["visitantes"]
+    print(f"\n[ VISITANTES ] {visitantes['visitantes']} veículo(s), {visitantes['recorrentes']} recorrente(s)")
+    for v in visitantes["mais_frequentes"]:
+        media = f"{v['permanencia_media_min']} min" if v["permanencia_media_min"] is not None else "-"
+        print(f"  {v['placa']:<8} {v['visitas']:>4} visita(s) em {v['dias']} dia(s) | permanência média {media}")
+
+    input("\nEnter para voltar...")
+
 def tela_reset_evento():
     limpar_tela()
     print("!!!" + "="*40 + "!!!")
     print("       ÁREA DE SEGURANÇA - RESET GERAL       ")
     print("!!!" + "="*40 + "!!!")
-    print("\nEsta ação irá remover a autorização de TODOS os veículos.")
-    print("Isso deve ser feito APENAS ao final do evento para limpar o banco.")
+    print("\nEsta ação irá ENCERRAR o evento em andamento: nenhum veículo da lista dele")
+    print("será mais liberado. Isso deve ser feito APENAS ao final do evento.")
     print("\nPara confirmar, digite exatamente: CONFIRMAR")
     
     confirmacao = input("\nSua resposta: ")
@@ -217,6 +340,246 @@ def tela_reset_evento():
     
     input("\nPressione Enter para voltar ao menu...")
 
+# --- COMANDOS DE LINHA DE COMANDO ---
+
+def comando_migrar(args):
+    """Copia o banco JSON para um novo banco SQLite."""
+    from app.database.conexao_sqlite import BancoDeDadosSQLite
+
+    banco = BancoDeDadosSQLite(args.sqlite)
+    try:
+        contagem = banco.migrar_de_json(args.json)
+    except (FileNotFoundError, ValueError) as e:
+        print(f"Erro: {e}")
+        sys.exit(1)
+    finally:
+        banco.fechar()
+
+    print(f"Migração concluída: {contagem['pessoas']} pessoas, "
+          f"{contagem['veiculos']} veículos, {contagem['historico']} movimentações.")
+    print("Para usar o novo banco, defina ESTACIONAMENTO_MODO=sqlite.")
+
+def comando_importar(args):
+    """Importa a lista de pessoas/veículos enviada pela empresa."""
+    resultado = sistema.importar_csv(args.arquivo, args.delimitador)
+    for erro in resultado["erros"]:
+        print(f"Linha {erro['linha'] or '-'}: {erro['erro']}")
+    print(f"\n>> {resultado['mensagem']}")
+    if not resultado["sucesso"]:
+        sys.exit(1)
+
+def comando_exportar(args):
+    """Exporta o histórico (filtrado) para CSV."""
+    resultado = sistema.exportar_historico_csv(
+        destino=args.saida, inicio=args.inicio, fim=args.fim,
+        placa=args.placa, tipo=args.tipo, compactar=args.gzip or None
+    )
+    print(f">> {resultado['mensagem']}")
+    if not resultado["sucesso"]:
+        sys.exit(1)
+
+def comando_arquivar(args):
+    """Passa o histórico para arquivos diários (se ainda não estiver) e compacta os dias encerrados."""
+    from app.database.conexao import BancoDeDadosDiario
+
+    banco = BancoDeDadosDiario(args.json, particionar=True)
+    try:
+        compactados = banco.arquivar_historico(args.antes_de)
+        dias = banco.ler()["historico"].dias
+    finally:
+        banco.fechar()
+
+    print(f">> Histórico em {len(dias)} arquivo(s) diário(s) em '{banco.particoes.pasta}'. "
+          f"{compactados} dia(s) compactado(s).")
+    print("O banco continua particionado nas próximas aberturas (em qualquer modo JSON).")
+
+def comando_converter(args):
+    """Regrava o arquivo principal do banco em outro formato."""
+    from app.database.conexao import BancoDeDadosDiario, FormatoIndisponivel
+
+    if not os.path.exists(args.json):
+        print(f"Erro: Arquivo não encontrado: {args.json}")
+        sys.exit(1)
+    antes = os.path.getsize(args.json)
+    try:
+        banco = BancoDeDadosDiario(args.json, formato=args.formato)
+    except FormatoIndisponivel as e:
+        print(f"Erro: {e}")
+        sys.exit(1)
+    try:
+        banco.atualizar(lambda dados: None)  # Regrava (incorporando o diário, se houver)
+    finally:
+        banco.fechar()
+
+    print(f">> '{args.json}' gravado em {args.formato}: {antes / 1024:.0f} KiB -> "
+          f"{os.path.getsize(args.json) / 1024:.0f} KiB.")
+    print("O formato é detectado na leitura e mantido nas próximas gravações "
+          "(a menos que ESTACIONAMENTO_FORMATO indique outro).")
+
+def comando_backup(args):
+    """Cópias de segurança do banco JSON: criar, listar, verificar e restaurar."""
+    from app.database.backups import BackupsBanco, BackupInvalido
+
+    backups = BackupsBanco(args.json, args.geracoes)
+    try:
+        if args.acao == "criar":
+            copia = backups.criar()
+            print(f">> Cópia '{copia['nome']}' criada em '{backups.pasta}' ({len(copia['arquivos'])} arquivo(s)).")
+        elif args.acao == "listar":
+            copias = backups.listar()
+            for copia in copias:
+                print(f"{copia['nome']:<20} {copia['criado_em']}  versão {copia['versao']:<8} {copia['motivo']}")
+            print(f">> {len(copias)} cópia(s) em '{backups.pasta}'.")
+        elif args.acao == "verificar":
+            resultados = backups.verificar(args.nome)
+            for r in resultados:
+                print(f"{r['nome']:<20} {'OK' if not r['erros'] else 'INVÁLIDA: ' + '; '.join(r['erros'])}")
+            if any(r["erros"] for r in resultados):
+                sys.exit(1)
+        else:
+            r = backups.restaurar(args.ate, args.destino)
+            print(f">> '{r['destino']}' restaurado a partir da cópia {r['copia']} "
+                  f"({r['criado_em']}) + {r['movimentos_refeitos']} movimentação(ões) refeita(s).")
+            if r["ignoradas"]:
+                print(f"Cópias inválidas ignoradas: {', '.join(r['ignoradas'])}")
+    except (BackupInvalido, FileNotFoundError) as e:
+        print(f"Erro: {e}")
+        sys.exit(1)
+
+def comando_cameras(args):
+    """Portaria automática: lê placas das câmeras (ANPR), decide e registra Entrada/Saída."""
+    import json
+    import signal
+    from app.cameras import PipelineCameras, abrir_fonte
+    from app.controllers.controle_acesso import ControleEstacionamento
+    from app.database.repositorios import criar_repositorio
+
+    # Como o servidor, é o único processo gravando: o cache não precisa conferir o disco
+    controle = ControleEstacionamento(criar_repositorio(exclusivo=True))
+    parar = threading.Event()
+    try:
+        fonte = abrir_fonte(args.fonte, sys.stdin, parar)
+    except ValueError as e:
+        print(f"Erro: {e}")
+        sys.exit(1)
+    mostrar = (lambda decisao: print(json.dumps(decisao, ensure_ascii=False), flush=True)) if args.decisoes else None
+    pipeline = PipelineCameras(controle, janela=args.janela, trabalhadores=args.trabalhadores,
+                               lote=args.lote, ao_decidir=mostrar)
+
+    signal.signal(signal.SIGTERM, signal.default_int_handler)
+    print(f"Lendo placas de '{args.fonte}' (Ctrl+C para sair)", file=sys.stderr)
+    try:
+        metricas = pipeline.processar(fonte)
+    except KeyboardInterrupt:
+        parar.set()
+        metricas = pipeline.metricas()
+    finally:
+        controle.repo.db.fechar()
+    print(json.dumps(metricas, ensure_ascii=False, indent=2), file=sys.stderr)
+
+def comando_autorizados(args):
+    """Gera ou consulta o arquivo binário das placas autorizadas no evento em andamento."""
+    if args.acao == "exportar":
+        resultado = sistema.exportar_autorizados(args.arquivo)
+        print(f">> {resultado['mensagem']}")
+        if not resultado["sucesso"]:
+            sys.exit(1)
+        return
+
+    # Consulta direto no arquivo (mmap), sem carregar o banco
+    from app.database.autorizacoes import ArquivoAutorizadosInvalido, LeitorAutorizados
+    try:
+        leitor = LeitorAutorizados(args.arquivo)
+    except (FileNotFoundError, ArquivoAutorizadosInvalido) as e:
+        print(f"Erro: {e}")
+        sys.exit(1)
+    for placa in args.placas:
+        print(f"{placa}: {'LIBERADO' if leitor.autorizada(placa) else 'BLOQUEADO'}")
+    leitor.fechar()
+
+def comando_servidor(args):
+    """Sobe o servidor HTTP/JSON para várias portarias."""
+    from app.servidor import executar_servidor
+    executar_servidor(args.host, args.porta, metricas=args.metricas)
+
+def criar_parser():
+    from app.database.conexao import FORMATOS
+
+    parser = argparse.ArgumentParser(description="Sistema de Estacionamento & Controle de Acesso")
+    parser.add_argument("--metricas", default=os.environ.get("ESTACIONAMENTO_METRICAS") or None,
+                        help="Mede cada chamada do controlador/repositório/banco e grava, ao sair, no formato "
+                             "do Prometheus neste arquivo ('-' = tela)")
+    parser.add_argument("--perfil", help="Grava o perfil da sessão (cProfile + tracemalloc) neste arquivo "
+                                         "(resumo em <arquivo>.txt)")
+    sub = parser.add_subparsers(dest="comando")
+
+    p_migrar = sub.add_parser("migrar", help="Migra data/estacionamento.json para SQLite")
+    p_migrar.add_argument("--json", default="data/estacionamento.json", help="Banco JSON de origem")
+    p_migrar.add_argument("--sqlite", default="data/estacionamento.db", help="Banco SQLite de destino")
+    p_migrar.set_defaults(funcao=comando_migrar)
+
+    p_importar = sub.add_parser("importar", help="Importa a lista da empresa (CSV) de uma só vez")
+    p_importar.add_argument("arquivo", help="CSV com colunas nome, cpf, contato, placa, modelo, cor, autorizado")
+    p_importar.add_argument("--delimitador", choices=[",", ";"], help="Separador (detectado automaticamente)")
+    p_importar.set_defaults(funcao=comando_importar)
+
+    p_exportar = sub.add_parser("exportar", help="Exporta o histórico para CSV")
+    p_exportar.add_argument("--saida", default="data/relatorio_acessos.csv", help="Arquivo de saída (.csv ou .csv.gz)")
+    p_exportar.add_argument("--inicio", help="Data/hora inicial (AAAA-MM-DD [HH:MM:SS])")
+    p_exportar.add_argument("--fim", help="Data/hora final (AAAA-MM-DD [HH:MM:SS])")
+    p_exportar.add_argument("--placa", help="Somente esta placa")
+    p_exportar.add_argument("--tipo", choices=["ENTRADA", "SAIDA"], help="Somente entradas ou saídas")
+    p_exportar.add_argument("--gzip", action="store_true", help="Compacta a saída com gzip")
+    p_exportar.set_defaults(funcao=comando_exportar)
+
+    p_arquivar = sub.add_parser("arquivar", help="Divide o histórico por dia e compacta os dias encerrados")
+    p_arquivar.add_argument("--json", default=os.environ.get("ESTACIONAMENTO_ARQUIVO", "data/estacionamento.json"),
+                            help="Banco JSON")
+    p_arquivar.add_argument("--antes-de", help="Compacta os dias anteriores a esta data (AAAA-MM-DD; padrão: hoje)")
+    p_arquivar.set_defaults(funcao=comando_arquivar)
+
+    p_converter = sub.add_parser("converter", help="Regrava o banco JSON em outro formato (compacto, binário...)")
+    p_converter.add_argument("formato", choices=FORMATOS)
+    p_converter.add_argument("--json", default=os.environ.get("ESTACIONAMENTO_ARQUIVO", "data/estacionamento.json"),
+                             help="Banco JSON")
+    p_converter.set_defaults(funcao=comando_converter)
+
+    p_backup = sub.add_parser("backup", help="Cópias de segurança do banco JSON (criar, listar, verificar, restaurar)")
+    p_backup.add_argument("acao", choices=["criar", "listar", "verificar", "restaurar"])
+    p_backup.add_argument("--json", default=os.environ.get("ESTACIONAMENTO_ARQUIVO", "data/estacionamento.json"),
+                          help="Banco JSON")
+    p_backup.add_argument("--geracoes", type=int, default=int(os.environ.get("ESTACIONAMENTO_BACKUP_GERACOES", "7")),
+                          help="Quantas cópias manter")
+    p_backup.add_argument("--nome", help="verificar: somente esta cópia")
+    p_backup.add_argument("--ate", help="restaurar: volta o banco a este instante (AAAA-MM-DD [HH:MM:SS]; padrão: agora)")
+    p_backup.add_argument("--destino", help="restaurar: grava em outro arquivo em vez de substituir o banco")
+    p_backup.set_defaults(funcao=comando_backup)
+
+    p_cameras = sub.add_parser("cameras", help="Portaria automática: placas lidas por câmeras (ANPR)")
+    p_cameras.add_argument("--fonte", default="-",
+                           help="'-' (JSON lines na entrada padrão), 'arquivo:CAMINHO' (segue o arquivo) "
+                                "ou 'socket:CAMINHO' (socket UNIX)")
+    p_cameras.add_argument("--janela", type=float, default=5.0,
+                           help="Segundos em que leituras repetidas da mesma placa (em qualquer câmera) são descartadas")
+    p_cameras.add_argument("--trabalhadores", type=int, default=4, help="Threads que consultam o acesso")
+    p_cameras.add_argument("--lote", type=int, default=200, help="Máximo de movimentações gravadas por lote")
+    p_cameras.add_argument("--decisoes", action="store_true", help="Mostra cada decisão (JSON lines)")
+    p_cameras.set_defaults(funcao=comando_cameras)
+
+    p_autorizados = sub.add_parser("autorizados", help="Arquivo binário das placas autorizadas (portaria via mmap)")
+    p_autorizados.add_argument("acao", choices=["exportar", "consultar"])
+    p_autorizados.add_argument("placas", nargs="*", help="consultar: placas a conferir")
+    p_autorizados.add_argument("--arquivo", default=os.environ.get("ESTACIONAMENTO_AUTORIZADOS", "data/autorizados.bin"),
+                               help="Arquivo da tabela (padrão: ESTACIONAMENTO_AUTORIZADOS ou data/autorizados.bin)")
+    p_autorizados.set_defaults(funcao=comando_autorizados)
+
+    p_servidor = sub.add_parser("servidor", help="Servidor HTTP/JSON para várias portarias")
+    p_servidor.add_argument("--host", default="127.0.0.1")
+    p_servidor.add_argument("--porta", type=int, default=8080)
+    p_servidor.set_defaults(funcao=comando_servidor)
+
+    return parser
+
 if __name__ == "__main__":
     # Verifica/Cria a pasta de dados antes de iniciar para evitar erros
     if not os.path.exists('data'):
@@ -225,5 +588,24 @@ if __name__ == "__main__":
         except PermissionError:
             print("Erro: Sem permissão para criar a pasta 'data'. Execute como Administrador.")
             sys.exit(1)
-            
-    menu_principal()
\ No newline at end of file
+
+    args = criar_parser().parse_args()
+    instrumentacao = None
+    if args.metricas and args.comando != "servidor":  # O servidor mede o próprio sistema
+        from app.utils.instrumentacao import instrumentar_sistema
+        instrumentacao = instrumentar_sistema(sistema.obter())
+    if args.perfil:
+        from app.utils.instrumentacao import capturar_perfil
+        perfil = capturar_perfil(args.perfil)
+    else:
+        perfil = nullcontext()
+
+    with perfil:
+        try:
+            if args.comando:
+                args.funcao(args)
+                sys.exit()
+            menu_principal()
+        finally:
+            if instrumentacao:
+                instrumentacao.exportar(args.metricas)
\ No newline at end of file
@@ -0,0 +1,92 @@
+"""
+Teste de carga do servidor HTTP (python main.py servidor).
+
+Abre N conexões keep-alive simultâneas e dispara consultas GET /acesso por
+placa. Mostra vazão e latência vista pelo cliente e, ao final, a latência
+medida dentro do servidor (GET /metricas).
+
+Com --fluxo cada conexão registra ENTRADA/SAIDA alternadas (POST /fluxo),
+simulando a troca de turno nas portarias.
+
+Uso:
+    python scripts/carga_servidor.py --clientes 300 --requisicoes 200
+    python scripts/carga_servidor.py --clientes 50 --requisicoes 40 --fluxo
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.utils.estatisticas import resumo_latencias
+
+
+async def requisitar(leitor, escritor, metodo, caminho, host, corpo=None):
+    conteudo = json.dumps(corpo).encode() if corpo is not None else b""
+    escritor.write(f"{metodo} {caminho} HTTP/1.1\r\nHost: {host}\r\nContent-Length: {len(conteudo)}\r\n\r\n".encode()
+                   + conteudo)
+    await escritor.drain()
+    tamanho = 0
+    await leitor.readline()  # linha de status
+    while True:
+        linha = await leitor.readline()
+        if linha in (b"\r\n", b""):
+            break
+        nome, _, valor = linha.decode("latin-1").partition(":")
+        if nome.lower() == "content-length":
+            tamanho = int(valor)
+    return json.loads(await leitor.readexactly(tamanho))
+
+
+async def cliente(host, porta, placas, requisicoes, latencias, fluxo=False):
+    leitor, escritor = await asyncio.open_connection(host, porta)
+    placa = random.choice(placas)
+    try:
+        for i in range(requisicoes):
+            inicio = time.perf_counter()
+            if fluxo:
+                tipo = "ENTRADA" if i % 2 == 0 else "SAIDA"
+                await requisitar(leitor, escritor, "POST", "/fluxo", host, {"placa": placa, "tipo": tipo})
+            else:
+                await requisitar(leitor, escritor, "GET", f"/acesso?termo={random.choice(placas)}", host)
+            latencias.append(time.perf_counter() - inicio)
+    finally:
+        escritor.close()
+
+
+async def principal(args):
+    leitor, escritor = await asyncio.open_connection(args.host, args.porta)
+    autorizados = await requisitar(leitor, escritor, "GET", "/relatorios/autorizados", args.host)
+    escritor.close()
+    placas = [v["placa"] for v in autorizados] or ["ABC1234"]
+
+    latencias = []
+    inicio = time.perf_counter()
+    await asyncio.gather(*(
+        cliente(args.host, args.porta, placas, args.requisicoes, latencias, args.fluxo) for _ in range(args.clientes)
+    ))
+    duracao = time.perf_counter() - inicio
+
+    print(f"{len(latencias)} {'movimentos' if args.fluxo else 'consultas'} em {duracao:.2f}s -> {len(latencias) / duracao:.0f} req/s")
+    print("Latência no cliente (ms):", resumo_latencias(latencias))
+
+    leitor, escritor = await asyncio.open_connection(args.host, args.porta)
+    metricas = await requisitar(leitor, escritor, "GET", "/metricas", args.host)
+    escritor.close()
+    print("Latência no servidor (ms):", metricas.get("/fluxo" if args.fluxo else "/acesso"))
+    if "banco" in metricas:
+        print("Banco:", metricas["banco"])
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Teste de carga do servidor de estacionamento")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--porta", type=int, default=8080)
+    parser.add_argument("--clientes", type=int, default=300, help="Conexões simultâneas")
+    parser.add_argument("--requisicoes", type=int, default=100, help="Consultas por conexão")
+    parser.add_argument("--fluxo", action="store_true", help="Registra movimentos (POST /fluxo) em vez de consultar")
+    asyncio.run(principal(parser.parse_args()))
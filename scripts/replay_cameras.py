@@ -0,0 +1,141 @@
+"""
+Replay de leituras de câmeras (ANPR) para medir a vazão da portaria automática.
+
+Gera passagens sintéticas: cada carro é lido 'rajada' vezes seguidas pela
+câmera (como uma câmera real faz), com uma fração de leituras ilegíveis e
+de placas sem cadastro. Os instantes das leituras são simulados, então o
+descarte das repetições não depende da velocidade do replay.
+
+Sem --socket, cria um banco sintético temporário e roda o pipeline no
+próprio processo; com --socket, envia as leituras para um
+'python main.py cameras --fonte socket:CAMINHO' já rodando.
+
+Uso:
+    python scripts/replay_cameras.py --passagens 20000 --rajada 5
+    python scripts/replay_cameras.py --passagens 5000 --taxa 3000 --modo grupo
+    python scripts/replay_cameras.py --socket /tmp/cameras.sock --passagens 10000
+"""
+import argparse
+import json
+import os
+import random
+import socket
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.gerador import gerar_dados
+
+CAMERAS = ("entrada-1", "entrada-2", "saida-1")
+
+
+def gerar_leituras(placas, passagens, rajada, ruido, desconhecidas, semente=42):
+    """
+    Linhas JSON de 'passagens' passagens de carro, 'rajada' leituras cada.
+    O sentido fica por conta do pipeline (quem está no pátio sai).
+    """
+    aleatorio = random.Random(semente)
+    instante = time.time()
+    for _ in range(passagens):
+        if aleatorio.random() < desconhecidas:
+            placa = "ZZZ" + str(aleatorio.randrange(10_000)).zfill(4)
+        else:
+            placa = aleatorio.choice(placas)
+        camera = aleatorio.choice(CAMERAS)
+        for _ in range(rajada):
+            instante += aleatorio.uniform(0.001, 0.05)
+            lida = placa
+            if aleatorio.random() < ruido:
+                lida = placa[:aleatorio.randrange(3, 6)] + "?"  # OCR não conseguiu ler tudo
+            yield json.dumps({"placa": lida, "camera": camera, "instante": round(instante, 3)}) + "\n"
+        instante += aleatorio.uniform(6, 60)  # Próximo carro depois da janela de repetição
+
+
+def no_ritmo(linhas, taxa):
+    """Entrega as linhas a 'taxa' por segundo (0 = o mais rápido possível)."""
+    if not taxa:
+        yield from linhas
+        return
+    inicio = time.perf_counter()
+    for i, linha in enumerate(linhas):
+        atraso = inicio + i / taxa - time.perf_counter()
+        if atraso > 0:
+            time.sleep(atraso)
+        yield linha
+
+
+def enviar_socket(caminho, linhas):
+    cliente = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    cliente.connect(caminho)
+    enviadas = 0
+    inicio = time.perf_counter()
+    try:
+        bloco = []
+        for linha in linhas:
+            bloco.append(linha)
+            if len(bloco) >= 100:
+                cliente.sendall("".join(bloco).encode())
+                enviadas += len(bloco)
+                bloco = []
+        if bloco:
+            cliente.sendall("".join(bloco).encode())
+            enviadas += len(bloco)
+    finally:
+        cliente.close()
+    duracao = time.perf_counter() - inicio
+    print(f"{enviadas} leituras enviadas em {duracao:.2f}s ({enviadas / duracao:.0f} leituras/s). "
+          "As métricas aparecem no processo 'cameras' ao encerrá-lo.")
+
+
+def rodar_local(args, linhas):
+    from app.cameras import PipelineCameras
+    from app.controllers.controle_acesso import ControleEstacionamento
+    from app.database.repositorios import criar_repositorio
+    from benchmarks.bench_controle import preparar_banco
+
+    with tempfile.TemporaryDirectory(prefix="replay-cameras-") as pasta:
+        db = preparar_banco(args.modo, pasta, args.dados)
+        controle = ControleEstacionamento(criar_repositorio(db, exclusivo=True))
+        controle.aquecer()
+        pipeline = PipelineCameras(controle, janela=args.janela, trabalhadores=args.trabalhadores, lote=args.lote)
+        try:
+            metricas = pipeline.processar(linhas)
+        finally:
+            db.fechar()
+    latencia = metricas.pop("latencia")
+    print(json.dumps(metricas, indent=2))
+    if latencia.get("amostras"):
+        print(f"leitura -> decisão gravada: p50={latencia['p50_ms']:.2f}ms  p99={latencia['p99_ms']:.2f}ms  "
+              f"max={latencia['max_ms']:.2f}ms")
+
+
+def principal():
+    parser = argparse.ArgumentParser(description="Replay de leituras de câmeras (ANPR)")
+    parser.add_argument("--passagens", type=int, default=20_000, help="Carros passando pelas câmeras")
+    parser.add_argument("--rajada", type=int, default=5, help="Leituras repetidas por passagem")
+    parser.add_argument("--ruido", type=float, default=0.05, help="Fração de leituras ilegíveis")
+    parser.add_argument("--desconhecidas", type=float, default=0.05, help="Fração de placas sem cadastro")
+    parser.add_argument("--taxa", type=float, default=0, help="Leituras por segundo (0 = o mais rápido possível)")
+    parser.add_argument("--veiculos", type=int, default=10_000, help="Veículos no banco sintético")
+    parser.add_argument("--modo", default="grupo", choices=["json", "diario", "grupo", "sqlite"],
+                        help="Armazenamento do banco sintético (sem --socket)")
+    parser.add_argument("--janela", type=float, default=5.0)
+    parser.add_argument("--trabalhadores", type=int, default=4)
+    parser.add_argument("--lote", type=int, default=200)
+    parser.add_argument("--socket", help="Envia para um 'main.py cameras --fonte socket:CAMINHO' rodando")
+    args = parser.parse_args()
+
+    args.dados = gerar_dados(args.veiculos, 0)
+    placas = [v["placa"] for v in args.dados["veiculos"]]
+    linhas = no_ritmo(gerar_leituras(placas, args.passagens, args.rajada, args.ruido, args.desconhecidas),
+                      args.taxa)
+    if args.socket:
+        enviar_socket(args.socket, linhas)
+    else:
+        rodar_local(args, linhas)
+
+
+if __name__ == "__main__":
+    principal()
@@ -0,0 +1,114 @@
+import os
+import random
+import tempfile
+import unittest
+
+from app.database.autorizacoes import (
+    ArquivoAutorizadosInvalido, LeitorAutorizados, TabelaAutorizados, codificar_placa, decodificar_placa,
+)
+
+_LETRAS = "ABCDEFGHIJKLMNOPQRSTUVWXYZ"
+
+
+def _placa_aleatoria(sorteio):
+    letras = "".join(sorteio.choice(_LETRAS) for _ in range(3))
+    meio = sorteio.choice("0123456789" + _LETRAS)  # antigo (ABC1234) ou Mercosul (ABC1D23)
+    return f"{letras}{sorteio.randint(0, 9)}{meio}{sorteio.randint(0, 99):02d}"
+
+
+class TestCodificacao(unittest.TestCase):
+    def test_ida_e_volta(self):
+        sorteio = random.Random(7)
+        for _ in range(1000):
+            placa = _placa_aleatoria(sorteio)
+            self.assertEqual(decodificar_placa(codificar_placa(placa)), placa)
+
+    def test_aceita_hifen_e_minusculas(self):
+        self.assertEqual(codificar_placa("abc-1d23"), codificar_placa("ABC1D23"))
+
+    def test_placa_invalida(self):
+        with self.assertRaises(ValueError):
+            codificar_placa("ABC123")
+
+
+class TestTabelaAutorizados(unittest.TestCase):
+    def test_adicionar_e_remover_como_um_conjunto(self):
+        """Sequência aleatória de operações comparada com um set (inclui crescimento e remoções em cadeia)."""
+        sorteio = random.Random(2024)
+        universo = [_placa_aleatoria(sorteio) for _ in range(300)]
+        tabela = TabelaAutorizados()
+        esperado = set()
+        for _ in range(20000):
+            placa = sorteio.choice(universo)
+            if sorteio.random() < 0.55:
+                self.assertEqual(tabela.adicionar(placa), placa not in esperado)
+                esperado.add(placa)
+            else:
+                self.assertEqual(tabela.remover(placa), placa in esperado)
+                esperado.discard(placa)
+            self.assertEqual(len(tabela), len(esperado))
+        self.assertEqual(set(tabela), esperado)
+        for placa in universo:
+            self.assertEqual(placa in tabela, placa in esperado)
+
+    def test_placa_invalida_nao_esta_na_tabela(self):
+        tabela = TabelaAutorizados(["ABC1D23"])
+        self.assertNotIn("XYZ", tabela)
+        self.assertFalse(tabela.remover("XYZ"))
+
+    def test_salvar_e_abrir(self):
+        sorteio = random.Random(3)
+        placas = {_placa_aleatoria(sorteio) for _ in range(500)}
+        fora = {_placa_aleatoria(sorteio) for _ in range(500)} - placas
+        with tempfile.TemporaryDirectory() as pasta:
+            caminho = os.path.join(pasta, "autorizados.bin")
+            TabelaAutorizados(placas, evento_id=42).salvar(caminho)
+
+            aberta = TabelaAutorizados.abrir(caminho)
+            try:
+                self.assertEqual(aberta.evento_id, 42)
+                self.assertEqual(len(aberta), len(placas))
+                self.assertEqual(set(aberta), placas)
+                self.assertTrue(all(p in aberta for p in placas))
+                self.assertFalse(any(p in aberta for p in fora))
+                with self.assertRaises(TypeError):
+                    aberta.adicionar("ABC1D23")
+            finally:
+                aberta.fechar()
+
+    def test_abrir_arquivo_invalido(self):
+        with tempfile.TemporaryDirectory() as pasta:
+            caminho = os.path.join(pasta, "autorizados.bin")
+            with open(caminho, 'wb') as f:
+                f.write(b"nada a ver" * 10)
+            with self.assertRaises(ArquivoAutorizadosInvalido):
+                TabelaAutorizados.abrir(caminho)
+
+
+class TestLeitorAutorizados(unittest.TestCase):
+    def test_remapeia_quando_o_arquivo_e_trocado(self):
+        with tempfile.TemporaryDirectory() as pasta:
+            caminho = os.path.join(pasta, "autorizados.bin")
+            TabelaAutorizados(["ABC1D23"], evento_id=1).salvar(caminho)
+            leitor = LeitorAutorizados(caminho, intervalo=0)
+            try:
+                self.assertTrue(leitor.autorizada("ABC1D23"))
+                self.assertFalse(leitor.autorizada("XYZ9W87"))
+
+                TabelaAutorizados(["XYZ9W87"], evento_id=2).salvar(caminho)
+                self.assertTrue(leitor.autorizada("XYZ9W87"))
+                self.assertFalse(leitor.autorizada("ABC1D23"))
+                self.assertEqual(leitor.tabela.evento_id, 2)
+
+                # Arquivo trocado por um inválido: continua com a última tabela válida
+                invalido = os.path.join(pasta, "invalido.bin")
+                with open(invalido, 'wb') as f:
+                    f.write(b"x")
+                os.replace(invalido, caminho)
+                self.assertTrue(leitor.autorizada("XYZ9W87"))
+            finally:
+                leitor.fechar()
+
+
+if __name__ == "__main__":
+    unittest.main()
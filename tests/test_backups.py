@@ -0,0 +1,145 @@
+import os
+import tempfile
+import unittest
+from datetime import datetime, timedelta
+
+from app.database.backups import BackupInvalido, BackupsBanco
+from app.database.conexao import BancoDeDadosDiario, BancoDeDadosJson
+
+# Movimentos datados depois de agora: toda cópia tirada no teste conta como "até 'ate'"
+_INICIO = (datetime.now() + timedelta(days=1)).replace(hour=8, minute=0, second=0, microsecond=0)
+
+
+def _instante(minutos):
+    return (_INICIO + timedelta(minutes=minutos)).strftime("%Y-%m-%d %H:%M:%S")
+
+
+def _movimento(minutos, placa="ABC1D23", tipo="ENTRADA"):
+    return {"placa": placa, "tipo": tipo, "data_hora": _instante(minutos)}
+
+
+class TestRestauracao(unittest.TestCase):
+    def setUp(self):
+        self._pasta = tempfile.TemporaryDirectory()
+        self.addCleanup(self._pasta.cleanup)
+        self.arquivo = os.path.join(self._pasta.name, "banco.json")
+
+    def _abrir(self, **opcoes):
+        db = BancoDeDadosDiario(self.arquivo, limite_compactacao=10 ** 6, **opcoes)
+        self.addCleanup(db.fechar)
+        return db
+
+    def _cadastrar(self, db, nome, cpf):
+        db.atualizar(lambda dados: dados["pessoas"].append({"nome": nome, "cpf": cpf, "contato": ""}))
+
+    def _preparar(self, **opcoes):
+        """Cópia com 3 movimentos e Ana; depois dela, mais 4 movimentos e Bia."""
+        db = self._abrir(**opcoes)
+        self._cadastrar(db, "Ana", "52998224725")
+        antes = [_movimento(0), _movimento(10, "XYZ9W87"), _movimento(20, tipo="SAIDA")]
+        for m in antes:
+            db.anexar_movimentacao(m)
+        db.backups.criar()
+        depois = [_movimento(30), _movimento(40, "DEF4G56"), _movimento(50, "XYZ9W87", "SAIDA"), _movimento(60, "GHI7J89")]
+        for m in depois:
+            db.anexar_movimentacao(m)
+        self._cadastrar(db, "Bia", "11144477735")
+        return db, antes, depois
+
+    def _restaurado(self, destino):
+        db = BancoDeDadosJson(destino)
+        return db.ler()
+
+    def test_restaurar_ate_um_instante(self):
+        db, antes, depois = self._preparar()
+        destino = os.path.join(self._pasta.name, "restaurado.json")
+        resultado = db.backups.restaurar(ate=_instante(45), destino=destino)
+
+        self.assertEqual(resultado["movimentos_refeitos"], 2)
+        dados = self._restaurado(destino)
+        self.assertEqual(dados["historico"], antes + depois[:2])
+        self.assertEqual(dados["ocupacao"], {"ABC1D23": _instante(30), "XYZ9W87": _instante(10),
+                                             "DEF4G56": _instante(40)})
+        # Cadastros ficam como estavam na cópia
+        self.assertEqual([p["nome"] for p in dados["pessoas"]], ["Ana"])
+
+    def test_restaurar_sem_instante_refaz_tudo(self):
+        db, antes, depois = self._preparar()
+        destino = os.path.join(self._pasta.name, "restaurado.json")
+        db.backups.restaurar(destino=destino)
+        self.assertEqual(self._restaurado(destino)["historico"], antes + depois)
+
+    def test_restaurar_sobre_o_banco_atual_guarda_uma_copia_antes(self):
+        db, antes, depois = self._preparar()
+        db.fechar()
+        backups = BackupsBanco(self.arquivo)
+        backups.restaurar(ate=_instante(35))
+
+        motivos = [m["motivo"] for m in backups.listar()]
+        self.assertEqual(motivos, ["manual", "antes_de_restaurar"])
+        self.assertEqual(self._abrir().ler()["historico"], antes + depois[:1])
+        # A cópia de antes da restauração tem tudo o que havia
+        self.assertEqual(backups.ler(backups.listar()[-1]["nome"])["historico"], antes + depois)
+
+    def test_banco_atual_corrompido(self):
+        db, antes, depois = self._preparar()
+        db.fechar()
+        with open(self.arquivo, 'wb') as f:
+            f.write(b'{"pessoas": [')
+
+        # Os movimentos depois da cópia só estavam no JSON principal (o cadastro de Bia incorporou o diário)
+        BackupsBanco(self.arquivo).restaurar()
+        self.assertTrue(os.path.exists(self.arquivo + ".corrompido"))
+        self.assertEqual(self._abrir().ler()["historico"], antes)
+
+    def test_copia_adulterada_e_ignorada(self):
+        db, antes, depois = self._preparar()
+        segunda = db.backups.criar()
+        # Adultera o JSON principal da cópia mais recente
+        pasta = os.path.join(db.backups.pasta, segunda["nome"])
+        principal = next(r for r in segunda["arquivos"] if r.startswith("banco.json"))
+        with open(os.path.join(pasta, principal), 'r+b') as f:
+            f.seek(20)
+            f.write(b"\x00\x00\x00")
+
+        self.assertTrue(db.backups.verificar(segunda["nome"])[0]["erros"])
+        with self.assertRaises(BackupInvalido):
+            db.backups.ler(segunda["nome"])
+        destino = os.path.join(self._pasta.name, "restaurado.json")
+        resultado = db.backups.restaurar(destino=destino)
+        self.assertEqual(resultado["ignoradas"], [segunda["nome"]])
+        self.assertEqual(self._restaurado(destino)["historico"], antes + depois)
+
+    def test_nenhuma_copia_ate_o_instante(self):
+        db, _, _ = self._preparar()
+        with self.assertRaises(BackupInvalido):
+            db.backups.restaurar(ate="2000-01-01", destino=os.path.join(self._pasta.name, "x.json"))
+
+    def test_historico_particionado(self):
+        db, antes, depois = self._preparar(particionar=True)
+        destino = os.path.join(self._pasta.name, "restaurado.json")
+        db.backups.restaurar(ate=_instante(55), destino=destino)
+        restaurado = BancoDeDadosDiario(destino, particionar=True)
+        self.addCleanup(restaurado.fechar)
+        self.assertEqual(list(restaurado.ler()["historico"]), antes + depois[:3])
+
+
+class TestRotacao(unittest.TestCase):
+    def test_mantem_as_mais_recentes_mesmo_no_mesmo_segundo(self):
+        with tempfile.TemporaryDirectory() as pasta:
+            arquivo = os.path.join(pasta, "banco.json")
+            db = BancoDeDadosJson(arquivo, geracoes_backup=3)
+            criadas = []
+            for i in range(6):
+                db.atualizar(lambda dados, i=i: dados["pessoas"].append({"nome": f"P{i}", "cpf": str(i), "contato": ""}))
+                criadas.append(db.backups.criar()["nome"])
+
+            copias = db.backups.listar()
+            self.assertEqual([m["nome"] for m in copias], criadas[-3:])
+            self.assertEqual(len(set(criadas)), 6)
+            self.assertEqual([m["sequencia"] for m in copias], sorted(m["sequencia"] for m in copias))
+            self.assertEqual(len(db.backups.ler(copias[-1]["nome"])["pessoas"]), 6)
+
+
+if __name__ == "__main__":
+    unittest.main()
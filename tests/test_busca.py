@@ -0,0 +1,119 @@
+import random
+import unittest
+
+from app.utils.busca import CUSTO_CONFUSAO, GRUPOS_CONFUSAO, IndicePlacasSemelhantes, distancia_placas
+from app.utils.validadores import ValidadorPlaca
+
+_LETRAS = "ABCDEFGHIJKLMNOPQRSTUVWXYZ"
+_CARACTERES = _LETRAS + "0123456789"
+_PARECIDOS = {c: grupo for grupo in GRUPOS_CONFUSAO for c in grupo}
+
+
+def _placa_aleatoria(sorteio):
+    letras = "".join(sorteio.choice(_LETRAS) for _ in range(3))
+    meio = sorteio.choice("0123456789" + _LETRAS)
+    return f"{letras}{sorteio.randint(0, 9)}{meio}{sorteio.randint(0, 99):02d}"
+
+
+def _leitura_errada(placa, sorteio):
+    """
+    A placa como a câmera/o porteiro poderia ler: até duas confusões O/0, I/1...
+    e no máximo um erro comum, em outro ponto da placa.
+    """
+    caracteres = list(placa)
+    i = sorteio.randrange(len(caracteres) - 1)  # Onde fica o erro comum
+    for _ in range(sorteio.randint(0, 2)):
+        j = sorteio.choice([j for j in range(len(caracteres)) if j not in (i, i + 1)])
+        grupo = _PARECIDOS.get(caracteres[j])
+        if grupo:
+            caracteres[j] = sorteio.choice(grupo)
+    erro = sorteio.choice(("nenhum", "troca", "falta", "sobra", "inversao"))
+    if erro == "troca":
+        caracteres[i] = sorteio.choice(_CARACTERES)
+    elif erro == "falta":
+        del caracteres[i]
+    elif erro == "sobra":
+        caracteres.insert(i, sorteio.choice(_CARACTERES))
+    elif erro == "inversao":
+        caracteres[i], caracteres[i + 1] = caracteres[i + 1], caracteres[i]
+    return "".join(caracteres)
+
+
+def _forca_bruta(termo, placas, limite=5, distancia_maxima=1.5):
+    if not 6 <= len(termo) <= 8:
+        return []  # Não é uma placa (nem uma placa com um caractere a mais ou a menos)
+    encontrados = sorted((distancia_placas(termo, p), p) for p in placas)
+    return [(p, d) for d, p in encontrados if d <= distancia_maxima][:limite]
+
+
+class TestDistanciaPlacas(unittest.TestCase):
+    def test_custos(self):
+        self.assertEqual(distancia_placas("ABC1D23", "ABC1D23"), 0)
+        self.assertEqual(distancia_placas("ABC1D23", "A8C1D23"), CUSTO_CONFUSAO)  # B/8
+        self.assertEqual(distancia_placas("ABC1D23", "AXC1D23"), 1)               # troca
+        self.assertEqual(distancia_placas("ABC1D23", "ABC1D2"), 1)                # falta
+        self.assertEqual(distancia_placas("ABC1D23", "ABC1D233"), 1)              # sobra
+        self.assertEqual(distancia_placas("ABC1D23", "ABC1D32"), 1)               # inversão
+        self.assertEqual(distancia_placas("ABC1D23", "XYZ9W87"), 7)
+
+    def test_simetrica(self):
+        sorteio = random.Random(5)
+        for _ in range(300):
+            a = _placa_aleatoria(sorteio)
+            b = _leitura_errada(a, sorteio)
+            self.assertEqual(distancia_placas(a, b), distancia_placas(b, a))
+
+
+class TestIndicePlacasSemelhantes(unittest.TestCase):
+    def setUp(self):
+        self.sorteio = random.Random(11)
+        self.placas = [_placa_aleatoria(self.sorteio) for _ in range(500)]
+        # Placas vizinhas de propósito (sem elas quase toda busca teria um resultado só)
+        for placa in self.placas[:100]:
+            self.placas.append(_leitura_errada(placa, self.sorteio))
+        self.placas = sorted({p for p in self.placas if len(p) == 7})
+        self.indice = IndicePlacasSemelhantes()
+        for placa in self.placas:
+            self.indice.adicionar(placa)
+
+    def _consultas(self, quantidade):
+        for _ in range(quantidade):
+            yield _leitura_errada(self.sorteio.choice(self.placas), self.sorteio)
+
+    def test_igual_a_forca_bruta(self):
+        """Leituras com confusões e até um erro comum: o índice acha exatamente o que a força bruta acha."""
+        for termo in self._consultas(150):
+            esperado = _forca_bruta(termo, self.placas, limite=None)
+            self.assertEqual(self.indice.buscar(termo, limite=None), esperado, termo)
+            self.assertEqual(self.indice.buscar(termo), esperado[:5], termo)
+
+    def test_filtrar_igual_a_buscar(self):
+        for termo in self._consultas(100):
+            self.assertEqual(IndicePlacasSemelhantes.filtrar(termo, self.placas, limite=None),
+                             self.indice.buscar(termo, limite=None), termo)
+
+    def test_a_placa_certa_sempre_aparece(self):
+        """O "você quis dizer" sempre traz a placa original de uma leitura errada."""
+        for _ in range(300):
+            placa = self.sorteio.choice(self.placas)
+            termo = _leitura_errada(placa, self.sorteio)
+            self.assertIn(placa, [p for p, _ in self.indice.buscar(termo, limite=None)], termo)
+
+    def test_remover(self):
+        removidas = set(self.sorteio.sample(self.placas, 150))
+        for placa in removidas:
+            self.indice.remover(placa)
+        restantes = [p for p in self.placas if p not in removidas]
+        self.assertEqual(len(self.indice), len(restantes))
+        for termo in self._consultas(100):
+            self.assertEqual(self.indice.buscar(termo, limite=None), _forca_bruta(termo, restantes, limite=None), termo)
+
+    def test_normalizacao(self):
+        indice = IndicePlacasSemelhantes(normalizar=ValidadorPlaca.limpar)
+        indice.adicionar("abc-1d23")
+        self.assertEqual(indice.buscar("ABC-1D28"), [("ABC1D23", 1)])
+        self.assertEqual(indice.buscar("AB"), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,126 @@
+import json
+import os
+import tempfile
+import unittest
+
+from app.database.conexao import BancoDeDadosDiario, BancoDeDadosJson
+
+
+def _movimento(i):
+    return {"placa": f"ABC1D{i % 50:02d}", "tipo": "ENTRADA" if (i // 50) % 2 == 0 else "SAIDA",
+            "data_hora": f"2024-05-01 {i // 3600:02d}:{i // 60 % 60:02d}:{i % 60:02d}"}
+
+
+class TestDiario(unittest.TestCase):
+    def setUp(self):
+        self._pasta = tempfile.TemporaryDirectory()
+        self.arquivo = os.path.join(self._pasta.name, "banco.json")
+
+    def tearDown(self):
+        self._pasta.cleanup()
+
+    def _abrir(self, **opcoes):
+        opcoes.setdefault("limite_compactacao", 10 ** 6)  # Sem compactação automática, salvo pedido
+        db = BancoDeDadosDiario(self.arquivo, **opcoes)
+        self.addCleanup(db.fechar)
+        return db
+
+    def _historico(self, db):
+        return db.ler()["historico"]
+
+    def test_movimento_vai_para_o_diario_sem_regravar_o_snapshot(self):
+        db = self._abrir()
+        with open(self.arquivo, 'rb') as f:
+            snapshot = f.read()
+        for i in range(5):
+            db.anexar_movimentacao(_movimento(i))
+        with open(self.arquivo, 'rb') as f:
+            self.assertEqual(f.read(), snapshot)
+        with open(db.arquivo_diario, encoding='utf-8') as f:
+            self.assertEqual(len(f.readlines()), 5)
+
+    def test_reabrir_repassa_o_diario(self):
+        db = self._abrir()
+        movimentos = [_movimento(i) for i in range(120)]
+        for m in movimentos:
+            db.anexar_movimentacao(m)
+
+        reaberto = self._abrir()
+        dados = reaberto.ler()
+        self.assertEqual(dados["historico"], movimentos)
+        self.assertEqual(set(dados["ocupacao"]), {m["placa"] for m in movimentos[100:]})
+        self.assertEqual(dados["ocupacao"]["ABC1D00"], movimentos[100]["data_hora"])
+
+    def test_linha_incompleta_no_fim_e_ignorada(self):
+        db = self._abrir()
+        for i in range(3):
+            db.anexar_movimentacao(_movimento(i))
+        with open(db.arquivo_diario, 'a', encoding='utf-8') as f:
+            f.write('{"seq": 99, "placa": "XYZ9W8')  # Queda no meio da escrita
+        self.assertEqual(self._historico(self._abrir()), [_movimento(i) for i in range(3)])
+
+    def test_compactacao_incorpora_e_apaga_o_diario(self):
+        db = self._abrir()
+        for i in range(10):
+            db.anexar_movimentacao(_movimento(i))
+        db.compactar()
+        self.assertFalse(os.path.exists(db.arquivo_diario))
+        self.assertFalse(os.path.exists(db.arquivo_compactando))
+        # O snapshot sozinho (lido como JSON simples) já tem tudo
+        self.assertEqual(BancoDeDadosJson(self.arquivo).ler()["historico"], [_movimento(i) for i in range(10)])
+        db.anexar_movimentacao(_movimento(10))
+        self.assertEqual(self._historico(db), [_movimento(i) for i in range(11)])
+
+    def test_compactacao_interrompida_nao_duplica(self):
+        db = self._abrir()
+        for i in range(10):
+            db.anexar_movimentacao(_movimento(i))
+        # Queda depois de trocar o snapshot e antes de apagar o arquivo em compactação
+        with open(db.arquivo_diario, encoding='utf-8') as f:
+            compactando = f.read()
+        db.compactar()
+        with open(db.arquivo_compactando, 'w', encoding='utf-8') as f:
+            f.write(compactando)
+        self.assertEqual(self._historico(self._abrir()), [_movimento(i) for i in range(10)])
+
+    def test_compactacao_interrompida_antes_de_gravar(self):
+        db = self._abrir()
+        for i in range(10):
+            db.anexar_movimentacao(_movimento(i))
+        # Queda logo depois de renomear o diário: as linhas só existem no arquivo em compactação
+        os.replace(db.arquivo_diario, db.arquivo_compactando)
+        reaberto = self._abrir()
+        reaberto.anexar_movimentacao(_movimento(10))
+        self.assertEqual(self._historico(reaberto), [_movimento(i) for i in range(11)])
+        reaberto.compactar()
+        self.assertEqual(self._historico(self._abrir()), [_movimento(i) for i in range(11)])
+
+    def test_trava_apagada_nao_reaproveita_sequencia(self):
+        db = self._abrir()
+        for i in range(5):
+            db.anexar_movimentacao(_movimento(i))
+        db.fechar()
+        os.remove(db.arquivo_trava)  # Versão volta a 0, mas o diário já usou as sequências 2..6
+
+        reaberto = self._abrir()
+        reaberto.anexar_movimentacao(_movimento(5))
+        with open(reaberto.arquivo_diario, encoding='utf-8') as f:
+            sequencias = [json.loads(linha)["seq"] for linha in f]
+        self.assertEqual(sequencias, sorted(set(sequencias)))
+        self.assertEqual(self._historico(reaberto), [_movimento(i) for i in range(6)])
+
+    def test_salvar_descarta_o_diario_ja_mesclado(self):
+        db = self._abrir()
+        for i in range(4):
+            db.anexar_movimentacao(_movimento(i))
+        dados = db.ler()
+        dados["pessoas"].append({"nome": "Ana", "cpf": "52998224725", "contato": ""})
+        db.salvar(dados)
+        self.assertFalse(os.path.exists(db.arquivo_diario))
+        reaberto = self._abrir().ler()
+        self.assertEqual(reaberto["historico"], [_movimento(i) for i in range(4)])
+        self.assertEqual(len(reaberto["pessoas"]), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
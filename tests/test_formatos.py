@@ -0,0 +1,133 @@
+import os
+import tempfile
+import unittest
+
+from app.database import conexao
+from app.database.conexao import (
+    BancoCorrompido, BancoDeDadosJson, CodecColunar, CodecJson, CodecMsgpack, FORMATOS, FormatoIndisponivel, codec,
+    decodificar, detectar_codec,
+)
+from app.models.historico import HistoricoColunar
+
+_DISPONIVEIS = [nome for nome in FORMATOS
+                if not (nome == "orjson" and conexao.orjson is None)
+                and not (nome == "msgpack" and conexao.msgpack is None)]
+
+
+def _dados_exemplo():
+    historico = [
+        {"placa": f"ABC1D{i % 100:02d}", "tipo": "ENTRADA" if i % 2 == 0 else "SAIDA",
+         "data_hora": f"2024-05-{1 + i // 50:02d} {i % 24:02d}:{i % 60:02d}:00"}
+        for i in range(300)
+    ]
+    return {
+        "pessoas": [{"nome": "João Conceição", "cpf": "52998224725", "contato": "(11) 99999-0000"},
+                    {"nome": "Zoë \"Aspas\" \\ Barra", "cpf": "11144477735", "contato": ""}],
+        "veiculos": [{"placa": "ABC1D00", "modelo": "Gol", "cor": "Prata", "proprietario_cpf": "52998224725"}],
+        "historico": historico,
+        "ocupacao": {"ABC1D00": "2024-05-01 00:00:00"},
+        "eventos": [{"id": 1, "nome": "Feira", "inicio": "2024-05-01 00:00:00", "fim": None,
+                     "autorizados": ["ABC1D00"]}],
+    }
+
+
+class TestCodecs(unittest.TestCase):
+    def test_ida_e_volta_em_todos_os_formatos(self):
+        for nome in _DISPONIVEIS:
+            with self.subTest(formato=nome):
+                dados = _dados_exemplo()
+                conteudo = codec(nome).codificar(dados)
+                self.assertIsInstance(conteudo, bytes)
+                self.assertEqual(detectar_codec(conteudo).decodificar(conteudo), dados)
+                self.assertEqual(decodificar(conteudo), dados)
+
+    def test_historico_colunar_vira_lista(self):
+        dados = _dados_exemplo()
+        esperado = dict(dados)
+        dados["historico"] = HistoricoColunar(dados["historico"])
+        for nome in _DISPONIVEIS:
+            with self.subTest(formato=nome):
+                self.assertEqual(decodificar(codec(nome).codificar(dados)), esperado)
+
+    def test_deteccao_pelos_primeiros_bytes(self):
+        dados = _dados_exemplo()
+        self.assertIsInstance(detectar_codec(codec("json_indentado").codificar(dados)), CodecJson)
+        self.assertIsInstance(detectar_codec(codec("binario").codificar(dados)), CodecColunar)
+        with self.assertRaises(ValueError):
+            detectar_codec(b"\x00lixo")
+
+    def test_formato_desconhecido(self):
+        with self.assertRaises(ValueError):
+            codec("xml")
+
+    @unittest.skipIf(conexao.msgpack is not None, "msgpack instalado")
+    def test_formato_opcional_ausente(self):
+        with self.assertRaises(FormatoIndisponivel):
+            codec("msgpack")
+
+
+class TestCodecColunar(unittest.TestCase):
+    """Listas que não cabem em colunas vão inteiras no cabeçalho JSON: nada se perde."""
+
+    def _ida_e_volta(self, dados):
+        codificador = CodecColunar()
+        self.assertEqual(codificador.decodificar(codificador.codificar(dados)), dados)
+
+    def test_listas_vazias_e_valores_que_nao_sao_texto(self):
+        self._ida_e_volta({"pessoas": [], "eventos": [{"id": 1, "fim": None, "autorizados": []}],
+                           "contagem": [{"placa": "ABC1D23", "vezes": 3}]})
+
+    def test_registros_com_campos_diferentes(self):
+        self._ida_e_volta({"veiculos": [{"placa": "ABC1D23", "cor": "Azul"}, {"placa": "XYZ9W87"},
+                                        {"placa": "DEF4G56", "modelo": "Uno"}]})
+
+    def test_separador_dentro_de_um_valor(self):
+        self._ida_e_volta({"pessoas": [{"nome": "a" + CodecColunar.SEPARADOR + "b", "cpf": "1"},
+                                       {"nome": "c", "cpf": "2"}]})
+
+    def test_texto_vazio_e_um_registro_so(self):
+        self._ida_e_volta({"pessoas": [{"nome": "", "cpf": ""}], "veiculos": [{"placa": "ABC1D23"}]})
+
+
+class TestBancoEmCadaFormato(unittest.TestCase):
+    def test_gravar_e_ler(self):
+        for nome in _DISPONIVEIS:
+            with self.subTest(formato=nome), tempfile.TemporaryDirectory() as pasta:
+                arquivo = os.path.join(pasta, "banco.json")
+                db = BancoDeDadosJson(arquivo, formato=nome)
+                dados = _dados_exemplo()
+                db.salvar(dict(dados))
+                lido = BancoDeDadosJson(arquivo).ler()
+                lido.pop("_versao")
+                self.assertEqual(lido, dados)
+
+    def test_troca_de_formato_mantem_os_dados(self):
+        with tempfile.TemporaryDirectory() as pasta:
+            arquivo = os.path.join(pasta, "banco.json")
+            BancoDeDadosJson(arquivo, formato="json_indentado").salvar(_dados_exemplo())
+            anterior = None
+            for nome in _DISPONIVEIS:
+                db = BancoDeDadosJson(arquivo, formato=nome)
+                db.atualizar(lambda dados: None)  # Relê no formato antigo e grava no novo
+                with open(arquivo, 'rb') as f:
+                    # orjson grava JSON comum: é lido como qualquer JSON
+                    esperado = {"binario": CodecColunar, "msgpack": CodecMsgpack}.get(nome, CodecJson)
+                    self.assertIsInstance(detectar_codec(f.read()), esperado)
+                lido = db.ler()
+                lido.pop("_versao")
+                if anterior is not None:
+                    self.assertEqual(lido, anterior)
+                anterior = lido
+
+    def test_arquivo_ilegivel(self):
+        with tempfile.TemporaryDirectory() as pasta:
+            arquivo = os.path.join(pasta, "banco.json")
+            db = BancoDeDadosJson(arquivo, formato="binario")
+            with open(arquivo, 'r+b') as f:
+                f.truncate(12)
+            with self.assertRaises(BancoCorrompido):
+                db.ler()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,117 @@
+import os
+import tempfile
+import threading
+import unittest
+
+from app.database.conexao import BancoDeDadosDiario, BancoDeDadosGrupo
+
+
+def _movimento(i):
+    return {"placa": f"ABC{i // 100 % 10}D{i % 100:02d}", "tipo": "ENTRADA",
+            "data_hora": f"2024-05-01 {i // 3600 % 24:02d}:{i // 60 % 60:02d}:{i % 60:02d}"}
+
+
+def _descritores_abertos():
+    return len(os.listdir("/proc/self/fd"))
+
+
+class TestConfirmacaoEmGrupo(unittest.TestCase):
+    def setUp(self):
+        self._pasta = tempfile.TemporaryDirectory()
+        self.addCleanup(self._pasta.cleanup)
+        self.arquivo = os.path.join(self._pasta.name, "banco.json")
+
+    def _abrir(self, **opcoes):
+        # Incorporação em segundo plano só quando o teste pedir
+        opcoes.setdefault("intervalo", 3600)
+        opcoes.setdefault("limite_compactacao", 10 ** 6)
+        db = BancoDeDadosGrupo(self.arquivo, **opcoes)
+        self.addCleanup(db.fechar)
+        return db
+
+    def _historico_apos_queda(self):
+        """O que outro processo (ex.: o mesmo programa, reiniciado depois de uma queda) enxerga no disco."""
+        db = BancoDeDadosDiario(self.arquivo, limite_compactacao=10 ** 6)
+        self.addCleanup(db.fechar)
+        return db.ler()["historico"]
+
+    def test_movimento_confirmado_esta_no_diario(self):
+        db = self._abrir()
+        for i in range(20):
+            db.anexar_movimentacao(_movimento(i))
+        # Sem fechar() nem incorporação: só o diário garante os movimentos
+        self.assertEqual(self._historico_apos_queda(), [_movimento(i) for i in range(20)])
+        self.assertEqual(db.metricas()["aguardando_disco"], 0)
+
+    def test_lote_faz_um_fsync_so(self):
+        db = self._abrir()
+        with db.lote():
+            for i in range(50):
+                db.anexar_movimentacao(_movimento(i))
+            self.assertEqual(db.metricas()["aguardando_disco"], 50)
+        metricas = db.metricas()
+        self.assertEqual(metricas["sincronizacoes"], 1)
+        self.assertEqual(metricas["aguardando_disco"], 0)
+        self.assertEqual(self._historico_apos_queda(), [_movimento(i) for i in range(50)])
+
+    @unittest.skipUnless(os.path.isdir("/proc/self/fd"), "precisa de /proc/self/fd")
+    def test_lote_grande_nao_acumula_descritores(self):
+        db = self._abrir()
+        antes = _descritores_abertos()
+        with db.lote():
+            for i in range(2000):
+                db.anexar_movimentacao(_movimento(i))
+            self.assertLessEqual(_descritores_abertos() - antes, 2)
+        self.assertEqual(_descritores_abertos(), antes)
+
+    def test_compactacao_no_meio_do_lote(self):
+        db = self._abrir()
+        with db.lote():
+            for i in range(30):
+                db.anexar_movimentacao(_movimento(i))
+            db.compactar()  # O diário é renomeado com linhas ainda esperando o fsync
+            for i in range(30, 60):
+                db.anexar_movimentacao(_movimento(i))
+        self.assertEqual(db.metricas()["aguardando_disco"], 0)
+        self.assertEqual(self._historico_apos_queda(), [_movimento(i) for i in range(60)])
+
+    def test_varias_threads(self):
+        db = self._abrir(intervalo=0.01, limite_compactacao=50)
+        por_thread = 100
+
+        def registrar(t):
+            for i in range(por_thread):
+                db.anexar_movimentacao(_movimento(t * por_thread + i))
+
+        threads = [threading.Thread(target=registrar, args=(t,)) for t in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        esperado = sorted((_movimento(i) for i in range(8 * por_thread)), key=lambda m: m["data_hora"])
+        self.assertEqual(sorted(self._historico_apos_queda(), key=lambda m: m["data_hora"]), esperado)
+        metricas = db.metricas()
+        self.assertEqual(metricas["movimentos"], 8 * por_thread)
+        self.assertLessEqual(metricas["sincronizacoes"], 8 * por_thread)
+        self.assertEqual(metricas["falhas_incorporacao"], 0)
+
+    def test_fechar_incorpora_o_diario(self):
+        db = self._abrir()
+        for i in range(10):
+            db.anexar_movimentacao(_movimento(i))
+        db.fechar()
+        self.assertFalse(os.path.exists(db.arquivo_diario))
+        self.assertEqual(self._historico_apos_queda(), [_movimento(i) for i in range(10)])
+
+    def test_sem_fsync(self):
+        db = self._abrir(fsync=False)
+        with db.lote():
+            for i in range(10):
+                db.anexar_movimentacao(_movimento(i))
+        self.assertEqual(db.metricas()["sincronizacoes"], 0)
+        self.assertEqual(self._historico_apos_queda(), [_movimento(i) for i in range(10)])
+
+
+if __name__ == "__main__":
+    unittest.main()